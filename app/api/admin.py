@@ -0,0 +1,56 @@
+import hmac
+import os
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from app.services.speciality_service import get_classifier_stats, get_coalescing_stats, get_speciality_cache_stats
+from app.session_store import get_session_store_stats, list_sessions
+from db.doctor_repo import refresh_doctor_directory, get_doctor_directory_stats
+
+load_dotenv()
+
+# Admin endpoints require a matching X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+router = APIRouter(prefix="/admin")
+
+
+def _check_token(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post("/doctors/refresh")
+def refresh_doctors(x_admin_token: Optional[str] = Header(default=None)):
+    """Reload the in-memory doctor directory from the database"""
+    _check_token(x_admin_token)
+    return {"doctors": refresh_doctor_directory()}
+
+
+@router.get("/stats")
+def stats(x_admin_token: Optional[str] = Header(default=None)):
+    """Counters of the in-process caches and the specialty classifier"""
+    _check_token(x_admin_token)
+    return {
+        "speciality_classifier": get_classifier_stats(),
+        "speciality_cache": get_speciality_cache_stats(),
+        "speciality_coalescing": get_coalescing_stats(),
+        "doctor_directory": get_doctor_directory_stats(),
+        "session_store": get_session_store_stats()
+    }
+
+
+@router.get("/sessions")
+def sessions(
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """Page through live chat sessions, most recently active first"""
+    _check_token(x_admin_token)
+    page = list_sessions(offset, limit)
+    page.update({"offset": offset, "limit": limit})
+    return page
@@ -1,25 +1,201 @@
-from fastapi import APIRouter
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from uuid import uuid4
 
 from app.api.models import ChatRequest, ChatResponse
-from app.orchestrator import ConversationOrchestrator
+from app.cache import make_cache
+from app.conversation import BookingFailed
+from app.logging_config import use_correlation_id
+from app.metrics import ERRORS, register_cache_stats
+from app.orchestrator_async import AsyncConversationOrchestrator
+from app.singleflight import AsyncSingleFlight
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Where replies to requests with an idempotency key are kept: "memory", "redis" or "off".
+# Use redis when several workers serve the API, so a retry can land on any of them.
+IDEMPOTENCY_CACHE = os.getenv("IDEMPOTENCY_CACHE", "redis" if os.getenv("USE_REDIS", "false").lower() == "true" else "memory")
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "600"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# How long a worker's claim on a key lasts, bounding the wait if it dies mid-turn
+IDEMPOTENCY_PENDING_TTL = int(os.getenv("IDEMPOTENCY_PENDING_TTL", "60"))
+IDEMPOTENCY_POLL_INTERVAL = 0.1
 
 router = APIRouter()
-orchestrator = ConversationOrchestrator()
+orchestrator = AsyncConversationOrchestrator()
 
-@router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
-    session_id = req.session_id or uuid4().hex
-    print(f"Received message for session: {session_id}")
+# (session, idempotency key) -> {"session_id": ..., "reply": ...}; keys are only
+# accepted with a session_id, so two clients can never share a stored reply
+_responses = make_cache(IDEMPOTENCY_CACHE, "chat-response", maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+if _responses is not None:
+    register_cache_stats("idempotency", _responses.stats)
+# A retry that arrives while the original is still running waits for it: on the
+# same worker through _inflight, on another one by polling the pending marker
+_inflight = AsyncSingleFlight()
+_PENDING = {"pending": True}
+
+ERROR_REPLY = (
+    "Sorry, something went wrong while processing your request. "
+    "Could you please try again later?"
+)
+
+# A word plus the whitespace after it, so chunks join back to the exact reply
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+async def _reply(session_id: str, message: str):
+    """(reply, completed): only completed turns may be stored under an idempotency key"""
     try:
-        reply = orchestrator.handle(session_id, req.message)
+        return await orchestrator.handle(session_id, message), True
+    except BookingFailed as e:
+        logger.warning("Booking failed: %s", e)
+        return e.reply, False
     except Exception as e:
-        reply=(
-            "Sorry, something went wrong while processing your request. ",
-            "Could you please try again later?"
+        logger.exception("Error handling message: %s", e)
+        ERRORS.labels("chat").inc()
+        return ERROR_REPLY, False
+
+
+def _tokens(reply: str):
+    return TOKEN_PATTERN.findall(reply)
+
+
+async def _run_turn(session_id: str, message: str, cache_key: Optional[str] = None) -> ChatResponse:
+    try:
+        reply, completed = await _reply(session_id, message)
+    except BaseException:
+        if cache_key is not None:
+            await _responses.adelete(cache_key)
+        raise
+    response = ChatResponse(session_id=session_id, reply=reply)
+    if cache_key is not None:
+        if completed:
+            await _responses.aset(cache_key, response.model_dump())
+        else:
+            # Failed turns are not remembered, so a retry runs them again
+            await _responses.adelete(cache_key)
+    return response
+
+
+def _stored_response(cached, cache_key: str) -> Optional[ChatResponse]:
+    if cached is None or cached.get("pending"):
+        return None
+    logger.info("Replaying stored response for %s", cache_key)
+    return ChatResponse(**cached)
+
+
+async def _run_once(session_id: str, message: str, cache_key: str) -> ChatResponse:
+    """Claim the key with a pending marker (NX) and run the turn, or wait for the claimant"""
+    while True:
+        if await _responses.aadd(cache_key, _PENDING, ttl=IDEMPOTENCY_PENDING_TTL):
+            return await _run_turn(session_id, message, cache_key)
+        cached = await _responses.aget(cache_key)
+        response = _stored_response(cached, cache_key)
+        if response is not None:
+            return response
+        if cached is not None:
+            await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+        # Otherwise the claimant's turn failed or its marker expired: claim it again
+
+
+async def _chat_turn(session_id: str, message: str, idempotency_key: Optional[str]) -> ChatResponse:
+    """Run a turn once per (session, idempotency key); replays get the stored response"""
+    if not idempotency_key or _responses is None:
+        return await _run_turn(session_id, message)
+
+    cache_key = f"{session_id}:{idempotency_key}"
+    response = _stored_response(await _responses.aget(cache_key), cache_key)
+    if response is not None:
+        return response
+    return await _inflight.do(cache_key, _run_once, session_id, message, cache_key)
+
+
+def _check_idempotency_key(req: ChatRequest) -> None:
+    """A key is scoped to its session: without one, clients reusing a key would get each other's replies"""
+    if req.idempotency_key and not req.session_id:
+        raise HTTPException(
+            status_code=422,
+            detail="idempotency_key requires a session_id (generate one on the client for the first message)"
         )
-    
-    return ChatResponse(
-        session_id=session_id,
-        reply=reply
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest) -> ChatResponse:
+    _check_idempotency_key(req)
+    session_id = req.session_id or uuid4().hex
+    with use_correlation_id(session_id):
+        logger.debug("Received message")
+        return await _chat_turn(session_id, req.message, req.idempotency_key)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """Server-Sent Events: a session event at once, then token events, then done"""
+    _check_idempotency_key(req)
+    session_id = req.session_id or uuid4().hex
+    with use_correlation_id(session_id):
+        logger.debug("Received streamed message")
+
+    async def events():
+        # Sent before any work so the client gets its first byte immediately
+        yield _sse("session", {"session_id": session_id})
+        # Not across a yield: the id must be reset in the context that set it
+        with use_correlation_id(session_id):
+            response = await _chat_turn(session_id, req.message, req.idempotency_key)
+        for token in _tokens(response.reply):
+            yield _sse("token", {"text": token})
+        yield _sse("done", {"session_id": response.session_id, "reply": response.reply})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+
+
+@router.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket, session_id: Optional[str] = None):
+    """One connection per conversation.
+
+    The client sends {"message": ..., "idempotency_key": optional}. The server answers with
+    {"type": "token", "text": ...} frames and then {"type": "done", "reply": ...}.
+    The first frame after connecting is {"type": "session", "session_id": ...}.
+    """
+    await websocket.accept()
+    session_id = session_id or uuid4().hex
+    with use_correlation_id(session_id):
+        await _serve_ws(websocket, session_id)
+
+
+async def _serve_ws(websocket: WebSocket, session_id: str):
+    await websocket.send_json({"type": "session", "session_id": session_id})
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                data = None
+            message = data.get("message") if isinstance(data, dict) else None
+            if not isinstance(message, str):
+                await websocket.send_json({"type": "error", "detail": "Expected {\"message\": <text>}"})
+                continue
+            logger.debug("Received websocket message")
+            response = await _chat_turn(session_id, message, data.get("idempotency_key"))
+            for token in _tokens(response.reply):
+                await websocket.send_json({"type": "token", "text": token})
+            await websocket.send_json({"type": "done", "session_id": session_id, "reply": response.reply})
+    except WebSocketDisconnect:
+        logger.debug("Websocket closed")
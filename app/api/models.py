@@ -4,6 +4,8 @@ from typing import Optional
 class ChatRequest(BaseModel):
     session_id: Optional[str] = None
     message: str
+    # Same key on a retried request returns the stored reply instead of re-running the turn
+    idempotency_key: Optional[str] = None
 
 class ChatResponse(BaseModel):
     session_id: str
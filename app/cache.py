@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+import redis
+import redis.asyncio
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process cache with a per-entry TTL and an LRU size bound"""
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, expires_at, value)
+
+    def add(self, key, value, ttl=None):
+        """Set ``key`` only if it holds no live entry; True when stored"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._store(key, now + (self.ttl if ttl is None else ttl), value)
+            return True
+
+    def _store(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Async interface for the async request path; nothing here blocks
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value, ttl=None):
+        self.set(key, value, ttl)
+
+    async def aadd(self, key, value, ttl=None):
+        return self.add(key, value, ttl)
+
+    async def adelete(self, key):
+        self.delete(key)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    """Cache stored in Redis under a key prefix; Redis errors count as misses"""
+
+    def __init__(self, prefix, ttl=60, client=None, dumps=json.dumps, loads=json.loads, async_client=None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.client = client or _redis_client()
+        self._async_client = async_client
+        self._dumps = dumps
+        self._loads = loads
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=None):
+        try:
+            data = self.client.get(self._key(key))
+        except redis.RedisError as e:
+            logger.warning("Redis cache read failed: %s", e)
+            data = None
+        if data is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self._loads(data)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.setex(self._key(key), self.ttl if ttl is None else ttl, self._dumps(value))
+        except redis.RedisError as e:
+            logger.warning("Redis cache write failed: %s", e)
+
+    def add(self, key, value, ttl=None):
+        """SET NX: store ``value`` only if ``key`` is absent; True when stored.
+
+        True on Redis errors as well: a cache that cannot be reached holds no
+        entry, so callers go ahead as they would on a miss.
+        """
+        try:
+            return bool(self.client.set(self._key(key), self._dumps(value), ex=self.ttl if ttl is None else ttl, nx=True))
+        except redis.RedisError as e:
+            logger.warning("Redis cache write failed: %s", e)
+            return True
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except redis.RedisError as e:
+            # Entries still expire after the TTL
+            logger.warning("Redis cache invalidation failed: %s", e)
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = _redis_client(asyncio=True)
+        return self._async_client
+
+    async def aget(self, key, default=None):
+        try:
+            data = await self.async_client.get(self._key(key))
+        except redis.RedisError as e:
+            logger.warning("Redis cache read failed: %s", e)
+            data = None
+        if data is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self._loads(data)
+
+    async def aset(self, key, value, ttl=None):
+        try:
+            await self.async_client.setex(self._key(key), self.ttl if ttl is None else ttl, self._dumps(value))
+        except redis.RedisError as e:
+            logger.warning("Redis cache write failed: %s", e)
+
+    async def aadd(self, key, value, ttl=None):
+        try:
+            return bool(await self.async_client.set(self._key(key), self._dumps(value), ex=self.ttl if ttl is None else ttl, nx=True))
+        except redis.RedisError as e:
+            logger.warning("Redis cache write failed: %s", e)
+            return True
+
+    async def adelete(self, key):
+        try:
+            await self.async_client.delete(self._key(key))
+        except redis.RedisError as e:
+            logger.warning("Redis cache invalidation failed: %s", e)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _redis_client(asyncio=False):
+    """Redis client built from the session store's Redis configuration"""
+    from app.session_store_redis import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD
+
+    config = dict(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        password=REDIS_PASSWORD if REDIS_PASSWORD else None,
+        decode_responses=True
+    )
+    if asyncio:
+        # Connects lazily on the running event loop
+        return redis.asyncio.Redis(**config)
+    client = redis.Redis(**config)
+    client.ping()
+    return client
+
+
+def make_cache(backend, prefix, maxsize=1024, ttl=60, dumps=json.dumps, loads=json.loads):
+    """Build a cache for ``backend`` ("memory", "redis" or "off"); None when disabled"""
+    backend = (backend or "off").lower()
+    if backend == "memory":
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if backend == "redis":
+        try:
+            return RedisCache(prefix, ttl=ttl, dumps=dumps, loads=loads)
+        except Exception as e:
+            logger.error("Failed to initialize Redis cache '%s', falling back to in-memory cache: %s", prefix, e)
+            return TTLCache(maxsize=maxsize, ttl=ttl)
+    return None
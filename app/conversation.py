@@ -0,0 +1,281 @@
+"""
+State decisions and replies shared by the sync and async orchestrators.
+
+Each step takes what the orchestrator has already looked up, updates the
+session and returns a Reply: the text for the user and what to do with the
+session (save it, close it or leave it). Nothing here does I/O, so
+ConversationOrchestrator and AsyncConversationOrchestrator only differ in
+how they call the database, the LLM and the session store.
+"""
+import re
+from typing import NamedTuple
+from app.state import ConversationState
+from app.session_model import SessionData
+
+SAVE = "save"
+CLOSE = "close"
+KEEP = "keep"
+
+
+class Reply(NamedTuple):
+    text: str
+    session: str = SAVE     # SAVE, CLOSE or KEEP (nothing changed)
+
+
+class BookingFailed(Exception):
+    """The booking raised; ``reply`` is for the user, who can send the same message again.
+
+    Raised rather than returned so that a stored reply (idempotency keys) is never
+    this one and a retry really books.
+    """
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.reply = f"Sorry, there was an error booking your appointment: {str(error)}"
+
+
+GREETING = "Hello! Please describe your health issue?."
+
+SESSION_ENDED_REPLY = (
+    "This conversation has ended, either because it expired or because it was finished in another window. "
+    "Please describe your health issue to start a new booking."
+)
+
+ASK_PATIENT_DETAILS_REPLY = (
+    "Great! May I have your name and contact number? "
+    "(If you have booked with us before, your phone number is enough.)"
+)
+
+ASK_PATIENT_NAME_REPLY = "I couldn't find a previous booking for that number. What name should I book the appointment under?"
+
+ALTERNATIVE_ACCEPTED = {'yes', 'y', 'ok', 'sure'}
+SLOT_ACCEPTED = {'yes', 'y', 'ok', 'fine', 'sure'}
+
+# "<name> <phone>": the phone is a trailing run of digits, spaces and + ( ) - .
+PATIENT_DETAILS_PATTERN = re.compile(r"^(.*?)[\s,]*(\+?[\d\s().-]*\d[\d\s().-]*)$")
+
+
+def parse_patient_details(user_input: str):
+    """Split "<name> <phone>" into (name, phone); phone is None if there is none"""
+    match = PATIENT_DETAILS_PATTERN.match(user_input.strip())
+    if not match:
+        return user_input.strip(), None
+    return match.group(1).strip(), match.group(2).strip()
+
+
+def rejected_slot_pairs(session: SessionData):
+    """Rejected "date|time" slot keys of a session as (date, time) pairs"""
+    return [tuple(slot_key.split('|', 1)) for slot_key in session.get('rejected_slots', [])]
+
+
+def doctor_ids(doctors):
+    return [doc[0] for doc in doctors]
+
+
+def _offer_slot(session: SessionData, slot) -> None:
+    session['date'] = str(slot[0])  # schedule_date
+    session['time'] = str(slot[1])  # start_time
+    session['state'] = ConversationState.CHECKING_AVAILABILITY.value
+
+
+def start(session: SessionData) -> Reply:
+    session['state'] = ConversationState.COLLECTING_SYMPTOMS.value
+    return Reply(GREETING)
+
+
+def session_ended(session: SessionData) -> Reply:
+    """The session disappeared during the turn: start a new conversation"""
+    session['state'] = ConversationState.COLLECTING_SYMPTOMS.value
+    return Reply(SESSION_ENDED_REPLY)
+
+
+def record_symptoms(session: SessionData, symptoms: str, speciality: str) -> None:
+    session['symptoms'] = symptoms
+    session['speciality'] = speciality
+
+
+def offer_doctors(session: SessionData, doctors, any_open: bool) -> Reply:
+    """Doctors of the inferred specialty, or why the conversation ends"""
+    speciality = session['speciality']
+    if not doctors:
+        return Reply(f"Sorry, we don't have any {speciality} specialists available at the moment. Please try again later.", CLOSE)
+    if not any_open:
+        return Reply(f"Sorry, all our {speciality} specialists are fully booked at the moment. Please try again later. Thank you!", CLOSE)
+
+    doctor_names = " / ".join([doc[1] for doc in doctors])
+    session['state'] = ConversationState.SELECTING_DOCTOR.value
+    return Reply(f"Thank you. Which doctor would you like to meet? ({doctor_names})")
+
+
+def unknown_doctor(user_input: str) -> Reply:
+    return Reply(f"Sorry, I couldn't find {user_input}. Please select a valid doctor.", KEEP)
+
+
+def choose_doctor(session: SessionData, doctor) -> None:
+    session['doctor_id'] = doctor[0]
+    session['doctor_name'] = doctor[1]
+
+
+def offer_first_slot(session: SessionData, slot) -> Reply:
+    _offer_slot(session, slot)
+    return Reply(f"{session['doctor_name']} is available on {slot[0]} at {slot[1]}. Is that fine?")
+
+
+def other_doctors(doctors, doctor_id):
+    return [doc for doc in doctors if doc[0] != doctor_id]
+
+
+def offer_alternative_doctors(session: SessionData, doctors_with_slots) -> Reply:
+    """The chosen doctor is fully booked: offer colleagues with open slots, if any"""
+    doctor_name = session['doctor_name']
+    if not doctors_with_slots:
+        return Reply(
+            f"Sorry, {doctor_name} and all other {session.get('speciality', '')} specialists are fully booked. "
+            "Please try again later. Thank you!",
+            CLOSE
+        )
+
+    session['alternative_doctors'] = [(doc[0], doc[1]) for doc in doctors_with_slots]
+    session['state'] = ConversationState.OFFERING_ALTERNATIVE_DOCTOR.value
+    alt_names = ", ".join([doc[1] for doc in doctors_with_slots])
+    return Reply(
+        f"Sorry, {doctor_name} has no available slots at the moment. However, we have other doctors available: "
+        f"{alt_names}. Would you like to proceed with one of them? (yes/no)"
+    )
+
+
+def accepts_alternative(user_input: str) -> bool:
+    return user_input.lower() in ALTERNATIVE_ACCEPTED
+
+
+def decline_alternatives() -> Reply:
+    return Reply("Thank you for contacting us. Please try again later. Have a great day!", CLOSE)
+
+
+def list_alternatives(session: SessionData) -> Reply:
+    """Several (or no) alternatives were offered: ask which one"""
+    alternative_doctors = session.get('alternative_doctors', [])
+    if not alternative_doctors:
+        return Reply("Sorry, no alternative doctors available. Please try again later.", CLOSE)
+
+    alt_names = " / ".join([doc[1] for doc in alternative_doctors])
+    session['state'] = ConversationState.SELECTING_DOCTOR.value
+    return Reply(f"Please select from: {alt_names}")
+
+
+def offer_alternative_slot(session: SessionData, slots) -> Reply:
+    """First open slot of the only alternative doctor, who was selected for the patient"""
+    doctor_name = session['doctor_name']
+    if not slots:
+        return Reply(f"Sorry, {doctor_name} has no available slots at the moment. Please try again later. Thank you!", CLOSE)
+
+    _offer_slot(session, slots[0])
+    return Reply(f"Great! {doctor_name} is available on {slots[0][0]} at {slots[0][1]}. Is that fine?")
+
+
+def accepts_slot(user_input: str) -> bool:
+    return user_input.lower() in SLOT_ACCEPTED
+
+
+def ask_patient_details(session: SessionData) -> Reply:
+    session['state'] = ConversationState.COLLECTING_PATIENT_DETAILS.value
+    return Reply(ASK_PATIENT_DETAILS_REPLY)
+
+
+def missing_doctor() -> Reply:
+    return Reply("Sorry, something went wrong. Please start over.", CLOSE)
+
+
+def decline_slot(session: SessionData):
+    """Record the offered slot as rejected; returns the keyset (after, exclude) for the next offer"""
+    current_date = session.get('date')
+    current_time = session.get('time')
+    if 'rejected_slots' not in session:
+        session['rejected_slots'] = []
+
+    if current_date and current_time:
+        rejected_slot = f"{current_date}|{current_time}"
+        if rejected_slot not in session['rejected_slots']:
+            session['rejected_slots'].append(rejected_slot)
+
+    # The next open slot after the declined one, skipping rejected slots
+    after = (current_date, current_time) if current_date and current_time else None
+    return after, rejected_slot_pairs(session)
+
+
+def offer_next_slot(session: SessionData, slots) -> Reply:
+    if not slots:
+        return Reply(
+            f"Sorry, {session.get('doctor_name', 'the doctor')} has no other available slots at the moment. "
+            "Please try again later or start a new booking. Thank you!",
+            CLOSE
+        )
+
+    session['date'] = str(slots[0][0])
+    session['time'] = str(slots[0][1])
+    return Reply(f"How about {slots[0][0]} at {slots[0][1]}? Is that fine?")
+
+
+def needs_patient_lookup(name, phone) -> bool:
+    """A returning patient may give just their phone number"""
+    return bool(phone) and not name
+
+
+def record_patient_details(session: SessionData, user_input: str, name, phone, patient=None):
+    """Store who to book for; a Reply if something is still missing, else None (ready to book).
+
+    ``patient`` is the stored patient for a phone given without a name.
+    """
+    if needs_patient_lookup(name, phone):
+        if patient is None:
+            session['phone'] = phone
+            return Reply(ASK_PATIENT_NAME_REPLY)
+        name = patient[1]
+
+    session['patient_name'] = name or user_input
+    if phone:
+        session['phone'] = phone
+    return None
+
+
+def booking_request(session: SessionData):
+    """Keyword arguments for book_appointment"""
+    return dict(
+        doctor_id=session.get('doctor_id'),
+        patient_name=session['patient_name'],
+        phone=session.get('phone'),
+        date=session.get('date'),
+        time=session.get('time')
+    )
+
+
+def booking_confirmed(session: SessionData) -> Reply:
+    return Reply(
+        f"Perfect! Your appointment with {session.get('doctor_name', 'the doctor')} ({session.get('speciality', '')}) "
+        f"is confirmed for {session.get('date')} at {session.get('time')}. You'll receive a confirmation shortly. "
+        "Thank you for choosing Super Clinic!\n\n"
+        "Your session has been closed. Start a new conversation to book another appointment.",
+        CLOSE
+    )
+
+
+def taken_slot_exclusions(session: SessionData):
+    """Slots not to offer after a booking conflict: the rejected ones and the one just taken"""
+    return rejected_slot_pairs(session) + [(session.get('date'), session.get('time'))]
+
+
+def offer_slot_after_conflict(session: SessionData, slots) -> Reply:
+    """The slot was booked by someone else meanwhile: offer the next open one"""
+    doctor_name = session.get('doctor_name', 'the doctor')
+    if not slots:
+        return Reply(
+            f"Sorry, that slot was just booked and {doctor_name} has no other available slots at the moment. "
+            "Please try again later. Thank you!",
+            CLOSE
+        )
+
+    _offer_slot(session, slots[0])
+    return Reply(
+        f"Sorry, that slot was just booked by someone else. {doctor_name} is also available on "
+        f"{slots[0][0]} at {slots[0][1]}. Is that fine?"
+    )
@@ -1,31 +1,262 @@
+import asyncio
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import random
+import threading
 import time
+import weakref
+from dotenv import load_dotenv
+import openai
+from openai import AsyncOpenAI, OpenAI
+from app.metrics import record_llm_call
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize OpenAI client with API key from environment
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+# Overall deadline for one call_llm, retries included (seconds)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Exponential backoff with full jitter: sleep uniform(0, min(max, base * 2**attempt))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "2"))
+# Upper bound on LLM calls in flight per process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Circuit breaker: open after this many consecutive failed calls, retry after reset seconds
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# Errors worth retrying: the provider is slow, unreachable, throttling or failing
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """The LLM was not (or could not be) called: circuit open, busy or out of time"""
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures, letting one trial call through after a pause"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_timeout=LLM_BREAKER_RESET, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """True if a call may proceed; in half-open state only one trial call does"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def cancel(self):
+        """Hand back a trial permit for a call that never reached the provider"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+_client = None
+_client_lock = threading.Lock()
+# Shared by the sync and async clients: both talk to the same provider
+_breaker = CircuitBreaker()
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+# asyncio semaphores belong to the loop that first waits on them: one per loop
+_async_slots_by_loop = weakref.WeakKeyDictionary()
+_async_slots_lock = threading.Lock()
+# So do the async clients' connection pools: one client per loop, created under the lock
+_async_clients_by_loop = weakref.WeakKeyDictionary()
+
+
+def _async_slots():
+    loop = asyncio.get_running_loop()
+    with _async_slots_lock:
+        slots = _async_slots_by_loop.get(loop)
+        if slots is None:
+            slots = _async_slots_by_loop[loop] = asyncio.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+    return slots
+
+
+def _get_client():
+    """OpenAI client, created on first use; retries are handled here, not by the SDK"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
+
+
+def _get_async_client():
+    """AsyncOpenAI client of the running event loop, created on first use there"""
+    loop = asyncio.get_running_loop()
+    with _async_slots_lock:
+        client = _async_clients_by_loop.get(loop)
+        if client is None:
+            client = _async_clients_by_loop[loop] = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return client
+
 
-def call_llm(messages, functions=None):
+def _backoff(attempt):
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+def _build_params(messages, functions):
     params = {
-        "model": "gpt-4o-mini",
+        "model": LLM_MODEL,
         "messages": messages,
         "temperature": 0.7,
         "max_tokens": 1500
     }
-    
+
     if functions:
         params["functions"] = functions
-    
-    max_retries = 2
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(**params)
+    return params
+
+
+def _call_llm(messages, functions=None, timeout=None):
+    params = _build_params(messages, functions)
+    deadline = time.monotonic() + (LLM_TIMEOUT if timeout is None else timeout)
+
+    if not _breaker.allow():
+        raise LLMUnavailableError("LLM circuit breaker is open")
+
+    if not _slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+        # Never reached the provider, so this says nothing about its health
+        _breaker.cancel()
+        raise LLMUnavailableError(f"No LLM concurrency slot free (limit {LLM_MAX_CONCURRENCY})")
+
+    try:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _breaker.record_failure()
+                raise LLMUnavailableError("LLM call deadline exceeded")
+            try:
+                response = _get_client().with_options(timeout=remaining).chat.completions.create(**params)
+            except RETRYABLE_ERRORS:
+                delay = _backoff(attempt)
+                if attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    _breaker.record_failure()
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except openai.APIStatusError:
+                # The provider answered (bad request, auth...): not a reason to trip the breaker
+                _breaker.record_success()
+                raise
+            except Exception:
+                _breaker.cancel()
+                raise
+            _breaker.record_success()
             return response
-        except Exception as e:
-            if attempt == max_retries - 1:
+    finally:
+        _slots.release()
+
+
+async def _acall_llm(messages, functions=None, timeout=None):
+    params = _build_params(messages, functions)
+    deadline = time.monotonic() + (LLM_TIMEOUT if timeout is None else timeout)
+
+    if not _breaker.allow():
+        raise LLMUnavailableError("LLM circuit breaker is open")
+
+    slots = _async_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        _breaker.cancel()
+        raise LLMUnavailableError(f"No LLM concurrency slot free (limit {LLM_MAX_CONCURRENCY})")
+
+    try:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _breaker.record_failure()
+                raise LLMUnavailableError("LLM call deadline exceeded")
+            try:
+                response = await _get_async_client().with_options(timeout=remaining).chat.completions.create(**params)
+            except RETRYABLE_ERRORS:
+                delay = _backoff(attempt)
+                if attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    _breaker.record_failure()
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except openai.APIStatusError:
+                _breaker.record_success()
                 raise
-            time.sleep(1)
\ No newline at end of file
+            except BaseException:
+                # Includes cancellation of the awaiting request
+                _breaker.cancel()
+                raise
+            _breaker.record_success()
+            return response
+    finally:
+        slots.release()
+
+
+def _outcome(error):
+    return "unavailable" if isinstance(error, LLMUnavailableError) else "error"
+
+
+def call_llm(messages, functions=None, timeout=None):
+    started = time.perf_counter()
+    try:
+        response = _call_llm(messages, functions, timeout)
+    except Exception as e:
+        record_llm_call(_outcome(e), time.perf_counter() - started)
+        raise
+    record_llm_call("ok", time.perf_counter() - started, getattr(response, "usage", None))
+    return response
+
+
+async def acall_llm(messages, functions=None, timeout=None):
+    """Async call_llm with the same deadline, retry, breaker and concurrency rules"""
+    started = time.perf_counter()
+    try:
+        response = await _acall_llm(messages, functions, timeout)
+    except Exception as e:
+        record_llm_call(_outcome(e), time.perf_counter() - started)
+        raise
+    record_llm_call("ok", time.perf_counter() - started, getattr(response, "usage", None))
+    return response
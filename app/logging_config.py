@@ -0,0 +1,164 @@
+"""
+Logging setup: records are queued on the calling thread and formatted and
+written by a background listener, so request threads never block on stdout.
+"""
+import atexit
+import contextlib
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-logger overrides, e.g. "app.orchestrator=DEBUG,db=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# "text" or "json"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Fraction of DEBUG records kept (per-turn state, session lookups...)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+# Records waiting for the writer; beyond this they are dropped rather than blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s"
+
+# Session (or request) id of the current turn; asyncio tasks and threads each see their own
+_correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+_listener = None
+
+
+def set_correlation_id(value: str):
+    """Tag log records from the current context with ``value``; returns a reset token"""
+    return _correlation_id.set(value or "-")
+
+
+@contextlib.contextmanager
+def use_correlation_id(value: str):
+    """Tag log records with ``value`` inside the block, then restore the previous id"""
+    token = set_correlation_id(value)
+    try:
+        yield
+    finally:
+        _correlation_id.reset(token)
+
+
+def get_correlation_id() -> str:
+    return _correlation_id.get()
+
+
+class CorrelationFilter(logging.Filter):
+    """Copies the correlation id onto the record while still on the calling thread"""
+
+    def filter(self, record):
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps only a fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate, rand=random.random):
+        super().__init__()
+        self.rate = rate
+        self._rand = rand
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or self._rand() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+# Log arguments that can be queued as they are: immutable, and picklable
+_PLAIN_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of raising"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Queue a copy of the record, unformatted.
+
+        The stock prepare() formats on the calling thread and drops exc_info, so
+        the writer's formatter never saw the exception. Only arguments that are
+        not plain values are resolved into the message here: they could change
+        (or fail to pickle) before the writer gets to them.
+        """
+        record = copy.copy(record)
+        args = record.args.values() if isinstance(record.args, dict) else record.args or ()
+        if not all(isinstance(arg, _PLAIN_ARGS) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> dict:
+    """"app.orchestrator=DEBUG,db=WARNING" -> {"app.orchestrator": "DEBUG", "db": "WARNING"}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(stream=None):
+    """Route the root logger through a queue to a background writer (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(CorrelationFilter())
+    handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
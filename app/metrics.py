@@ -0,0 +1,175 @@
+"""
+Prometheus metrics shared by the sync and async code paths
+"""
+import functools
+import inspect
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+
+# Turn latency spans a fast reply (no I/O) up to several LLM round trips
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STATE_TURN_SECONDS = Histogram(
+    "chatbot_state_turn_seconds",
+    "Time spent handling one turn, by the state it started in",
+    ["state"],
+    buckets=LATENCY_BUCKETS
+)
+STATE_TURNS = Counter(
+    "chatbot_state_turns_total",
+    "Turns handled, by starting state and outcome (ok, conflict, error)",
+    ["state", "outcome"]
+)
+STATE_TRANSITIONS = Counter(
+    "chatbot_state_transitions_total",
+    "State changes made by turns; END means the session was closed",
+    ["source", "target"]
+)
+INVALID_TRANSITIONS = Counter(
+    "chatbot_invalid_transitions_total",
+    "Turns that moved to a state not declared in VALID_TRANSITIONS",
+    ["source", "target"]
+)
+
+
+def record_turn(source: str, target: str, outcome: str, seconds: float, valid: bool = True) -> None:
+    STATE_TURN_SECONDS.labels(source).observe(seconds)
+    STATE_TURNS.labels(source, outcome).inc()
+    if outcome == "ok" and target != source:
+        STATE_TRANSITIONS.labels(source, target).inc()
+    if not valid:
+        INVALID_TRANSITIONS.labels(source, target).inc()
+
+
+LLM_CALL_SECONDS = Histogram(
+    "chatbot_llm_call_seconds",
+    "call_llm / acall_llm duration including retries, by outcome (ok, unavailable, error)",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "chatbot_llm_tokens",
+    "Tokens per LLM call as reported by the provider",
+    ["kind"],
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+)
+DB_CALL_SECONDS = Histogram(
+    "chatbot_db_call_seconds",
+    "Duration of repository functions in db/, cache hits included",
+    ["function"],
+    buckets=LATENCY_BUCKETS
+)
+SESSION_IO_SECONDS = Histogram(
+    "chatbot_session_io_seconds",
+    "Duration of session store loads, saves and clears",
+    ["function"],
+    buckets=LATENCY_BUCKETS
+)
+BOOKING_CONFLICTS = Counter(
+    "chatbot_booking_conflicts_total",
+    "Bookings refused because the slot was taken meanwhile"
+)
+ERRORS = Counter(
+    "chatbot_errors_total",
+    "Exceptions raised by a component (db, session, llm) or turned into an error reply (chat)",
+    ["component"]
+)
+
+
+def timed(histogram, component=None, expected=()):
+    """Decorator observing a function's duration in ``histogram`` under its own name.
+
+    Works for plain and async functions; exceptions other than ``expected`` ones
+    are counted in ERRORS under ``component`` when one is given.
+    """
+    def decorate(fn):
+        name = fn.__name__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    if component and not isinstance(e, expected):
+                        ERRORS.labels(component).inc()
+                    raise
+                finally:
+                    histogram.labels(name).observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if component and not isinstance(e, expected):
+                    ERRORS.labels(component).inc()
+                raise
+            finally:
+                histogram.labels(name).observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorate
+
+
+def record_llm_call(outcome: str, seconds: float, usage=None) -> None:
+    LLM_CALL_SECONDS.labels(outcome).observe(seconds)
+    if outcome != "ok":
+        ERRORS.labels("llm").inc()
+    if usage is not None:
+        for kind in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, kind, None)
+            if value is not None:
+                LLM_TOKENS.labels(kind.split("_")[0]).observe(value)
+
+
+class CacheStatsCollector:
+    """Exports the hit/miss counters the caches already keep, read at scrape time.
+
+    Each source is a stats() callable; ``results`` names the counters to export
+    from its dict (other entries such as sizes are skipped).
+    """
+
+    def __init__(self):
+        self.sources = {}
+
+    def register(self, cache: str, source, results) -> None:
+        self.sources[cache] = (source, results)
+
+    def describe(self):
+        # Nothing up front, so registering does not call the sources
+        return []
+
+    def collect(self):
+        family = CounterMetricFamily(
+            "chatbot_cache_requests",
+            "Cache lookups by cache and result",
+            labels=["cache", "result"]
+        )
+        for cache, (source, results) in list(self.sources.items()):
+            try:
+                counts = source()
+            except Exception:
+                continue
+            for result in results:
+                if result in counts:
+                    family.add_metric([cache, result], counts[result])
+        yield family
+
+
+cache_stats = CacheStatsCollector()
+REGISTRY.register(cache_stats)
+
+
+def register_cache_stats(cache: str, source, results=("hits", "misses")) -> None:
+    """Export counts from ``source()`` as chatbot_cache_requests_total{cache=..., result=...}"""
+    cache_stats.register(cache, source, results)
+
+
+def render_metrics():
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
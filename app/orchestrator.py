@@ -1,276 +1,265 @@
-from app.state import ConversationState
+import contextlib
+import contextvars
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from app import conversation
+from app.conversation import CLOSE, SAVE, Reply
+from app.logging_config import use_correlation_id
+from app.metrics import record_turn
+from app.state import ConversationState, is_valid_transition, validate_state_machine
+from app.session_model import SessionData, SessionConflict
 from app.session_store import load_session, save_session, clear_session
-from app.llm_client import call_llm
-from app.prompts import SYSTEM_PROMPT, SPECIALITY_INFERENCE_PROMPT
-from db.schedule_repo import is_slot_available, get_available_slots
-from db.booking_repo import book_appointment
-from db.doctor_repo import get_doctors_by_speciality
+from app.prompts import SYSTEM_PROMPT
+from app.services.availability_service import install_availability_cache
+from app.services.speciality_service import infer_speciality
+from db.schedule_repo import is_slot_available, get_next_open_slots, get_doctors_with_open_slots, has_open_slot
+from db.booking_repo import book_appointment, BookingStatus
+from db.doctor_repo import get_doctors_by_speciality, find_doctor_by_name
+from db.patient_repo import find_patient_by_phone
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+install_availability_cache()
+
+# Times a turn is re-run when its session was saved concurrently (e.g. a double submit)
+SESSION_CONFLICT_RETRIES = int(os.getenv("SESSION_CONFLICT_RETRIES", "2"))
+
+CONCURRENT_UPDATE_REPLY = (
+    "It looks like that message was already handled in another request. "
+    "Please continue from my latest reply."
+)
+
+RESTART_REPLY = "Let’s start over. Please describe your health issue."
+
+# Side effects already run in the current turn: a turn re-run after a session
+# conflict reuses their results instead of calling the LLM again
+_turn_effects = contextvars.ContextVar("turn_effects", default=None)
+
+# Handler method for each state; the async orchestrator uses the same names
+STATE_HANDLERS = {
+    ConversationState.INIT: "handle_init",
+    ConversationState.COLLECTING_SYMPTOMS: "handle_collecting_symptoms",
+    ConversationState.SELECTING_DOCTOR: "handle_selecting_doctor",
+    ConversationState.OFFERING_ALTERNATIVE_DOCTOR: "handle_alternative_doctor",
+    ConversationState.CHECKING_AVAILABILITY: "handle_availability",
+    ConversationState.COLLECTING_PATIENT_DETAILS: "handle_collecting_patient_details",
+}
+
+
+def check_handlers(orchestrator) -> None:
+    """Fail fast if the handler table, the transitions or the orchestrator's methods disagree"""
+    validate_state_machine(STATE_HANDLERS)
+    missing = [name for name in STATE_HANDLERS.values() if not callable(getattr(orchestrator, name, None))]
+    if missing:
+        raise ValueError(f"{type(orchestrator).__name__} is missing state handlers: {', '.join(missing)}")
+
+
+def state_handler(orchestrator, state: str):
+    """Bound handler for a session state, or None for an unknown or terminal state"""
+    try:
+        name = STATE_HANDLERS.get(ConversationState(state))
+    except ValueError:
+        return None
+    return getattr(orchestrator, name) if name else None
+
+
+@contextlib.contextmanager
+def turn_effects():
+    """Record side effects for the turn (and its re-runs) run inside the block"""
+    token = _turn_effects.set({})
+    try:
+        yield
+    finally:
+        _turn_effects.reset(token)
+
+
+def recalled_effect(name: str):
+    """Result of a side effect already run in this turn, or None"""
+    effects = _turn_effects.get()
+    return effects.get(name) if effects is not None else None
+
+
+def remember_effect(name: str, result):
+    """Keep ``result`` for re-runs of this turn; returns it"""
+    effects = _turn_effects.get()
+    if effects is not None:
+        effects[name] = result
+    return result
+
+
+def session_gone(started_revision, session: SessionData) -> bool:
+    """A session the turn loaded was deleted since: it expired, or another request closed it"""
+    return bool(started_revision) and session.revision == 0
+
+
+def record_state_turn(source: str, session: SessionData, outcome: str, started: float) -> None:
+    """Time and count a turn by its starting state; report undeclared transitions"""
+    target = session['state']
+    valid = True
+    if outcome == "ok":
+        valid = is_valid_transition(ConversationState(source), ConversationState(target))
+        if not valid:
+            logger.warning("Undeclared state transition: %s -> %s", source, target)
+    record_turn(source, target, outcome, time.perf_counter() - started, valid=valid)
+
 
 class ConversationOrchestrator:
 
+    def __init__(self):
+        check_handlers(self)
+
     def handle(self, session_id: str, user_input: str) -> str:
+        """Run one turn; re-run it on a fresh session if a concurrent save got there first"""
+        with use_correlation_id(session_id), turn_effects():
+            started_in = started_revision = None
+            for attempt in range(SESSION_CONFLICT_RETRIES + 1):
+                session = load_session(session_id)
+                if started_in is not None:
+                    if session_gone(started_revision, session):
+                        return self.restart(session_id, session)
+                    if session['state'] != started_in:
+                        # The other request already moved the conversation on: replaying this
+                        # message against the new state would misread it
+                        return CONCURRENT_UPDATE_REPLY
+                started_in, started_revision = session['state'], session.revision
+                try:
+                    return self.dispatch(session_id, session, user_input)
+                except SessionConflict as e:
+                    logger.info("Session conflict on attempt %d: %s", attempt + 1, e)
+            return CONCURRENT_UPDATE_REPLY
 
-        session = load_session(session_id)
+    def restart(self, session_id: str, session: SessionData) -> str:
+        """Tell the user their session ended (not a concurrent update) and start a new one"""
+        try:
+            return self.respond(session_id, session, conversation.session_ended(session))
+        except SessionConflict:
+            return CONCURRENT_UPDATE_REPLY
+
+    def dispatch(self, session_id: str, session: SessionData, user_input: str) -> str:
         state = session['state']
-        print(f"Current State in orchestrator: {state}")
-        if state == ConversationState.INIT.value:
-            return self.handle_init(session_id, session)
-        
-        if state == ConversationState.COLLECTING_SYMPTOMS.value:
-            return self.handle_collecting_symptoms(session_id, session, user_input)
-        
-        if state == ConversationState.SELECTING_DOCTOR.value:
-            return self.handle_selecting_doctor(session_id, session, user_input)
-        
-        if state == ConversationState.OFFERING_ALTERNATIVE_DOCTOR.value:
-            return self.handle_alternative_doctor(session_id, session, user_input)
-        
-        if state == ConversationState.CHECKING_AVAILABILITY.value:
-            return self.handle_availability(session_id, session, user_input)
-        
-        if state == ConversationState.COLLECTING_PATIENT_DETAILS.value:
-            return self.handle_collecting_patient_details(session_id, session, user_input)
-        
-        if state == ConversationState.BOOKED.value:
-            return self.handle_booking_complete(session_id, session, user_input)
-        
-        session['state'] = ConversationState.INIT.value
-        save_session(session_id, session)
-        return "Let’s start over. Please describe your health issue."
-    
-    def handle_init(self, session_id: str, session: dict) -> str:
-        session['state'] = ConversationState.COLLECTING_SYMPTOMS.value
-        save_session(session_id, session)
-        return "Hello! Please describe your health issue?."
-    
-    def handle_collecting_symptoms(self, session_id: str, session: dict, user_input: str) -> str:
-        session['symptoms'] = user_input
-        # Use specialized prompt to infer medical specialty
-        messages = [
-            {"role":"system", "content":SPECIALITY_INFERENCE_PROMPT},
-            {"role":"user", "content": user_input}
-            ]
-        response = call_llm(messages)
-        speciality = response.choices[0].message.content.strip()
-        
-        # Validate specialty - should be reasonable length and contain only letters/spaces
-        if not speciality or len(speciality) > 50 or not all(c.isalpha() or c.isspace() for c in speciality):
-            print(f" Invalid LLM output: '{speciality}', defaulting to General Medicine")
-            speciality = "General Medicine"
-        
-        print(f"======Inferred speciality: {speciality}")
-        session['speciality'] = speciality
-        
-        # Get doctors by specialty from database
-        doctors = get_doctors_by_speciality(speciality)
-        if not doctors:
-            # No doctors for this specialty
-            clear_session(session_id)
-            return f"Sorry, we don't have any {speciality} specialists available at the moment. Please try again later."
-        
-        # Check if any doctor has available slots
-        has_available_slots = False
-        for doc in doctors:
-            slots = get_available_slots(doc[0])  # doc[0] is doctor_id
-            if slots:
-                has_available_slots = True
-                break
-        
-        if not has_available_slots:
-            # Doctors exist but no slots available
-            clear_session(session_id)
-            return f"Sorry, all our {speciality} specialists are fully booked at the moment. Please try again later. Thank you!"
-        
-        # Format doctor names for display
-        doctor_names = " / ".join([doc[1] for doc in doctors])
-        session['state'] = ConversationState.SELECTING_DOCTOR.value
-        save_session(session_id, session)
-        return f"Thank you. Which doctor would you like to meet? ({doctor_names})"
-    
-    def handle_selecting_doctor(self, session_id: str, session: dict, user_input: str) -> str:
-        session['doctor_name'] = user_input
-        
-        # Get doctor_id from database
-        doctors = get_doctors_by_speciality(session.get('speciality', ''))
-        print(f"Doctors fetched for speciality {session.get('speciality', '')}: {doctors}") 
-        doctor_id = None
-        for doc in doctors:
-            if doc[1] == user_input:  # doc[1] is the name
-                doctor_id = doc[0]  # doc[0] is the id
-                break
-        
-        if not doctor_id:
-            return f"Sorry, I couldn't find {user_input}. Please select a valid doctor."
-        
-        session['doctor_id'] = doctor_id
-        
-        # Get available slots for this doctor
-        available_slots = get_available_slots(doctor_id)
-        
-        if not available_slots:
-            # Check if there are other doctors with slots
-            other_doctors = [doc for doc in doctors if doc[0] != doctor_id]
-            doctors_with_slots = []
-            
-            for doc in other_doctors:
-                slots = get_available_slots(doc[0])
-                if slots:
-                    doctors_with_slots.append(doc)
-            
-            if doctors_with_slots:
-                # Offer alternative doctors
-                session['alternative_doctors'] = [(doc[0], doc[1]) for doc in doctors_with_slots]
-                session['state'] = ConversationState.OFFERING_ALTERNATIVE_DOCTOR.value
-                save_session(session_id, session)
-                
-                alt_names = ", ".join([doc[1] for doc in doctors_with_slots])
-                return f"Sorry, {user_input} has no available slots at the moment. However, we have other doctors available: {alt_names}. Would you like to proceed with one of them? (yes/no)"
-            else:
-                # No alternative doctors available
-                clear_session(session_id)
-                return f"Sorry, {user_input} and all other {session.get('speciality', '')} specialists are fully booked. Please try again later. Thank you!"
-        
-        # Use the first available slot
-        first_slot = available_slots[0]
-        session['date'] = str(first_slot[0])  # schedule_date
-        session['time'] = str(first_slot[1])  # start_time
-        
-        session['state'] = ConversationState.CHECKING_AVAILABILITY.value
-        save_session(session_id, session)
-        
-        return f"{user_input} is available on {first_slot[0]} at {first_slot[1]}. Is that fine?"
-    
-    def handle_alternative_doctor(self, session_id: str, session: dict, user_input: str) -> str:
-        """Handle user response to alternative doctor offer"""
-        if user_input.lower() in ['yes', 'y', 'ok', 'sure']:
-            # User wants to see alternative doctors
-            alternative_doctors = session.get('alternative_doctors', [])
-            if not alternative_doctors:
-                clear_session(session_id)
-                return "Sorry, no alternative doctors available. Please try again later."
-            
-            # If only one alternative, auto-select it
-            if len(alternative_doctors) == 1:
-                doctor_id = alternative_doctors[0][0]
-                doctor_name = alternative_doctors[0][1]
-                
-                session['doctor_id'] = doctor_id
-                session['doctor_name'] = doctor_name
-                
-                # Get available slots for this doctor
-                available_slots = get_available_slots(doctor_id)
-                
-                if not available_slots:
-                    clear_session(session_id)
-                    return f"Sorry, {doctor_name} has no available slots at the moment. Please try again later. Thank you!"
-                
-                # Use the first available slot
-                first_slot = available_slots[0]
-                session['date'] = str(first_slot[0])
-                session['time'] = str(first_slot[1])
-                
-                session['state'] = ConversationState.CHECKING_AVAILABILITY.value
-                save_session(session_id, session)
-                
-                return f"Great! {doctor_name} is available on {first_slot[0]} at {first_slot[1]}. Is that fine?"
-            else:
-                # Multiple alternatives - ask user to choose
-                alt_names = " / ".join([doc[1] for doc in alternative_doctors])
-                session['state'] = ConversationState.SELECTING_DOCTOR.value
-                save_session(session_id, session)
-                return f"Please select from: {alt_names}"
-        else:
-            # User doesn't want alternative, close session
-            clear_session(session_id)
-            return "Thank you for contacting us. Please try again later. Have a great day!"
-    
-    def handle_availability(self, session_id: str, session: dict, user_input: str) -> str:
-        if user_input.lower() in ['yes', 'y', 'ok', 'fine', 'sure']:
-            session['state'] = ConversationState.COLLECTING_PATIENT_DETAILS.value
+        logger.debug("Current state: %s", state)
+        handler = state_handler(self, state)
+        if handler is None:
+            session['state'] = ConversationState.INIT.value
+            save_session(session_id, session)
+            return RESTART_REPLY
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            reply = handler(session_id, session, user_input)
+            outcome = "ok"
+            return reply
+        except SessionConflict:
+            outcome = "conflict"
+            raise
+        finally:
+            record_state_turn(state, session, outcome, started)
+
+    def close_session(self, session_id: str, session: SessionData, force: bool = False) -> None:
+        """End the conversation: the session is deleted, the turn is recorded as moving to END.
+
+        The delete is a compare-and-set on the loaded revision (SessionConflict if
+        another request saved the session meanwhile), unless ``force``.
+        """
+        session['state'] = ConversationState.END.value
+        clear_session(session_id, None if force else session.revision)
+
+    def respond(self, session_id: str, session: SessionData, reply: Reply) -> str:
+        """Save or close the session as ``reply`` asks; returns its text"""
+        if reply.session == CLOSE:
+            self.close_session(session_id, session)
+        elif reply.session == SAVE:
             save_session(session_id, session)
-            return "Great! May I have your name and contact number?"
-        else:
-            # User declined the offered slot, check for other slots
-            doctor_id = session.get('doctor_id')
-            doctor_name = session.get('doctor_name', 'the doctor')
-            current_date = session.get('date')
-            current_time = session.get('time')
-            
-            if not doctor_id:
-                clear_session(session_id)
-                return "Sorry, something went wrong. Please start over."
-            
-            # Track rejected slots
-            if 'rejected_slots' not in session:
-                session['rejected_slots'] = []
-            
-            # Add current slot to rejected list
-            if current_date and current_time:
-                rejected_slot = f"{current_date}|{current_time}"
-                if rejected_slot not in session['rejected_slots']:
-                    session['rejected_slots'].append(rejected_slot)
-            
-            # Get all available slots for this doctor
-            available_slots = get_available_slots(doctor_id)
-            
-            # Filter out all rejected slots
-            other_slots = []
-            for slot in available_slots:
-                slot_key = f"{str(slot[0])}|{str(slot[1])}"
-                if slot_key not in session['rejected_slots']:
-                    other_slots.append(slot)
-            
-            if other_slots:
-                # Offer the next available slot
-                next_slot = other_slots[0]
-                session['date'] = str(next_slot[0])
-                session['time'] = str(next_slot[1])
-                save_session(session_id, session)
-                
-                return f"How about {next_slot[0]} at {next_slot[1]}? Is that fine?"
-            else:
-                # No other slots available
-                clear_session(session_id)
-                return f"Sorry, {doctor_name} has no other available slots at the moment. Please try again later or start a new booking. Thank you!"
-    
-    
-
-    
-    def handle_collecting_patient_details(self, session_id: str, session: dict, user_input: str) -> str:
-        # Parse patient details (simple implementation - could be improved with regex)
-        parts = user_input.split()
-        if len(parts) >= 2:
-            # Assume last part is phone, rest is name
-            session['phone'] = parts[-1]
-            session['patient_name'] = ' '.join(parts[:-1])
-        else:
-            session['patient_name'] = user_input
-        
-        # Get booking details for confirmation message
-        doctor_name = session.get('doctor_name', 'the doctor')
+        return reply.text
+
+    def handle_init(self, session_id: str, session: SessionData, user_input: str) -> str:
+        return self.respond(session_id, session, conversation.start(session))
+
+    def handle_collecting_symptoms(self, session_id: str, session: SessionData, user_input: str) -> str:
+        # Infer medical specialty (cached per normalized symptom text)
+        speciality = recalled_effect("speciality") or remember_effect("speciality", infer_speciality(user_input))
+        logger.debug("Inferred speciality: %s", speciality)
+        conversation.record_symptoms(session, user_input, speciality)
+
+        doctors = get_doctors_by_speciality(speciality)
+        # Single query for the whole list
+        any_open = bool(doctors) and has_open_slot(conversation.doctor_ids(doctors))
+        return self.respond(session_id, session, conversation.offer_doctors(session, doctors, any_open))
+
+    def handle_selecting_doctor(self, session_id: str, session: SessionData, user_input: str) -> str:
         speciality = session.get('speciality', '')
+
+        # Look the doctor up by normalized name in the doctor directory
+        doctor = find_doctor_by_name(user_input, speciality)
+        if not doctor:
+            return self.respond(session_id, session, conversation.unknown_doctor(user_input))
+        conversation.choose_doctor(session, doctor)
+
+        available_slots = get_next_open_slots(doctor[0])
+        if available_slots:
+            return self.respond(session_id, session, conversation.offer_first_slot(session, available_slots[0]))
+
+        # Fully booked: look for colleagues with open slots
+        others = conversation.other_doctors(get_doctors_by_speciality(speciality), doctor[0])
+        open_ids = get_doctors_with_open_slots(conversation.doctor_ids(others))
+        doctors_with_slots = [doc for doc in others if doc[0] in open_ids]
+        return self.respond(session_id, session, conversation.offer_alternative_doctors(session, doctors_with_slots))
+
+    def handle_alternative_doctor(self, session_id: str, session: SessionData, user_input: str) -> str:
+        """Handle user response to alternative doctor offer"""
+        if not conversation.accepts_alternative(user_input):
+            return self.respond(session_id, session, conversation.decline_alternatives())
+
+        alternative_doctors = session.get('alternative_doctors', [])
+        if len(alternative_doctors) != 1:
+            return self.respond(session_id, session, conversation.list_alternatives(session))
+
+        # A single alternative is selected for the patient
+        conversation.choose_doctor(session, alternative_doctors[0])
+        available_slots = get_next_open_slots(alternative_doctors[0][0])
+        return self.respond(session_id, session, conversation.offer_alternative_slot(session, available_slots))
+
+    def handle_availability(self, session_id: str, session: SessionData, user_input: str) -> str:
+        if conversation.accepts_slot(user_input):
+            return self.respond(session_id, session, conversation.ask_patient_details(session))
+
+        # User declined the offered slot, check for other slots
         doctor_id = session.get('doctor_id')
-        date = session.get('date')
-        time = session.get('time')
-        
+        if not doctor_id:
+            return self.respond(session_id, session, conversation.missing_doctor())
+
+        after, exclude = conversation.decline_slot(session)
+        other_slots = get_next_open_slots(doctor_id, after=after, exclude=exclude)
+        return self.respond(session_id, session, conversation.offer_next_slot(session, other_slots))
+
+    def handle_collecting_patient_details(self, session_id: str, session: SessionData, user_input: str) -> str:
+        # Parse patient details: a trailing phone number, the rest is the name
+        name, phone = conversation.parse_patient_details(user_input)
+        patient = find_patient_by_phone(phone) if conversation.needs_patient_lookup(name, phone) else None
+        reply = conversation.record_patient_details(session, user_input, name, phone, patient)
+        if reply is not None:
+            return self.respond(session_id, session, reply)
+
         # Book the appointment in database
         try:
-            book_appointment(
-                doctor_id=doctor_id,
-                patient_name=session['patient_name'],
-                phone=session['phone'],
-                date=date,
-                time=time
-            )
+            status = book_appointment(**conversation.booking_request(session))
         except Exception as e:
-            return f"Sorry, there was an error booking your appointment: {str(e)}"
-        
-        # Clear the current session completely
-        clear_session(session_id)
-        
-        return f"Perfect! Your appointment with {doctor_name} ({speciality}) is confirmed for {date} at {time}. You'll receive a confirmation shortly. Thank you for choosing Super Clinic!\n\nYour session has been closed. Start a new conversation to book another appointment."
-    
-    
-    
-    
-    
\ No newline at end of file
+            raise conversation.BookingFailed(e) from e
+
+        if status is BookingStatus.SLOT_TAKEN:
+            return self.handle_slot_taken(session_id, session)
+        # The appointment exists whatever happened to the session meanwhile: a re-run
+        # of this turn would try to book the slot again
+        reply = conversation.booking_confirmed(session)
+        self.close_session(session_id, session, force=True)
+        return reply.text
+
+    def handle_slot_taken(self, session_id: str, session: SessionData) -> str:
+        """The slot was booked by someone else meanwhile: offer the next open one"""
+        next_slots = get_next_open_slots(session.get('doctor_id'), exclude=conversation.taken_slot_exclusions(session))
+        return self.respond(session_id, session, conversation.offer_slot_after_conflict(session, next_slots))
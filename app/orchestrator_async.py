@@ -0,0 +1,164 @@
+import logging
+import time
+from app.logging_config import use_correlation_id
+from app import conversation
+from app.conversation import CLOSE, SAVE, Reply
+from app.state import ConversationState
+from app.orchestrator import (
+    CONCURRENT_UPDATE_REPLY, RESTART_REPLY, SESSION_CONFLICT_RETRIES, check_handlers, recalled_effect,
+    record_state_turn, remember_effect, session_gone, state_handler, turn_effects
+)
+from app.session_model import SessionData, SessionConflict
+from app.session_store import aload_session, asave_session, aclear_session
+from app.services.speciality_service import ainfer_speciality
+from db.schedule_repo import aget_next_open_slots, aget_doctors_with_open_slots, ahas_open_slot
+from db.booking_repo import abook_appointment, BookingStatus
+from db.doctor_repo import aget_doctors_by_speciality, afind_doctor_by_name
+from db.patient_repo import afind_patient_by_phone
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConversationOrchestrator:
+    """Async twin of ConversationOrchestrator: same states and replies, non-blocking I/O.
+
+    LLM, database and session calls are awaited, so one event loop can hold many
+    conversations while they wait on the LLM.
+    """
+
+    def __init__(self):
+        check_handlers(self)
+
+    async def handle(self, session_id: str, user_input: str) -> str:
+        """Run one turn; re-run it on a fresh session if a concurrent save got there first"""
+        with use_correlation_id(session_id), turn_effects():
+            started_in = started_revision = None
+            for attempt in range(SESSION_CONFLICT_RETRIES + 1):
+                session = await aload_session(session_id)
+                if started_in is not None:
+                    if session_gone(started_revision, session):
+                        return await self.restart(session_id, session)
+                    if session['state'] != started_in:
+                        return CONCURRENT_UPDATE_REPLY
+                started_in, started_revision = session['state'], session.revision
+                try:
+                    return await self.dispatch(session_id, session, user_input)
+                except SessionConflict as e:
+                    logger.info("Session conflict on attempt %d: %s", attempt + 1, e)
+            return CONCURRENT_UPDATE_REPLY
+
+    async def restart(self, session_id: str, session: SessionData) -> str:
+        try:
+            return await self.respond(session_id, session, conversation.session_ended(session))
+        except SessionConflict:
+            return CONCURRENT_UPDATE_REPLY
+
+    async def dispatch(self, session_id: str, session: SessionData, user_input: str) -> str:
+        state = session['state']
+        logger.debug("Current state: %s", state)
+        handler = state_handler(self, state)
+        if handler is None:
+            session['state'] = ConversationState.INIT.value
+            await asave_session(session_id, session)
+            return RESTART_REPLY
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            reply = await handler(session_id, session, user_input)
+            outcome = "ok"
+            return reply
+        except SessionConflict:
+            outcome = "conflict"
+            raise
+        finally:
+            record_state_turn(state, session, outcome, started)
+
+    async def close_session(self, session_id: str, session: SessionData, force: bool = False) -> None:
+        session['state'] = ConversationState.END.value
+        await aclear_session(session_id, None if force else session.revision)
+
+    async def respond(self, session_id: str, session: SessionData, reply: Reply) -> str:
+        if reply.session == CLOSE:
+            await self.close_session(session_id, session)
+        elif reply.session == SAVE:
+            await asave_session(session_id, session)
+        return reply.text
+
+    async def handle_init(self, session_id: str, session: SessionData, user_input: str) -> str:
+        return await self.respond(session_id, session, conversation.start(session))
+
+    async def handle_collecting_symptoms(self, session_id: str, session: SessionData, user_input: str) -> str:
+        speciality = recalled_effect("speciality") or remember_effect("speciality", await ainfer_speciality(user_input))
+        logger.debug("Inferred speciality: %s", speciality)
+        conversation.record_symptoms(session, user_input, speciality)
+
+        doctors = await aget_doctors_by_speciality(speciality)
+        any_open = bool(doctors) and await ahas_open_slot(conversation.doctor_ids(doctors))
+        return await self.respond(session_id, session, conversation.offer_doctors(session, doctors, any_open))
+
+    async def handle_selecting_doctor(self, session_id: str, session: SessionData, user_input: str) -> str:
+        speciality = session.get('speciality', '')
+
+        doctor = await afind_doctor_by_name(user_input, speciality)
+        if not doctor:
+            return await self.respond(session_id, session, conversation.unknown_doctor(user_input))
+        conversation.choose_doctor(session, doctor)
+
+        available_slots = await aget_next_open_slots(doctor[0])
+        if available_slots:
+            return await self.respond(session_id, session, conversation.offer_first_slot(session, available_slots[0]))
+
+        others = conversation.other_doctors(await aget_doctors_by_speciality(speciality), doctor[0])
+        open_ids = await aget_doctors_with_open_slots(conversation.doctor_ids(others))
+        doctors_with_slots = [doc for doc in others if doc[0] in open_ids]
+        return await self.respond(session_id, session, conversation.offer_alternative_doctors(session, doctors_with_slots))
+
+    async def handle_alternative_doctor(self, session_id: str, session: SessionData, user_input: str) -> str:
+        """Handle user response to alternative doctor offer"""
+        if not conversation.accepts_alternative(user_input):
+            return await self.respond(session_id, session, conversation.decline_alternatives())
+
+        alternative_doctors = session.get('alternative_doctors', [])
+        if len(alternative_doctors) != 1:
+            return await self.respond(session_id, session, conversation.list_alternatives(session))
+
+        conversation.choose_doctor(session, alternative_doctors[0])
+        available_slots = await aget_next_open_slots(alternative_doctors[0][0])
+        return await self.respond(session_id, session, conversation.offer_alternative_slot(session, available_slots))
+
+    async def handle_availability(self, session_id: str, session: SessionData, user_input: str) -> str:
+        if conversation.accepts_slot(user_input):
+            return await self.respond(session_id, session, conversation.ask_patient_details(session))
+
+        doctor_id = session.get('doctor_id')
+        if not doctor_id:
+            return await self.respond(session_id, session, conversation.missing_doctor())
+
+        after, exclude = conversation.decline_slot(session)
+        other_slots = await aget_next_open_slots(doctor_id, after=after, exclude=exclude)
+        return await self.respond(session_id, session, conversation.offer_next_slot(session, other_slots))
+
+    async def handle_collecting_patient_details(self, session_id: str, session: SessionData, user_input: str) -> str:
+        name, phone = conversation.parse_patient_details(user_input)
+        patient = await afind_patient_by_phone(phone) if conversation.needs_patient_lookup(name, phone) else None
+        reply = conversation.record_patient_details(session, user_input, name, phone, patient)
+        if reply is not None:
+            return await self.respond(session_id, session, reply)
+
+        try:
+            status = await abook_appointment(**conversation.booking_request(session))
+        except Exception as e:
+            raise conversation.BookingFailed(e) from e
+
+        if status is BookingStatus.SLOT_TAKEN:
+            return await self.handle_slot_taken(session_id, session)
+        # Booked: close whatever happened to the session meanwhile, a re-run would book again
+        reply = conversation.booking_confirmed(session)
+        await self.close_session(session_id, session, force=True)
+        return reply.text
+
+    async def handle_slot_taken(self, session_id: str, session: SessionData) -> str:
+        """The slot was booked by someone else meanwhile: offer the next open one"""
+        next_slots = await aget_next_open_slots(session.get('doctor_id'), exclude=conversation.taken_slot_exclusions(session))
+        return await self.respond(session_id, session, conversation.offer_slot_after_conflict(session, next_slots))
@@ -0,0 +1,61 @@
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+from app.cache import make_cache, _redis_client
+from app.metrics import register_cache_stats
+from db import schedule_repo
+from db.availability_cache import AvailabilityCache, LocalGenerations, RedisGenerations, dump_entry, load_entry
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Availability cache configuration: "memory", "redis" or "off"
+AVAILABILITY_CACHE = os.getenv("AVAILABILITY_CACHE", "memory").lower()
+AVAILABILITY_CACHE_TTL = int(os.getenv("AVAILABILITY_CACHE_TTL", "30"))
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", "2048"))
+
+# Generations must be shared for a booking in one worker to reach the others
+_SHARED_GENERATIONS = AVAILABILITY_CACHE == "redis" or os.getenv("USE_REDIS", "false").lower() == "true"
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def _generations():
+    if not _SHARED_GENERATIONS:
+        return LocalGenerations()
+    try:
+        return RedisGenerations(_redis_client(), _redis_client(asyncio=True))
+    except Exception as e:
+        logger.error("Failed to connect availability generations to Redis, other workers will not see invalidations: %s", e)
+        return LocalGenerations()
+
+
+def make_availability_cache():
+    """AvailabilityCache from the AVAILABILITY_CACHE settings; None when disabled"""
+    cache = make_cache(
+        AVAILABILITY_CACHE,
+        "availability",
+        maxsize=AVAILABILITY_CACHE_SIZE,
+        ttl=AVAILABILITY_CACHE_TTL,
+        dumps=dump_entry,
+        loads=load_entry
+    )
+    if cache is None:
+        return None
+    return AvailabilityCache(cache, _generations())
+
+
+def install_availability_cache():
+    """Give db.schedule_repo its availability cache; later calls do nothing"""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        _installed = True
+        cache = make_availability_cache()
+        if cache is not None:
+            schedule_repo.set_availability_cache(cache)
+            register_cache_stats("availability", cache.stats, results=("hits", "misses", "stale"))
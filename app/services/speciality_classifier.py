@@ -0,0 +1,127 @@
+"""
+Offline specialty classifier used as a fast path before the LLM.
+
+Symptom text is turned into a bag of unigram and bigram features and scored
+against a weighted keyword vector per specialty (a sparse dot product). The
+confidence combines how dominant the best specialty is with how much evidence
+was found, so a single weak keyword never counts as a confident answer.
+
+Words in the scope of a simple negation ("no chest pain", "without fever",
+"I don't have a rash") are left out: the scope runs from the negation word to
+the end of its clause, a contrast word ("but") or NEGATION_WINDOW words.
+"""
+import re
+
+DEFAULT_SPECIALITY = "General Medicine"
+
+# Score at which the evidence for a specialty counts as conclusive
+EVIDENCE_SATURATION = 2.0
+
+SPECIALITY_KEYWORDS = {
+    "Orthopedics": {
+        "bone": 2.0, "bones": 2.0, "joint": 2.0, "joints": 2.0, "knee": 2.0, "knees": 2.0,
+        "hip": 1.5, "ankle": 2.0, "shoulder": 1.5, "elbow": 1.5, "wrist": 1.5, "spine": 2.0,
+        "back pain": 2.0, "neck pain": 1.5, "fracture": 2.5, "fractured": 2.5, "broken": 1.5,
+        "sprain": 2.5, "sprained": 2.5, "arthritis": 2.5, "ligament": 2.5, "tendon": 2.0,
+        "muscle": 1.5, "sports injury": 2.5, "dislocated": 2.5, "slipped disc": 2.5,
+    },
+    "Dermatology": {
+        "skin": 2.0, "rash": 2.5, "rashes": 2.5, "acne": 2.5, "pimples": 2.5, "eczema": 2.5,
+        "psoriasis": 2.5, "itchy": 1.5, "itching": 1.5, "hives": 2.5, "mole": 2.0,
+        "moles": 2.0, "hair loss": 2.5, "dandruff": 2.5, "nail": 1.5, "nails": 1.5,
+        "blister": 2.0, "blisters": 2.0, "wart": 2.5, "warts": 2.5, "sunburn": 2.5,
+    },
+    "Cardiology": {
+        "heart": 2.5, "chest pain": 2.5, "palpitations": 2.5, "blood pressure": 2.5,
+        "hypertension": 2.5, "bp": 1.5, "cholesterol": 2.0, "heartbeat": 2.0,
+        "heart attack": 3.0, "irregular heartbeat": 3.0, "chest tightness": 2.5,
+    },
+    "Neurology": {
+        "headache": 1.5, "headaches": 1.5, "migraine": 2.5, "migraines": 2.5, "seizure": 3.0,
+        "seizures": 3.0, "epilepsy": 3.0, "numbness": 2.0, "tingling": 2.0, "dizziness": 1.5,
+        "dizzy": 1.5, "vertigo": 2.0, "tremor": 2.5, "tremors": 2.5, "memory loss": 2.5,
+        "stroke": 3.0, "fainting": 1.5, "nerve": 2.0,
+    },
+    "Pediatrics": {
+        "child": 3.0, "children": 3.0, "kid": 3.0, "kids": 3.0, "baby": 3.0, "infant": 3.0,
+        "toddler": 3.0, "newborn": 3.0, "son": 2.0, "daughter": 2.0, "vaccination": 1.5,
+    },
+    "General Medicine": {
+        "fever": 2.0, "cold": 2.0, "flu": 2.5, "cough": 2.0, "sore throat": 2.0,
+        "runny nose": 2.0, "fatigue": 1.5, "tired": 1.0, "weakness": 1.5, "vomiting": 1.5,
+        "nausea": 1.5, "diarrhea": 1.5, "stomach": 1.5, "checkup": 2.0, "check up": 2.0,
+        "body ache": 2.0, "body aches": 2.0, "headache": 1.0, "chills": 1.5,
+    },
+}
+
+# Negation cues after normalization; "don't", "isn't"... become "don t", "isn t"
+NEGATION_CUES = {"no", "not", "without", "never", "nor", "denies", "denied", "deny", "t"}
+# Words that end a negation's scope early
+NEGATION_TERMINATORS = {"but", "however", "although", "though", "except", "apart"}
+# Words after a cue that are negated, at most
+NEGATION_WINDOW = 4
+
+_NON_WORD = re.compile(r"[\W_]+")
+_CLAUSE_BREAK = re.compile(r"[.,;:!?\n]+")
+
+
+def normalize_symptoms(text: str) -> str:
+    """Case, whitespace and punctuation folded form of a symptom description"""
+    return " ".join(_NON_WORD.sub(" ", text.casefold()).split())
+
+
+def _build_index(keywords):
+    """feature -> [(specialty index, weight)], the columns of the weight matrix"""
+    index = {}
+    for position, terms in enumerate(keywords.values()):
+        for term, weight in terms.items():
+            index.setdefault(term, []).append((position, weight))
+    return index
+
+
+_SPECIALITIES = list(SPECIALITY_KEYWORDS)
+_INDEX = _build_index(SPECIALITY_KEYWORDS)
+
+
+def _negated(words):
+    """Per word, whether it falls in the scope of a negation cue"""
+    flags = []
+    remaining = 0
+    for word in words:
+        if word in NEGATION_CUES:
+            remaining = NEGATION_WINDOW
+            flags.append(True)
+            continue
+        if word in NEGATION_TERMINATORS:
+            remaining = 0
+        flags.append(remaining > 0)
+        remaining = max(0, remaining - 1)
+    return flags
+
+
+def _features(text: str):
+    features = set()
+    # Clauses are split before normalizing, which drops the punctuation
+    for clause in _CLAUSE_BREAK.split(text):
+        words = normalize_symptoms(clause).split()
+        kept = [None if negated else word for word, negated in zip(words, _negated(words))]
+        features.update(word for word in kept if word)
+        features.update(f"{a} {b}" for a, b in zip(kept, kept[1:]) if a and b)
+    return features
+
+
+def classify(text: str):
+    """Best specialty for a symptom description and a confidence in [0, 1]"""
+    scores = [0.0] * len(_SPECIALITIES)
+    for feature in _features(text):
+        for position, weight in _INDEX.get(feature, ()):
+            scores[position] += weight
+
+    total = sum(scores)
+    if total == 0:
+        return DEFAULT_SPECIALITY, 0.0
+
+    best = max(range(len(scores)), key=scores.__getitem__)
+    share = scores[best] / total
+    strength = min(1.0, scores[best] / EVIDENCE_SATURATION)
+    return _SPECIALITIES[best], share * strength
@@ -0,0 +1,252 @@
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+from app.cache import TTLCache, RedisCache
+from app.llm_client import call_llm, acall_llm
+from app.metrics import register_cache_stats
+from app.prompts import SPECIALITY_INFERENCE_PROMPT
+from app.singleflight import SingleFlight, AsyncSingleFlight
+from app.services.speciality_classifier import DEFAULT_SPECIALITY, classify, normalize_symptoms
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Specialty inference cache: "memory" (LRU only), "redis" (LRU + Redis) or "off"
+SPECIALITY_CACHE = os.getenv("SPECIALITY_CACHE", "memory").lower()
+SPECIALITY_CACHE_SIZE = int(os.getenv("SPECIALITY_CACHE_SIZE", "4096"))
+SPECIALITY_CACHE_TTL = int(os.getenv("SPECIALITY_CACHE_TTL", "86400"))
+
+# Local classifier answers at or above this confidence skip the LLM (above 1 disables it)
+SPECIALITY_CLASSIFIER_THRESHOLD = float(os.getenv("SPECIALITY_CLASSIFIER_THRESHOLD", "0.6"))
+
+
+class SpecialityCache:
+    """Two-tier cache of inferred specialties: in-process LRU, then optional Redis"""
+
+    def __init__(self, local, remote=None):
+        self.local = local
+        self.remote = remote
+        self.hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        # Lookups run on many request threads at once
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        speciality = self.local.get(key)
+        if speciality is not None:
+            self._count("hits")
+            return speciality
+        if self.remote is not None:
+            speciality = self.remote.get(key)
+            if speciality is not None:
+                self._count("remote_hits")
+                self.local.set(key, speciality)
+                return speciality
+        self._count("misses")
+        return None
+
+    def set(self, key, speciality):
+        self.local.set(key, speciality)
+        if self.remote is not None:
+            self.remote.set(key, speciality)
+
+    async def aget(self, key):
+        speciality = self.local.get(key)
+        if speciality is not None:
+            self._count("hits")
+            return speciality
+        if self.remote is not None:
+            speciality = await self.remote.aget(key)
+            if speciality is not None:
+                self._count("remote_hits")
+                self.local.set(key, speciality)
+                return speciality
+        self._count("misses")
+        return None
+
+    async def aset(self, key, speciality):
+        self.local.set(key, speciality)
+        if self.remote is not None:
+            await self.remote.aset(key, speciality)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "remote_hits": self.remote_hits, "misses": self.misses}
+
+
+def _build_cache():
+    if SPECIALITY_CACHE == "off":
+        return None
+    local = TTLCache(maxsize=SPECIALITY_CACHE_SIZE, ttl=SPECIALITY_CACHE_TTL)
+    remote = None
+    if SPECIALITY_CACHE == "redis":
+        try:
+            remote = RedisCache("speciality", ttl=SPECIALITY_CACHE_TTL, dumps=str, loads=str)
+        except Exception as e:
+            logger.warning("Failed to initialize Redis speciality cache, using in-memory only: %s", e)
+    return SpecialityCache(local, remote)
+
+
+_cache = _build_cache()
+
+
+def _is_valid_speciality(speciality: str) -> bool:
+    # Should be reasonable length and contain only letters/spaces
+    return bool(speciality) and len(speciality) <= 50 and all(c.isalpha() or c.isspace() for c in speciality)
+
+
+def _inference_messages(symptoms: str):
+    return [
+        {"role": "system", "content": SPECIALITY_INFERENCE_PROMPT},
+        {"role": "user", "content": symptoms}
+    ]
+
+
+def _speciality_from_response(response):
+    """The specialty the LLM answered, or None if its output is not a plausible specialty"""
+    speciality = response.choices[0].message.content.strip()
+
+    if not _is_valid_speciality(speciality):
+        logger.warning("Invalid LLM output %r, defaulting to %s", speciality, DEFAULT_SPECIALITY)
+        return None
+    return speciality
+
+
+def infer_speciality_with_llm(symptoms: str) -> str:
+    """Ask the LLM for the specialty, defaulting to General Medicine on odd output"""
+    return _speciality_from_response(call_llm(_inference_messages(symptoms))) or DEFAULT_SPECIALITY
+
+
+async def ainfer_speciality_with_llm(symptoms: str) -> str:
+    return _speciality_from_response(await acall_llm(_inference_messages(symptoms))) or DEFAULT_SPECIALITY
+
+
+class ClassifierStats:
+    """How often the local classifier answered, and how often the LLM was needed"""
+
+    def __init__(self):
+        self.local = 0
+        self.llm_fallbacks = 0
+        self.llm_failures = 0
+        self._lock = threading.Lock()
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            local, llm_fallbacks, llm_failures = self.local, self.llm_fallbacks, self.llm_failures
+        total = local + llm_fallbacks
+        return {
+            "threshold": SPECIALITY_CLASSIFIER_THRESHOLD,
+            "local": local,
+            "llm_fallbacks": llm_fallbacks,
+            "llm_failures": llm_failures,
+            "fallback_rate": llm_fallbacks / total if total else 0.0
+        }
+
+
+_classifier_stats = ClassifierStats()
+
+
+# Identical symptom texts in flight at the same time share one LLM call
+_inflight = SingleFlight()
+_ainflight = AsyncSingleFlight()
+
+
+def _infer_and_cache(symptoms: str, key: str) -> str:
+    speciality = _speciality_from_response(call_llm(_inference_messages(symptoms)))
+    if speciality is None:
+        # Not cached: the next request for these symptoms asks the LLM again
+        return DEFAULT_SPECIALITY
+    if _cache is not None:
+        _cache.set(key, speciality)
+    return speciality
+
+
+def _infer_with_cache(symptoms: str) -> str:
+    key = normalize_symptoms(symptoms)
+    if _cache is not None:
+        speciality = _cache.get(key)
+        if speciality is not None:
+            return speciality
+    return _inflight.do(key, _infer_and_cache, symptoms, key)
+
+
+def infer_speciality(symptoms: str) -> str:
+    """Medical specialty for a symptom description.
+
+    Confident local classifications are returned directly; otherwise the
+    (cached) LLM answer is used. If the LLM fails, the classifier's best
+    guess is used so booking can continue.
+    """
+    speciality, confidence = classify(symptoms)
+    if confidence >= SPECIALITY_CLASSIFIER_THRESHOLD:
+        _classifier_stats.count("local")
+        return speciality
+
+    _classifier_stats.count("llm_fallbacks")
+    try:
+        return _infer_with_cache(symptoms)
+    except Exception as e:
+        _classifier_stats.count("llm_failures")
+        logger.warning("Specialty inference via LLM failed, using local classifier (%s, %.2f): %s", speciality, confidence, e)
+        return speciality
+
+
+async def _ainfer_and_cache(symptoms: str, key: str) -> str:
+    speciality = _speciality_from_response(await acall_llm(_inference_messages(symptoms)))
+    if speciality is None:
+        return DEFAULT_SPECIALITY
+    if _cache is not None:
+        await _cache.aset(key, speciality)
+    return speciality
+
+
+async def _ainfer_with_cache(symptoms: str) -> str:
+    key = normalize_symptoms(symptoms)
+    if _cache is not None:
+        speciality = await _cache.aget(key)
+        if speciality is not None:
+            return speciality
+    return await _ainflight.do(key, _ainfer_and_cache, symptoms, key)
+
+
+async def ainfer_speciality(symptoms: str) -> str:
+    """Async infer_speciality"""
+    speciality, confidence = classify(symptoms)
+    if confidence >= SPECIALITY_CLASSIFIER_THRESHOLD:
+        _classifier_stats.count("local")
+        return speciality
+
+    _classifier_stats.count("llm_fallbacks")
+    try:
+        return await _ainfer_with_cache(symptoms)
+    except Exception as e:
+        _classifier_stats.count("llm_failures")
+        logger.warning("Specialty inference via LLM failed, using local classifier (%s, %.2f): %s", speciality, confidence, e)
+        return speciality
+
+
+def get_speciality_cache_stats():
+    return _cache.stats() if _cache is not None else {}
+
+
+register_cache_stats("speciality", get_speciality_cache_stats, results=("hits", "remote_hits", "misses"))
+
+
+def get_classifier_stats():
+    return _classifier_stats.as_dict()
+
+
+def get_coalescing_stats():
+    """LLM inferences started vs. requests that joined one already in flight"""
+    return {"sync": _inflight.stats(), "async": _ainflight.stats()}
@@ -0,0 +1,51 @@
+import json
+import struct
+import msgpack
+from app.session_model import SessionData, SESSION_FIELDS
+
+# Bump when the field layout changes incompatibly, and teach decode() the old one
+SCHEMA_VERSION = 1
+
+# Encoded session: schema byte, 8-byte big-endian revision, msgpack array of the fields.
+# The revision sits at a fixed offset so Redis scripts can read it without msgpack.
+HEADER = struct.Struct(">BQ")
+HEADER_SIZE = HEADER.size
+
+_JSON_START = b"{"[0]
+
+
+def _pack_fields(session: SessionData) -> bytes:
+    return msgpack.packb([getattr(session, name) for name in SESSION_FIELDS], use_bin_type=True)
+
+
+def as_session(session) -> SessionData:
+    """SessionData as is; plain dicts (callers predating SessionData) are converted"""
+    return session if isinstance(session, SessionData) else SessionData.from_dict(session)
+
+
+def encode(session) -> bytes:
+    """Bytes for a SessionData (or legacy dict), carrying its current revision"""
+    session = as_session(session)
+    return HEADER.pack(SCHEMA_VERSION, session.revision) + _pack_fields(session)
+
+
+def encode_unrevisioned(session) -> bytes:
+    """Schema byte and fields only, for Redis scripts that insert the revision themselves"""
+    return bytes((SCHEMA_VERSION,)) + _pack_fields(as_session(session))
+
+
+def decode(value) -> SessionData:
+    """SessionData from encoded bytes; JSON written by older versions is migrated"""
+    if isinstance(value, str):
+        value = value.encode()
+    if value[0] == _JSON_START:
+        return SessionData.from_dict(json.loads(value))
+
+    schema, revision = HEADER.unpack_from(value)
+    if schema != SCHEMA_VERSION:
+        raise ValueError(f"Unknown session schema version {schema}")
+    row = msgpack.unpackb(value[HEADER_SIZE:], raw=False)
+    # Sessions written before a field was appended simply lack it
+    session = SessionData(**dict(zip(SESSION_FIELDS, row)))
+    session.revision = revision
+    return session
@@ -1,13 +1,69 @@
-from typing import Optional
-from pydantic import BaseModel
+from dataclasses import dataclass, field, fields
+from typing import List, Optional
 
-class SessionData(BaseModel):
+
+class SessionConflict(Exception):
+    """The session was saved by another request since it was loaded"""
+
+    def __init__(self, session_id, expected, current):
+        super().__init__(f"Session {session_id} is at revision {current}, expected {expected}")
+        self.session_id = session_id
+        self.expected = expected
+        self.current = current
+
+
+@dataclass(slots=True)
+class SessionData:
+    """State of one conversation between turns.
+
+    Supports the dict-style access the orchestrator uses: ``session['state']``,
+    ``session.get('doctor_name', default)`` and ``'rejected_slots' in session``.
+    Unset (None) fields count as missing.
+    """
     state: str = "INIT"
     symptoms: Optional[str] = None
     speciality: Optional[str] = None
-    doctor: Optional[str] = None
+    doctor_id: Optional[int] = None
+    doctor_name: Optional[str] = None
     date: Optional[str] = None
     time: Optional[str] = None
     patient_name: Optional[str] = None
     phone: Optional[str] = None
-    
\ No newline at end of file
+    # "date|time" strings of slots the patient turned down
+    rejected_slots: List[str] = field(default_factory=list)
+    # [doctor_id, doctor_name] pairs offered when the chosen doctor is full
+    alternative_doctors: List[list] = field(default_factory=list)
+    # Store revision, bumped on every save; kept in the encoded header, not the fields
+    revision: int = 0
+
+    def __getitem__(self, key):
+        if key not in _FIELD_NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_NAMES:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _FIELD_NAMES and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in _FIELD_NAMES else None
+        return default if value is None else value
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in SESSION_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data) -> "SessionData":
+        """Build from a plain dict (legacy JSON sessions); unknown keys are dropped"""
+        session = cls(**{name: data[name] for name in SESSION_FIELDS if data.get(name) is not None})
+        session.revision = int(data.get("_version", 0))
+        return session
+
+
+# Encoded fields, in wire order; append new fields at the end
+SESSION_FIELDS = tuple(f.name for f in fields(SessionData) if f.name != "revision")
+_FIELD_NAMES = frozenset(SESSION_FIELDS)
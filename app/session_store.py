@@ -1,50 +1,111 @@
+import logging
 import os
 from dotenv import load_dotenv
+from app.metrics import ERRORS, SESSION_IO_SECONDS, register_cache_stats, timed
+from app.session_model import SessionConflict, SessionData
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Determine which session store to use
 USE_REDIS = os.getenv("USE_REDIS", "false").lower() == "true"
 
 # Initialize the appropriate session store
 _store = None
 
+# Async counterpart of _store for the async request path
+_async_store = None
+
 if USE_REDIS:
     try:
-        from app.session_store_redis import RedisSessionStore
-        _store = RedisSessionStore()
-        print("Using Redis session store")
+        from app.session_store_hybrid import SESSION_L1_SIZE
+        if SESSION_L1_SIZE > 0:
+            from app.session_store_hybrid import HybridSessionStore, AsyncHybridSessionStore, SessionL1
+            # Both paths share one L1 so a turn served by either sees the other's writes
+            _l1 = SessionL1()
+            _store = HybridSessionStore(l1=_l1)
+            _async_store = AsyncHybridSessionStore(l1=_l1)
+            register_cache_stats("session_l1", _l1.stats, results=("hits", "validated", "fetched", "misses", "conflicts"))
+            logger.info("Using Redis session store with a local L1 cache")
+        else:
+            from app.session_store_redis import RedisSessionStore, AsyncRedisSessionStore
+            _store = RedisSessionStore()
+            _async_store = AsyncRedisSessionStore()
+            logger.info("Using Redis session store")
     except Exception as e:
-        print(f"Failed to initialize Redis: {e}")
-        print("Falling back to in-memory session store")
+        logger.error("Failed to initialize Redis, falling back to in-memory session store: %s", e)
         from app.session_store_memory import InMemorySessionStore
         _store = InMemorySessionStore()
 else:
     from app.session_store_memory import InMemorySessionStore
     _store = InMemorySessionStore()
-    print("Using in-memory session store")
+    logger.info("Using in-memory session store")
+
+if _async_store is None:
+    from app.session_store_memory import AsyncInMemorySessionStore
+    _async_store = AsyncInMemorySessionStore(_store)
+
+
+# Public API; a save losing a concurrent update is retried, not an error
+_timed_io = timed(SESSION_IO_SECONDS, "session", expected=(SessionConflict,))
 
 
-# Public API
-def load_session(session_id: str) -> dict:
+@_timed_io
+def load_session(session_id: str) -> SessionData:
     """Load session data"""
     # return _store.load_session(session_id)
     try:
         session = _store.load_session(session_id)
     except Exception: 
-        session = {"state": "INIT"}
+        ERRORS.labels("session").inc()
+        session = SessionData()
     return session
 
 
-
-def save_session(session_id: str, data: dict):
+@_timed_io
+def save_session(session_id: str, data: SessionData):
     """Save session data"""
     _store.save_session(session_id, data)
 
 
-def clear_session(session_id: str):
-    """Clear a specific session"""
-    _store.clear_session(session_id)
+@_timed_io
+def clear_session(session_id: str, revision: int = None):
+    """Clear a specific session; with ``revision``, only if it was not saved since (else SessionConflict)"""
+    _store.clear_session(session_id, revision)
+
+
+@_timed_io
+async def aload_session(session_id: str) -> SessionData:
+    """Load session data (async)"""
+    try:
+        session = await _async_store.load_session(session_id)
+    except Exception:
+        ERRORS.labels("session").inc()
+        session = SessionData()
+    return session
+
+
+@_timed_io
+async def asave_session(session_id: str, data: SessionData):
+    """Save session data (async)"""
+    await _async_store.save_session(session_id, data)
+
+
+@_timed_io
+async def aclear_session(session_id: str, revision: int = None):
+    """Clear a specific session (async); with ``revision``, only if it was not saved since"""
+    await _async_store.clear_session(session_id, revision)
+
+
+def list_sessions(offset: int = 0, limit: int = 50) -> dict:
+    """One page of live sessions, most recently active first (for admin tooling)"""
+    return _store.list_sessions(offset, limit)
+
+
+def get_session_store_stats() -> dict:
+    """Size and eviction counters of the session store"""
+    return _store.stats()
 
 
 def get_all_sessions():
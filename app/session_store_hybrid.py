@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from app.cache import TTLCache
+from app.session_codec import as_session, encode, decode
+from app.session_model import SessionData, SessionConflict
+from app.session_store_redis import (
+    RedisSessionStore,
+    AsyncRedisSessionStore,
+    REVISION_LUA,
+    SESSION_TTL,
+    _amigrate_legacy,
+    _asave,
+    _migrate_legacy,
+    _save,
+    _session_key,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Sessions kept in the per-process L1 cache (0 disables the hybrid store)
+SESSION_L1_SIZE = int(os.getenv("SESSION_L1_SIZE", "10000"))
+# Seconds an L1 copy is served without asking Redis. Keep 0 unless requests for a
+# session are routed to the same worker: with 0, every load still checks the version.
+SESSION_L1_TTL = float(os.getenv("SESSION_L1_TTL", "0"))
+
+# Returns {revision} if the caller's copy is current, {revision, value} if not, {-1} if missing
+LOAD_SCRIPT = REVISION_LUA + """
+local value = redis.call('GET', KEYS[1])
+if not value then
+    return {-1}
+end
+local version = revision(value)
+if version == tonumber(ARGV[1]) then
+    return {version}
+end
+return {version, value}
+"""
+
+class SessionL1:
+    """Per-process copies of recently used sessions, shared by the sync and async stores"""
+
+    def __init__(self, maxsize=SESSION_L1_SIZE, trust_ttl=SESSION_L1_TTL, clock=time.monotonic):
+        self.trust_ttl = trust_ttl
+        self._clock = clock
+        # Older than SESSION_TTL means Redis has dropped the session too
+        self.entries = TTLCache(maxsize=maxsize, ttl=SESSION_TTL, clock=clock)
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "validated": 0, "fetched": 0, "misses": 0, "conflicts": 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def lookup(self, session_id):
+        """(version, value, trusted) of the local copy, or None"""
+        entry = self.entries.get(session_id)
+        if entry is None:
+            return None
+        version, value, stored_at = entry
+        return version, value, self._clock() - stored_at < self.trust_ttl
+
+    def store(self, session_id, version, value):
+        self.entries.set(session_id, (version, value, self._clock()))
+
+    def drop(self, session_id):
+        self.entries.delete(session_id)
+
+    def stats(self):
+        return {**self.counts, "size": len(self.entries), "trust_ttl": self.trust_ttl}
+
+
+def _legacy_result(value):
+    """LOAD_SCRIPT-shaped result for a session moved from its legacy key"""
+    return [-1] if value is None else [decode(value).revision, value]
+
+
+def _loaded(l1: SessionL1, session_id: str, local, result) -> SessionData:
+    """SessionData from the LOAD_SCRIPT result, updating the L1 copy"""
+    if result[0] == -1:
+        l1.drop(session_id)
+        l1.count("misses")
+        logger.debug("No session found, initializing new session")
+        return SessionData()
+
+    if len(result) == 1:
+        l1.count("validated")
+        value = local[1]
+    else:
+        l1.count("fetched")
+        value = result[1]
+    l1.store(session_id, int(result[0]), value)
+    return decode(value)
+
+
+def _saved(l1: SessionL1, session_id: str, session: SessionData, result):
+    ok, revision = int(result[0]), int(result[1])
+    if not ok:
+        # Another request saved this session since our copy was read
+        l1.drop(session_id)
+        l1.count("conflicts")
+        raise SessionConflict(session_id, session.revision, revision)
+    session.revision = revision
+    l1.store(session_id, revision, encode(session))
+
+
+class HybridSessionStore(RedisSessionStore):
+    """Redis session store with a per-process L1 cache in front of it.
+
+    Each stored session carries a revision. A load sends the revision of the local
+    copy and gets the session back only if it changed, so a stale L1 copy is
+    never served; a save is one compare-and-set script call. Loads and saves cost at most one
+    round trip each, and none for copies younger than SESSION_L1_TTL.
+    """
+
+    def __init__(self, client=None, l1=None):
+        super().__init__(client)
+        self.l1 = l1 or SessionL1()
+        self._load_script = self.client.register_script(LOAD_SCRIPT)
+
+    def load_session(self, session_id: str) -> SessionData:
+        """Load session data from the L1 cache, checked against Redis"""
+        local = self.l1.lookup(session_id)
+        if local is not None and local[2]:
+            self.l1.count("hits")
+            return decode(local[1])
+
+        known = local[0] if local is not None else -1
+        result = self._load_script(keys=[_session_key(session_id)], args=[known])
+        if result[0] == -1:
+            result = _legacy_result(_migrate_legacy(self.client, session_id))
+        return _loaded(self.l1, session_id, local, result)
+
+    def save_session(self, session_id: str, data: SessionData):
+        """Save the next revision of the session to Redis and the L1 cache (compare-and-set)"""
+        data = as_session(data)
+        _saved(self.l1, session_id, data, _save(self.client, self._save_script, session_id, data))
+
+    def clear_session(self, session_id: str, revision: int = None):
+        """Delete session from Redis and the L1 cache; with ``revision``, only if it was not saved since"""
+        self.l1.drop(session_id)
+        super().clear_session(session_id, revision)
+
+    def clear_all_sessions(self):
+        """Clear all sessions (for testing)"""
+        self.l1.entries.clear()
+        super().clear_all_sessions()
+
+    def stats(self):
+        return {**super().stats(), "backend": "hybrid", "l1": self.l1.stats()}
+
+
+class AsyncHybridSessionStore(AsyncRedisSessionStore):
+    """HybridSessionStore for the async request path; share the SessionL1 with the sync store"""
+
+    def __init__(self, client=None, l1=None):
+        super().__init__(client)
+        self.l1 = l1 or SessionL1()
+        self._load_script = self.client.register_script(LOAD_SCRIPT)
+
+    async def load_session(self, session_id: str) -> SessionData:
+        local = self.l1.lookup(session_id)
+        if local is not None and local[2]:
+            self.l1.count("hits")
+            return decode(local[1])
+
+        known = local[0] if local is not None else -1
+        result = await self._load_script(keys=[_session_key(session_id)], args=[known])
+        if result[0] == -1:
+            result = _legacy_result(await _amigrate_legacy(self.client, session_id))
+        return _loaded(self.l1, session_id, local, result)
+
+    async def save_session(self, session_id: str, data: SessionData):
+        data = as_session(data)
+        _saved(self.l1, session_id, data, await _asave(self.client, self._save_script, session_id, data))
+
+    async def clear_session(self, session_id: str, revision: int = None):
+        self.l1.drop(session_id)
+        await super().clear_session(session_id, revision)
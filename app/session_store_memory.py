@@ -1,42 +1,159 @@
+import logging
+import os
+import threading
 import time
-from app.session_model import SessionData
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.session_codec import as_session, encode, decode
+from app.session_model import SessionData, SessionConflict
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
 
 SESSION_TTL = 1800  # 30 minutes
 
+# Hard bounds; the least recently saved sessions are evicted first
+SESSION_MEMORY_MAX_ENTRIES = int(os.getenv("SESSION_MEMORY_MAX_ENTRIES", "10000"))
+SESSION_MEMORY_MAX_BYTES = int(os.getenv("SESSION_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+
 
 class InMemorySessionStore:
-    def __init__(self):
-        self._sessions = {}
+    """Thread-safe session store bounded by TTL, entry count and serialized size.
+
+    Sessions are kept in save order, so the oldest one is always first: expiry
+    and eviction pop from the front and cost O(removed), not O(n). Every turn
+    loads and then saves its session, so save order is also recency order.
+    """
+
+    def __init__(self, max_entries=SESSION_MEMORY_MAX_ENTRIES, max_bytes=SESSION_MEMORY_MAX_BYTES,
+                 ttl=SESSION_TTL, clock=time.time):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._sessions = OrderedDict()  # session_id -> (timestamp, encoded session, revision)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def _remove(self, session_id):
+        _, payload, _ = self._sessions.pop(session_id)
+        self._bytes -= len(payload)
+
+    def _expire(self, now):
+        """Drop expired sessions from the front of the save order"""
+        while self._sessions:
+            session_id, (timestamp, _, _) = next(iter(self._sessions.items()))
+            if now - timestamp <= self.ttl:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._sessions)))
+            self.evicted += 1
     
-    def load_session(self, session_id: str) -> dict:
+    def load_session(self, session_id: str) -> SessionData:
         """Load session data from memory"""
-        record = self._sessions.get(session_id)
+        with self._lock:
+            self._expire(self._clock())
+            record = self._sessions.get(session_id)
         if not record:
-            print("No session found, initializing new session.")
-            return SessionData(state="INIT").dict()
+            logger.debug("No session found, initializing new session")
+            return SessionData()
         
-        # Check if session expired
-        if time.time() - record["timestamp"] > SESSION_TTL:
-            self._sessions.pop(session_id)
-            return SessionData(state="INIT").dict()
-        
-        return record["data"]
+        return decode(record[1])
     
-    def save_session(self, session_id: str, data: dict):
-        """Save session data to memory"""
-        self._sessions[session_id] = {
-            "data": data,
-            "timestamp": time.time()
-        }
+    def save_session(self, session_id: str, data: SessionData):
+        """Save session data to memory, unless it changed since it was loaded"""
+        data = as_session(data)
+        expected = data.revision
+        # Encode outside the lock; inside it only the revision compare and the swap happen
+        data.revision = expected + 1
+        payload = encode(data)
+        data.revision = expected
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            record = self._sessions.get(session_id)
+            current = record[2] if record else 0
+            if current != expected:
+                raise SessionConflict(session_id, expected, current)
+            if record:
+                self._remove(session_id)
+            self._sessions[session_id] = (now, payload, expected + 1)
+            self._bytes += len(payload)
+            self._evict()
+        data.revision = expected + 1
     
-    def clear_session(self, session_id: str):
-        """Delete session from memory"""
-        self._sessions.pop(session_id, None)
+    def clear_session(self, session_id: str, revision: int = None):
+        """Delete session from memory; with ``revision``, only if it was not saved since"""
+        with self._lock:
+            if revision is not None:
+                self._expire(self._clock())
+                record = self._sessions.get(session_id)
+                current = record[2] if record else 0
+                if current != revision:
+                    raise SessionConflict(session_id, revision, current)
+            if session_id in self._sessions:
+                self._remove(session_id)
+    
+    def list_sessions(self, offset: int = 0, limit: int = 50) -> dict:
+        """One page of live sessions, most recently active first"""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            live = [(session_id, record[0]) for session_id, record in reversed(self._sessions.items())]
+        return {
+            "total": len(live),
+            "sessions": [
+                {
+                    "session_id": session_id,
+                    "last_activity": timestamp,
+                    "expires_in": max(0, int(timestamp + self.ttl - now))
+                }
+                for session_id, timestamp in live[offset:offset + limit]
+            ]
+        }
     
     def get_all_sessions(self):
         """Get all session IDs (for debugging)"""
-        return list(self._sessions.keys())
+        with self._lock:
+            self._expire(self._clock())
+            return list(self._sessions.keys())
     
     def clear_all_sessions(self):
         """Clear all sessions (for testing)"""
-        self._sessions.clear()
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+
+class AsyncInMemorySessionStore:
+    """Async interface over an InMemorySessionStore (shares its sessions; never blocks)"""
+
+    def __init__(self, store: InMemorySessionStore):
+        self._store = store
+
+    async def load_session(self, session_id: str) -> SessionData:
+        return self._store.load_session(session_id)
+
+    async def save_session(self, session_id: str, data: SessionData):
+        self._store.save_session(session_id, data)
+
+    async def clear_session(self, session_id: str, revision: int = None):
+        self._store.clear_session(session_id, revision)
@@ -1,11 +1,16 @@
-import json
+import logging
 import os
+import time
 from dotenv import load_dotenv
 import redis
-from app.session_model import SessionData
+import redis.asyncio
+from app.session_codec import as_session, encode_unrevisioned, decode
+from app.session_model import SessionData, SessionConflict
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Redis configuration
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
@@ -14,11 +19,213 @@ REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 
 SESSION_TTL = 1800  # 30 minutes
 
+SESSION_KEY_PREFIX = "session:"
+# Sorted set of session ids scored by last activity (unix time); never use KEYS
+SESSION_INDEX_KEY = "sessions:index"
+# Keys per SCAN page and per pipelined delete
+SCAN_BATCH_SIZE = 500
+
+
+def _session_key(session_id: str) -> str:
+    # Hash tag on the id: on Redis Cluster sessions spread over all slots. The
+    # scripts therefore touch only the session key; the index (its own slot) is
+    # updated in the same pipeline, not atomically with it.
+    return f"{SESSION_KEY_PREFIX}{{{session_id}}}"
+
+
+def _legacy_session_key(session_id: str) -> str:
+    # Key sessions were stored under before the hash tag; moved on first load
+    return f"{SESSION_KEY_PREFIX}{session_id}"
+
+
+# Revision of an encoded session (see app/session_codec.py). JSON sessions written
+# before the binary format carry it as a leading "_version" key, or not at all.
+REVISION_LUA = """
+local function revision(value)
+    if string.byte(value, 1) == 123 then
+        return tonumber(string.match(value, '^{"_version": (%d+)')) or 0
+    end
+    local n = 0
+    for i = 2, 9 do
+        n = n * 256 + string.byte(value, i)
+    end
+    return n
+end
+"""
+
+# Compare-and-set save. Writes the session (ARGV[1]: schema byte and fields) with
+# the next revision, expiring in ARGV[2] seconds, only if the stored revision is
+# still ARGV[3]. Returns {1, new revision} on success, {0, stored revision} on conflict.
+SAVE_SCRIPT = REVISION_LUA + """
+local current = redis.call('GET', KEYS[1])
+local previous = 0
+if current then
+    previous = revision(current)
+end
+if previous ~= tonumber(ARGV[3]) then
+    return {0, previous}
+end
+local version = previous + 1
+local header = ''
+local n = version
+for i = 1, 8 do
+    header = string.char(n % 256) .. header
+    n = math.floor(n / 256)
+end
+local body = ARGV[1]
+redis.call('SET', KEYS[1], string.sub(body, 1, 1) .. header .. string.sub(body, 2), 'EX', ARGV[2])
+return {1, version}
+"""
+
+
+# Compare-and-set delete: removes the session only if the stored revision is
+# still ARGV[1]. Returns {1, revision} or {0, stored revision}.
+CLEAR_SCRIPT = REVISION_LUA + """
+local current = redis.call('GET', KEYS[1])
+local previous = 0
+if current then
+    previous = revision(current)
+end
+if previous ~= tonumber(ARGV[1]) then
+    return {0, previous}
+end
+redis.call('DEL', KEYS[1])
+return {1, previous}
+"""
+
+
+def _save_args(session: SessionData):
+    return [encode_unrevisioned(session), SESSION_TTL, session.revision]
+
+
+def _queue_index(pipe, session_id: str):
+    """Refresh the index entry of a session and prune expired ones"""
+    now = time.time()
+    pipe.zadd(SESSION_INDEX_KEY, {session_id: now})
+    pipe.zremrangebyscore(SESSION_INDEX_KEY, "-inf", now - SESSION_TTL)
+
+
+def _migrate_legacy(client, session_id: str):
+    """Move a session from its legacy key to the current one; its value, or None.
+
+    The value is copied as is, so a legacy JSON session keeps its revision and
+    is rewritten in the binary format by its next save.
+    """
+    legacy = _legacy_session_key(session_id)
+    value = client.get(legacy)
+    if value is None:
+        return None
+    with client.pipeline(transaction=False) as pipe:
+        # NX: a concurrent load may have moved it, and a save changed it, already
+        pipe.set(_session_key(session_id), value, ex=SESSION_TTL, nx=True)
+        pipe.get(_session_key(session_id))
+        pipe.delete(legacy)
+        _, value, _ = pipe.execute()
+    return value
+
+
+async def _amigrate_legacy(client, session_id: str):
+    legacy = _legacy_session_key(session_id)
+    value = await client.get(legacy)
+    if value is None:
+        return None
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.set(_session_key(session_id), value, ex=SESSION_TTL, nx=True)
+        pipe.get(_session_key(session_id))
+        pipe.delete(legacy)
+        _, value, _ = await pipe.execute()
+    return value
+
+
+def _save(client, script, session_id: str, session: SessionData):
+    """SAVE_SCRIPT result; the index is refreshed in the same round trip.
+
+    EVALSHA is queued by hand: a Script queued on a pipeline sends SCRIPT EXISTS
+    first on every execute. A conflicting save refreshes the index too, which is
+    harmless: the session is alive, another request just saved it.
+    """
+    keys, args = [_session_key(session_id)], _save_args(session)
+    with client.pipeline(transaction=False) as pipe:
+        pipe.evalsha(script.sha, len(keys), *keys, *args)
+        _queue_index(pipe, session_id)
+        result = pipe.execute(raise_on_error=False)[0]
+    if isinstance(result, redis.exceptions.NoScriptError):
+        # First save since Redis lost its script cache; the Script loads it
+        return script(keys=keys, args=args)
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+async def _asave(client, script, session_id: str, session: SessionData):
+    keys, args = [_session_key(session_id)], _save_args(session)
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.evalsha(script.sha, len(keys), *keys, *args)
+        _queue_index(pipe, session_id)
+        result = (await pipe.execute(raise_on_error=False))[0]
+    if isinstance(result, redis.exceptions.NoScriptError):
+        return await script(keys=keys, args=args)
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def _saved(session_id: str, session: SessionData, result):
+    """Apply the SAVE_SCRIPT result: bump the revision, or raise on a concurrent write"""
+    ok, revision = int(result[0]), int(result[1])
+    if not ok:
+        raise SessionConflict(session_id, session.revision, revision)
+    session.revision = revision
+
+
+def _cleared(session_id: str, revision: int, result):
+    """Apply the CLEAR_SCRIPT result: raise if the session was saved since ``revision``"""
+    ok, current = int(result[0]), int(result[1])
+    if not ok:
+        raise SessionConflict(session_id, revision, current)
+
+
+def _clear_if_current(client, script, session_id: str, revision: int):
+    """CLEAR_SCRIPT, then the index entry once the session is really gone"""
+    _cleared(session_id, revision, script(keys=[_session_key(session_id)], args=[revision]))
+    client.zrem(SESSION_INDEX_KEY, session_id)
+
+
+async def _aclear_if_current(client, script, session_id: str, revision: int):
+    _cleared(session_id, revision, await script(keys=[_session_key(session_id)], args=[revision]))
+    await client.zrem(SESSION_INDEX_KEY, session_id)
+
+
+def _queue_clear(pipe, session_id: str):
+    pipe.delete(_session_key(session_id))
+    pipe.zrem(SESSION_INDEX_KEY, session_id)
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _session_page(entries, total: int, now: float) -> dict:
+    return {
+        "total": total,
+        "sessions": [
+            {
+                "session_id": _text(session_id),
+                "last_activity": last_activity,
+                "expires_in": max(0, int(last_activity + SESSION_TTL - now))
+            }
+            for session_id, last_activity in entries
+        ]
+    }
+
 
 class RedisSessionStore:
-    def __init__(self):
-        self.client = None
-        self._connect()
+    def __init__(self, client=None):
+        self.client = client
+        if client is None:
+            self._connect()
+        self._save_script = self.client.register_script(SAVE_SCRIPT)
+        self._clear_script = self.client.register_script(CLEAR_SCRIPT)
     
     def _connect(self):
         """Initialize Redis connection"""
@@ -27,14 +234,13 @@ class RedisSessionStore:
                 host=REDIS_HOST,
                 port=REDIS_PORT,
                 db=REDIS_DB,
-                password=REDIS_PASSWORD if REDIS_PASSWORD else None,
-                decode_responses=True
+                password=REDIS_PASSWORD if REDIS_PASSWORD else None
             )
             # Test connection
             self.client.ping()
-            print(" Connected to Redis for session storage")
+            logger.info("Connected to Redis for session storage")
         except redis.ConnectionError as e:
-            print(f" Redis connection failed: {e}")
+            logger.error("Redis connection failed: %s", e)
             self.client = None
             raise
     
@@ -42,48 +248,119 @@ class RedisSessionStore:
         """Check if Redis is connected"""
         return self.client is not None
     
-    def load_session(self, session_id: str) -> dict:
+    def load_session(self, session_id: str) -> SessionData:
         """Load session data from Redis"""
         if not self.client:
             raise RuntimeError("Redis client is not connected")
         
-        data = self.client.get(f"session:{session_id}")
+        data = self.client.get(_session_key(session_id)) or _migrate_legacy(self.client, session_id)
         if not data:
-            print("No session found, initializing new session.")
-            return SessionData(state="INIT").dict()
+            logger.debug("No session found, initializing new session")
+            return SessionData()
         
-        return json.loads(data)
+        return decode(data)
     
-    def save_session(self, session_id: str, data: dict):
-        """Save session data to Redis with TTL"""
+    def save_session(self, session_id: str, data: SessionData):
+        """Save session data to Redis with TTL, unless it changed since it was loaded"""
         if not self.client:
             raise RuntimeError("Redis client is not connected")
         
-        self.client.setex(
-            f"session:{session_id}",
-            SESSION_TTL,
-            json.dumps(data)
-        )
+        data = as_session(data)
+        _saved(session_id, data, _save(self.client, self._save_script, session_id, data))
     
-    def clear_session(self, session_id: str):
-        """Delete session from Redis"""
+    def clear_session(self, session_id: str, revision: int = None):
+        """Delete session from Redis; with ``revision``, only if it was not saved since"""
         if not self.client:
             raise RuntimeError("Redis client is not connected")
         
-        self.client.delete(f"session:{session_id}")
+        if revision is not None:
+            _clear_if_current(self.client, self._clear_script, session_id, revision)
+            return
+        with self.client.pipeline(transaction=False) as pipe:
+            _queue_clear(pipe, session_id)
+            pipe.execute()
+    
+    def list_sessions(self, offset: int = 0, limit: int = 50) -> dict:
+        """One page of live sessions, most recently active first"""
+        if not self.client:
+            raise RuntimeError("Redis client is not connected")
+        
+        now = time.time()
+        with self.client.pipeline() as pipe:
+            pipe.zremrangebyscore(SESSION_INDEX_KEY, "-inf", now - SESSION_TTL)
+            pipe.zrevrange(SESSION_INDEX_KEY, offset, offset + limit - 1, withscores=True)
+            pipe.zcard(SESSION_INDEX_KEY)
+            _, entries, total = pipe.execute()
+        return _session_page(entries, total, now)
+    
+    def stats(self):
+        if not self.client:
+            raise RuntimeError("Redis client is not connected")
+        
+        return {"backend": "redis", "sessions": self.client.zcard(SESSION_INDEX_KEY)}
     
     def get_all_sessions(self):
-        """Get all session keys (for debugging)"""
+        """Get all session keys (for debugging); incremental SCAN, never blocks Redis"""
         if not self.client:
             raise RuntimeError("Redis client is not connected")
         
-        return self.client.keys("session:*")
+        return [_text(key) for key in self.client.scan_iter(match=f"{SESSION_KEY_PREFIX}*", count=SCAN_BATCH_SIZE)]
     
     def clear_all_sessions(self):
-        """Clear all sessions (for testing)"""
+        """Clear all sessions (for testing), deleting one SCAN page per pipeline"""
         if not self.client:
             raise RuntimeError("Redis client is not connected")
         
-        keys = self.client.keys("session:*")
-        if keys:
-            self.client.delete(*keys)
+        batch = []
+        for key in self.client.scan_iter(match=f"{SESSION_KEY_PREFIX}*", count=SCAN_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= SCAN_BATCH_SIZE:
+                self._unlink(batch)
+                batch = []
+        batch.append(SESSION_INDEX_KEY)
+        self._unlink(batch)
+    
+    def _unlink(self, keys):
+        # UNLINK frees memory in the background instead of blocking like DEL; one
+        # key per command, since a page spans cluster slots
+        with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.unlink(key)
+            pipe.execute()
+
+
+class AsyncRedisSessionStore:
+    """RedisSessionStore for the async request path (redis.asyncio, same keys and format)"""
+
+    def __init__(self, client=None):
+        # Connects lazily on the running event loop
+        self.client = client or redis.asyncio.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD if REDIS_PASSWORD else None
+        )
+        self._save_script = self.client.register_script(SAVE_SCRIPT)
+        self._clear_script = self.client.register_script(CLEAR_SCRIPT)
+
+    async def load_session(self, session_id: str) -> SessionData:
+        """Load session data from Redis"""
+        data = await self.client.get(_session_key(session_id)) or await _amigrate_legacy(self.client, session_id)
+        if not data:
+            return SessionData()
+
+        return decode(data)
+
+    async def save_session(self, session_id: str, data: SessionData):
+        """Save session data to Redis with TTL, unless it changed since it was loaded"""
+        data = as_session(data)
+        _saved(session_id, data, await _asave(self.client, self._save_script, session_id, data))
+
+    async def clear_session(self, session_id: str, revision: int = None):
+        """Delete session from Redis; with ``revision``, only if it was not saved since"""
+        if revision is not None:
+            await _aclear_if_current(self.client, self._clear_script, session_id, revision)
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            _queue_clear(pipe, session_id)
+            await pipe.execute()
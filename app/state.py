@@ -1,3 +1,4 @@
+
 from enum import Enum
 
 class ConversationState(Enum):
@@ -11,11 +12,59 @@ class ConversationState(Enum):
     END="END"
 
 
-    
-    # VALID_TRANSITIONS = {
-    #"INIT": ["COLLECTING_SYMPTOMS"],
-    #"COLLECTING_SYMPTOMS": ["SELECTING_DOCTOR"],
-    #"SELECTING_DOCTOR": ["CHECKING_AVAILABILITY"],
-    #"CHECKING_AVAILABILITY": ["COLLECTING_PATIENT_DETAILS"],
-    #"COLLECTING_PATIENT_DETAILS": ["BOOKED"],
-    #}
+# States a turn may move to from each handled state. Staying in the same state
+# (e.g. asking again after an unknown doctor name) is always allowed; END means
+# the session was closed (booked, declined or nothing available).
+VALID_TRANSITIONS = {
+    ConversationState.INIT: {ConversationState.COLLECTING_SYMPTOMS},
+    ConversationState.COLLECTING_SYMPTOMS: {ConversationState.SELECTING_DOCTOR, ConversationState.END},
+    ConversationState.SELECTING_DOCTOR: {
+        ConversationState.CHECKING_AVAILABILITY,
+        ConversationState.OFFERING_ALTERNATIVE_DOCTOR,
+        ConversationState.END,
+    },
+    ConversationState.OFFERING_ALTERNATIVE_DOCTOR: {
+        ConversationState.CHECKING_AVAILABILITY,
+        ConversationState.SELECTING_DOCTOR,
+        ConversationState.END,
+    },
+    ConversationState.CHECKING_AVAILABILITY: {ConversationState.COLLECTING_PATIENT_DETAILS, ConversationState.END},
+    # Back to CHECKING_AVAILABILITY when the slot was taken meanwhile
+    ConversationState.COLLECTING_PATIENT_DETAILS: {ConversationState.CHECKING_AVAILABILITY, ConversationState.END},
+}
+
+
+def is_valid_transition(source: ConversationState, target: ConversationState) -> bool:
+    return source == target or target in VALID_TRANSITIONS.get(source, ())
+
+
+def validate_state_machine(handlers) -> None:
+    """Check a {state: handler} table against VALID_TRANSITIONS; raise ValueError on a mismatch.
+
+    Every state a conversation can reach must have a handler (END excepted), every
+    handled state must declare its transitions, and every state must be reachable from INIT.
+    """
+    errors = []
+    for state in VALID_TRANSITIONS:
+        if state not in handlers:
+            errors.append(f"{state.value} has transitions but no handler")
+    for state in handlers:
+        if state not in VALID_TRANSITIONS:
+            errors.append(f"{state.value} has a handler but no declared transitions")
+    for source, targets in VALID_TRANSITIONS.items():
+        for target in targets:
+            if target is not ConversationState.END and target not in handlers:
+                errors.append(f"{source.value} -> {target.value}: target has no handler")
+
+    reachable, pending = set(), [ConversationState.INIT]
+    while pending:
+        state = pending.pop()
+        if state not in reachable:
+            reachable.add(state)
+            pending.extend(VALID_TRANSITIONS.get(state, ()))
+    for state in handlers:
+        if state not in reachable:
+            errors.append(f"{state.value} is not reachable from INIT")
+
+    if errors:
+        raise ValueError("Invalid conversation state machine: " + "; ".join(errors))
@@ -1,7 +1,9 @@
+import json
 import streamlit as st
-import requests
+from websockets.sync.client import connect
+from websockets.exceptions import WebSocketException
 
-API_URL = "http://127.0.0.1:8000/api/chat"
+WS_URL = "ws://127.0.0.1:8000/api/chat/ws"
 
 st.set_page_config(page_title="Doctor’s Assistant", layout="centered")
 
@@ -14,6 +16,46 @@ if "session_id" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "ws" not in st.session_state:
+    st.session_state.ws = None
+
+
+def get_connection():
+    """The conversation's websocket, opened once and reused for every message"""
+    if st.session_state.ws is None:
+        url = WS_URL
+        if st.session_state.session_id:
+            url += f"?session_id={st.session_state.session_id}"
+        # Kept open across Streamlit reruns, hence not a with-block
+        ws = connect(url, legacy=True)
+        # The server announces the session id first
+        st.session_state.session_id = json.loads(ws.recv())["session_id"]
+        st.session_state.ws = ws
+    return st.session_state.ws
+
+
+def stream_reply(message):
+    """Send a message and yield the reply tokens as they arrive"""
+    try:
+        ws = get_connection()
+        ws.send(json.dumps({"message": message}))
+    except (OSError, WebSocketException):
+        # Connection dropped (e.g. server restart): reconnect to the same session once
+        st.session_state.ws = None
+        ws = get_connection()
+        ws.send(json.dumps({"message": message}))
+
+    while True:
+        event = json.loads(ws.recv())
+        if event["type"] == "token":
+            yield event["text"]
+        elif event["type"] == "done":
+            return
+        elif event["type"] == "error":
+            yield event["detail"]
+            return
+
+
 # Display chat history
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
@@ -30,20 +72,10 @@ if user_input:
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    payload = {
-        "message": user_input,
-        "session_id": st.session_state.session_id
-    }
-
-    response = requests.post(API_URL, json=payload)
-    data = response.json()
-
-    # Save session_id
-    st.session_state.session_id = data["session_id"]
+    # Show bot response as it streams in
+    with st.chat_message("assistant"):
+        reply = st.write_stream(stream_reply(user_input))
 
-    # Show bot response
     st.session_state.messages.append(
-        {"role": "assistant", "content": data["reply"]}
+        {"role": "assistant", "content": reply}
     )
-    with st.chat_message("assistant"):
-        st.markdown(data["reply"])
@@ -0,0 +1,274 @@
+"""
+Benchmark cases: session stores, db/ repository functions and orchestrator handlers.
+
+Each builder returns a list of Case objects, or raises Skip when what it needs
+(fakeredis, a reachable database) is not there.
+"""
+import asyncio
+import datetime
+import itertools
+from contextlib import contextmanager
+
+from app.session_model import SessionData
+
+
+class Skip(Exception):
+    """A group of cases cannot run here (missing optional dependency or service)"""
+
+
+# Run after all cases (pools and loops opened by the builders)
+TEARDOWN = []
+
+
+class Case:
+    """One benchmark: ``fn(*setup())`` is timed; ``setup`` (untimed) runs before each call"""
+
+    def __init__(self, name, fn, setup=None):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+
+
+def booking_session(**changes):
+    """A session as it looks halfway through a booking"""
+    fields = {
+        "state": "CHECKING_AVAILABILITY",
+        "symptoms": "knee pain after running",
+        "speciality": "Orthopedics",
+        "doctor_id": 1,
+        "doctor_name": "Dr X",
+        "date": "2026-01-22",
+        "time": "11:00:00",
+        "rejected_slots": ["2026-01-22|10:00:00"],
+    }
+    fields.update(changes)
+    return SessionData(**fields)
+
+
+def _store_cases(prefix, store):
+    ids = itertools.count()
+    store.save_session("bench-load", booking_session())
+    # Re-saving the same object keeps its revision current, so every save succeeds
+    saved = store.load_session("bench-load")
+
+    def fresh_session():
+        session_id = f"bench-{next(ids)}"
+        store.save_session(session_id, booking_session())
+        return (session_id,)
+
+    return [
+        Case(f"{prefix}.load_session", lambda: store.load_session("bench-load")),
+        Case(f"{prefix}.load_session[missing]", lambda: store.load_session("bench-missing")),
+        Case(f"{prefix}.save_session", lambda: store.save_session("bench-load", saved)),
+        Case(f"{prefix}.save_session[new]", lambda: store.save_session(f"bench-new-{next(ids)}", booking_session())),
+        Case(f"{prefix}.clear_session", store.clear_session, setup=fresh_session),
+    ]
+
+
+def session_store_cases():
+    from app.session_store_memory import InMemorySessionStore
+
+    return _store_cases("session_store.memory", InMemorySessionStore())
+
+
+def redis_session_store_cases():
+    try:
+        import fakeredis
+    except ImportError:
+        raise Skip("fakeredis is not installed")
+    from app.session_store_hybrid import HybridSessionStore, SessionL1
+    from app.session_store_redis import RedisSessionStore
+
+    cases = []
+    for prefix, cls, kwargs in [
+        ("session_store.redis", RedisSessionStore, {}),
+        ("session_store.hybrid", HybridSessionStore, {"l1": SessionL1()}),
+    ]:
+        client = fakeredis.FakeRedis(decode_responses=False)
+        store = cls(client=client, **kwargs)
+        cases.extend(_store_cases(prefix, store))
+    return cases
+
+
+@contextmanager
+def _without_availability_cache():
+    from db import schedule_repo
+
+    cache = schedule_repo._availability_cache
+    schedule_repo._availability_cache = None
+    try:
+        yield
+    finally:
+        schedule_repo._availability_cache = cache
+
+
+def _uncached(fn):
+    def call(*args, **kwargs):
+        with _without_availability_cache():
+            return fn(*args, **kwargs)
+    call.__name__ = fn.__name__
+    return call
+
+
+# Served from the availability cache when it is on; also measured with it off
+CACHED_SCHEDULE_FUNCTIONS = {
+    "get_available_slots", "get_available_slots_for_doctors", "get_doctors_with_open_slots", "has_open_slot",
+    "get_next_open_slots",
+}
+
+
+def _repository_cases(group, repository):
+    """The db/ module functions on ``repository``, named "<group>.<module>.<function>"."""
+    from db import booking_repo, doctor_repo, schedule_repo
+    from db.repository import set_repository
+
+    # Groups are built and measured one after the other, so this repository
+    # serves exactly the cases below; the previous one is restored at the end
+    previous = set_repository(repository)
+    TEARDOWN.append(lambda: set_repository(previous))
+    doctors = repository.all_doctors()
+    doctor_repo.refresh_doctor_directory()
+    for doctor_id, _, _ in doctors:
+        schedule_repo.invalidate_availability(doctor_id)
+
+    # The first open slot; booking never claims it (see booking_calls)
+    slots = repository.slots_for_doctors([row[0] for row in doctors])
+    if not slots:
+        raise Skip("no open doctor_schedules rows; run db/seed.sql")
+    doctor_id, date, time, _ = slots[0]
+    _, name, speciality = next(row for row in doctors if row[0] == doctor_id)
+    doctor_ids = [row[0] for row in doctors]
+    after = (date - datetime.timedelta(days=1), time)
+
+    # ``after`` a day earlier and one excluded slot exercise the keyset path
+    schedule_calls = [
+        ("is_slot_available", (doctor_id, date, time)),
+        ("get_available_slots", (doctor_id,)),
+        ("get_available_slots_for_doctors", (doctor_ids,)),
+        ("get_available_slots_by_speciality", (speciality,)),
+        ("get_doctors_with_open_slots", (doctor_ids,)),
+        ("has_open_slot", (doctor_ids,)),
+        ("get_next_open_slots", (doctor_id, after, [(date, time)], 3)),
+    ]
+    doctor_calls = [
+        ("get_doctors_by_speciality", (speciality,)),
+        ("find_doctor_by_name", (name.lower(), speciality)),
+    ]
+    # A date with no schedule: the booking claims nothing and returns SLOT_TAKEN,
+    # which costs the same round trip without changing the database
+    booking_calls = [
+        ("book_appointment", (doctor_id, "Bench", "0000000000", datetime.date(1999, 1, 1), time)),
+    ]
+
+    # Async variants share one loop, so the pool's connections stay bound to it
+    loop = asyncio.new_event_loop()
+
+    def close():
+        loop.run_until_complete(repository.aclose())
+        loop.close()
+    TEARDOWN.append(close)
+
+    cases = [Case(f"{group}.doctor_repo.refresh_doctor_directory", doctor_repo.refresh_doctor_directory)]
+    for module, calls in [(schedule_repo, schedule_calls), (doctor_repo, doctor_calls), (booking_repo, booking_calls)]:
+        prefix = f"{group}.{module.__name__.split('.')[-1]}"
+        for function, args in calls:
+            fn = getattr(module, function)
+            afn = getattr(module, f"a{function}")
+            label = "[slot_taken]" if function == "book_appointment" else ""
+            cases.append(Case(f"{prefix}.{function}{label}", lambda fn=fn, args=args: fn(*args)))
+            cases.append(Case(
+                f"{prefix}.a{function}{label}", lambda afn=afn, args=args: loop.run_until_complete(afn(*args))
+            ))
+            if function in CACHED_SCHEDULE_FUNCTIONS and schedule_repo._availability_cache is not None:
+                uncached = _uncached(fn)
+                cases.append(Case(f"{prefix}.{function}[uncached]", lambda fn=uncached, args=args: fn(*args)))
+    return cases
+
+
+def db_cases():
+    """db/ functions on the Postgres database from .env"""
+    from db.postgres_repository import PostgresRepository
+
+    repository = PostgresRepository()
+    try:
+        repository.all_doctors()
+    except Exception as e:
+        raise Skip(f"database not reachable: {e}")
+    return _repository_cases("db", repository)
+
+
+def db_sqlite_cases():
+    """The same functions on an in-memory SQLite database: the repository layer without a network"""
+    from db.sqlite_repository import SQLiteRepository
+
+    return _repository_cases("db_sqlite", SQLiteRepository(":memory:"))
+
+
+# Session state a handler expects, and the message it gets. "[llm]" cases skip the
+# local classifier and the specialty cache; "slot" states get the doctor's next open slot.
+HANDLER_TURNS = [
+    ("handle_init", {"state": "INIT"}, "hi"),
+    ("handle_collecting_symptoms", {"state": "COLLECTING_SYMPTOMS"}, "knee pain after running"),
+    ("handle_collecting_symptoms[llm]", {"state": "COLLECTING_SYMPTOMS"}, "knee pain after running"),
+    ("handle_selecting_doctor", {"state": "SELECTING_DOCTOR", "speciality": "Orthopedics"}, "Dr X"),
+    ("handle_alternative_doctor", {
+        "state": "OFFERING_ALTERNATIVE_DOCTOR", "speciality": "Orthopedics", "alternative_doctors": [[2, "Dr Y"]]
+    }, "yes"),
+    ("handle_availability", {"state": "CHECKING_AVAILABILITY", "doctor_id": 1, "doctor_name": "Dr X", "slot": True}, "yes"),
+    ("handle_availability[declined]", {
+        "state": "CHECKING_AVAILABILITY", "doctor_id": 1, "doctor_name": "Dr X", "slot": True
+    }, "no"),
+    ("handle_collecting_patient_details", {
+        "state": "COLLECTING_PATIENT_DETAILS", "speciality": "Orthopedics", "doctor_id": 1, "doctor_name": "Dr X",
+        "slot": True
+    }, "Asha Rao 9876543210"),
+]
+
+
+def orchestrator_cases():
+    """Each handler through ConversationOrchestrator.handle, on the in-process clinic and a zero-latency fake LLM"""
+    from app import session_store
+    from app.orchestrator import ConversationOrchestrator
+    from app.services import speciality_service
+    from app.session_store_memory import InMemorySessionStore
+    from loadtest.fixtures import ClinicFixture, FakeLLM
+
+    # Installed for the rest of the benchmark process
+    clinic = ClinicFixture(slots_per_doctor=20000)
+    clinic.install(setattr)
+    FakeLLM(latency=0).install(setattr)
+    store = InMemorySessionStore(max_entries=100000)
+    session_store._store = store
+    bot = ConversationOrchestrator()
+    ids = itertools.count()
+    threshold, cache = speciality_service.SPECIALITY_CLASSIFIER_THRESHOLD, speciality_service._cache
+
+    def prepared(fields, message, llm):
+        fields = dict(fields)
+        with_slot = fields.pop("slot", False)
+
+        def setup():
+            speciality_service.SPECIALITY_CLASSIFIER_THRESHOLD = 2.0 if llm else threshold
+            speciality_service._cache = None if llm else cache
+            session = SessionData(**fields)
+            if with_slot:
+                slot = clinic.get_next_open_slots(session.doctor_id)[0]
+                session.date, session.time = str(slot[0]), str(slot[1])
+            session_id = f"bench-turn-{next(ids)}"
+            store.save_session(session_id, session)
+            return session_id, message
+        return setup
+
+    return [
+        Case(f"orchestrator.{name}", bot.handle, setup=prepared(fields, message, llm=name.endswith("[llm]")))
+        for name, fields, message in HANDLER_TURNS
+    ]
+
+
+GROUPS = {
+    "session_store": session_store_cases,
+    "redis_session_store": redis_session_store_cases,
+    "db": db_cases,
+    "db_sqlite": db_sqlite_cases,
+    "orchestrator": orchestrator_cases,
+}
@@ -0,0 +1,168 @@
+"""
+Micro-benchmarks for the session stores, db/ repositories and orchestrator handlers.
+
+    python benchmarks/run.py                       # run, compare with benchmarks/baseline.json
+    python benchmarks/run.py --filter orchestrator --output results.json
+    python benchmarks/run.py --save-baseline       # record the current numbers as the baseline
+
+Results are JSON (nanoseconds per call, median of several runs). A case is
+reported as a regression when it is slower than the baseline by more than
+--threshold; --fail-on-regression turns that into a non-zero exit code. The db
+group needs the database configured in .env and is skipped when it is not
+reachable; db_sqlite runs the same cases on an in-memory SQLite database, and
+the Redis stores run against fakeredis.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.cases import GROUPS, TEARDOWN, Skip
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def measure(case, min_time=0.1, repeat=5):
+    """Median and best nanoseconds per call of ``case`` over ``repeat`` runs of at least ``min_time`` seconds"""
+    # One untimed call first: opens pools, loads scripts, fills caches
+    case.fn(*(case.setup() if case.setup else ()))
+    timings = []
+    iterations = 0
+    for _ in range(repeat):
+        spent = 0.0
+        calls = 0
+        while spent < min_time:
+            if case.setup is None:
+                # Batches keep the timer overhead out of fast cases
+                batch = max(1, calls)
+                started = time.perf_counter()
+                for _ in range(batch):
+                    case.fn()
+                spent += time.perf_counter() - started
+                calls += batch
+            else:
+                args = case.setup()
+                started = time.perf_counter()
+                case.fn(*args)
+                spent += time.perf_counter() - started
+                calls += 1
+        timings.append(spent / calls * 1e9)
+        iterations += calls
+    return {
+        "ns_per_op": statistics.median(timings),
+        "best_ns_per_op": min(timings),
+        "iterations": iterations
+    }
+
+
+def run_cases(groups, name_filter=None, min_time=0.1, repeat=5, log=print):
+    results, skipped = {}, {}
+    try:
+        for group in groups:
+            try:
+                cases = GROUPS[group]()
+            except Skip as e:
+                skipped[group] = str(e)
+                log(f"skipped {group}: {e}")
+                continue
+            for case in cases:
+                if name_filter and name_filter not in case.name:
+                    continue
+                results[case.name] = measure(case, min_time, repeat)
+                log(f"{case.name:<60} {results[case.name]['ns_per_op'] / 1000:>12.2f} us")
+    finally:
+        while TEARDOWN:
+            TEARDOWN.pop()()
+    return results, skipped
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Per-case ratio to the baseline; regressions are cases slower by more than ``threshold``"""
+    comparison, regressions = {}, []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = result["ns_per_op"] / base["ns_per_op"]
+        comparison[name] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--group", action="append", choices=sorted(GROUPS), help="only these groups (repeatable)")
+    parser.add_argument("--filter", default=None, help="only cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case; the median is reported")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown vs baseline flagged as a regression")
+    parser.add_argument("--output", default=None, help="write the results JSON here")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    # Keep the per-call log lines of the code under test out of the timings and the output
+    logging.disable(logging.WARNING)
+    results, skipped = run_cases(args.group or list(GROUPS), args.filter, args.min_time, args.repeat)
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time,
+            "repeat": args.repeat
+        },
+        "skipped": skipped,
+        "results": results
+    }
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    comparison, regressions = compare(results, baseline, args.threshold)
+    if comparison:
+        report["baseline_ratio"] = comparison
+        report["regressions"] = regressions
+        print()
+        for name, ratio in comparison.items():
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"{name:<60} {(ratio - 1) * 100:>+8.1f}% vs baseline{flag}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": report["meta"], "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
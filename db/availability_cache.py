@@ -0,0 +1,178 @@
+"""
+Open slots per doctor in a key-value cache, guarded by per-doctor generations.
+
+Invalidating a doctor bumps its generation. Entries are stored with the
+generation read *before* their query ran, and a read only accepts an entry
+whose generation is still current. A reader that started before a booking
+can therefore still write its result, but nobody will use it.
+
+Generations live in process memory (one worker) or in Redis, so that a
+booking in one worker invalidates the entries of every other worker.
+"""
+import datetime
+import logging
+import threading
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+def dump_entry(entry):
+    """(generation, slots) -> "<generation>#<date>,<start>,<end>|..." for string caches"""
+    generation, slots = entry
+    return f"{generation}#" + "|".join(f"{d.isoformat()},{s.isoformat()},{e.isoformat()}" for d, s, e in slots)
+
+
+def load_entry(data):
+    generation, _, items = data.partition("#")
+    slots = []
+    for item in filter(None, items.split("|")):
+        d, s, e = item.split(",")
+        slots.append((datetime.date.fromisoformat(d), datetime.time.fromisoformat(s), datetime.time.fromisoformat(e)))
+    return int(generation), slots
+
+
+class LocalGenerations:
+    """Generations in process memory: right for a single worker"""
+
+    def __init__(self):
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, doctor_ids):
+        with self._lock:
+            return {doctor_id: self._generations.get(doctor_id, 0) for doctor_id in doctor_ids}
+
+    def bump(self, doctor_id):
+        with self._lock:
+            self._generations[doctor_id] = self._generations.get(doctor_id, 0) + 1
+
+    async def aget_many(self, doctor_ids):
+        return self.get_many(doctor_ids)
+
+    async def abump(self, doctor_id):
+        self.bump(doctor_id)
+
+
+class RedisGenerations:
+    """Generations in Redis (INCR / MGET), shared by every worker.
+
+    If Redis is unreachable a read returns None, which the cache treats as a
+    miss for every doctor.
+    """
+
+    def __init__(self, client, async_client=None, prefix="availability:gen"):
+        self.client = client
+        self.async_client = async_client
+        self.prefix = prefix
+
+    def _keys(self, doctor_ids):
+        return [f"{self.prefix}:{doctor_id}" for doctor_id in doctor_ids]
+
+    def get_many(self, doctor_ids):
+        try:
+            values = self.client.mget(self._keys(doctor_ids)) if doctor_ids else []
+        except redis.RedisError as e:
+            logger.warning("Availability generation read failed: %s", e)
+            return None
+        return {doctor_id: int(value or 0) for doctor_id, value in zip(doctor_ids, values)}
+
+    def bump(self, doctor_id):
+        try:
+            self.client.incr(self._keys([doctor_id])[0])
+        except redis.RedisError as e:
+            # Entries of this doctor elsewhere stay until their TTL
+            logger.warning("Availability invalidation failed: %s", e)
+
+    async def aget_many(self, doctor_ids):
+        try:
+            values = await self.async_client.mget(self._keys(doctor_ids)) if doctor_ids else []
+        except redis.RedisError as e:
+            logger.warning("Availability generation read failed: %s", e)
+            return None
+        return {doctor_id: int(value or 0) for doctor_id, value in zip(doctor_ids, values)}
+
+    async def abump(self, doctor_id):
+        try:
+            await self.async_client.incr(self._keys([doctor_id])[0])
+        except redis.RedisError as e:
+            logger.warning("Availability invalidation failed: %s", e)
+
+
+class AvailabilityCache:
+    """Open slots per doctor over ``cache`` (get/set/delete and their async variants).
+
+    ``lookup`` returns the current entries plus a token holding the
+    generations it read; ``fill`` stores query results stamped with that token.
+    """
+
+    def __init__(self, cache, generations=None):
+        self.cache = cache
+        self.generations = generations or LocalGenerations()
+        self.stale = 0
+        self._stale_lock = threading.Lock()
+
+    def _current(self, doctor_id, entry, generations):
+        if entry is None:
+            return None
+        if entry[0] != generations[doctor_id]:
+            with self._stale_lock:
+                self.stale += 1
+            return None
+        return entry[1]
+
+    def lookup(self, doctor_ids):
+        """({doctor_id: slots or None}, token)"""
+        doctor_ids = list(doctor_ids)
+        generations = self.generations.get_many(doctor_ids)
+        if generations is None:
+            return dict.fromkeys(doctor_ids), None
+        found = {
+            doctor_id: self._current(doctor_id, self.cache.get(doctor_id), generations)
+            for doctor_id in doctor_ids
+        }
+        return found, generations
+
+    def fill(self, slots_by_doctor, token):
+        """Store slots read after ``lookup`` returned ``token``; doctors not in the token are skipped"""
+        if token is None:
+            return
+        for doctor_id, slots in slots_by_doctor.items():
+            if doctor_id in token:
+                self.cache.set(doctor_id, (token[doctor_id], slots))
+
+    def get(self, doctor_id):
+        return self.lookup([doctor_id])[0][doctor_id]
+
+    def invalidate(self, doctor_id):
+        self.generations.bump(doctor_id)
+        self.cache.delete(doctor_id)
+
+    async def alookup(self, doctor_ids):
+        doctor_ids = list(doctor_ids)
+        generations = await self.generations.aget_many(doctor_ids)
+        if generations is None:
+            return dict.fromkeys(doctor_ids), None
+        found = {}
+        for doctor_id in doctor_ids:
+            found[doctor_id] = self._current(doctor_id, await self.cache.aget(doctor_id), generations)
+        return found, generations
+
+    async def afill(self, slots_by_doctor, token):
+        if token is None:
+            return
+        for doctor_id, slots in slots_by_doctor.items():
+            if doctor_id in token:
+                await self.cache.aset(doctor_id, (token[doctor_id], slots))
+
+    async def aget(self, doctor_id):
+        return (await self.alookup([doctor_id]))[0][doctor_id]
+
+    async def ainvalidate(self, doctor_id):
+        await self.generations.abump(doctor_id)
+        await self.cache.adelete(doctor_id)
+
+    def stats(self):
+        stats = dict(self.cache.stats())
+        stats["stale"] = self.stale
+        return stats
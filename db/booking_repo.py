@@ -1,42 +1,37 @@
-from db.connection import get_connection
+from enum import Enum
+from db.patient_repo import normalize_phone
+from db.repository import get_repository
+from db.schedule_repo import invalidate_availability, ainvalidate_availability
+from app.metrics import BOOKING_CONFLICTS, DB_CALL_SECONDS, timed
 
-def book_appointment(doctor_id, patient_name, phone, date, time):
-    conn = get_connection()
-    cur = conn.cursor()
 
+class BookingStatus(Enum):
+    BOOKED = "BOOKED"
+    SLOT_TAKEN = "SLOT_TAKEN"
+
+
+def _booking_status(booked) -> BookingStatus:
+    if booked:
+        return BookingStatus.BOOKED
+    BOOKING_CONFLICTS.inc()
+    return BookingStatus.SLOT_TAKEN
+
+
+@timed(DB_CALL_SECONDS, "db")
+def book_appointment(doctor_id, patient_name, phone, date, time) -> BookingStatus:
+    """Book a slot atomically; returns SLOT_TAKEN if it is no longer open"""
     try:
-        cur.execute("BEGIN")
-
-        # Insert patient
-        cur.execute(
-            "INSERT INTO patients (name, phone) VALUES (%s, %s) RETURNING patient_id",
-            (patient_name, phone)
-        )
-        patient_id = cur.fetchone()[0]
-
-        # Insert appointment
-        cur.execute("""
-            INSERT INTO appointments (doctor_id, patient_id, schedule_date, start_time)
-            VALUES (%s, %s, %s, %s)
-        """, (doctor_id, patient_id, date, time))
-
-        # Update availability
-        cur.execute("""
-            UPDATE doctor_schedules
-            SET is_available = FALSE
-            WHERE doctor_id = %s AND schedule_date = %s AND start_time = %s
-        """, (doctor_id, date, time))
-
-        conn.commit()
-        return True
-    except psycopg2.errors.UniqueViolation:
-        conn.rollback()
-        return False
-
-    except Exception as e:
-        conn.rollback()
-        raise e
+        booked = get_repository().book_appointment(doctor_id, patient_name, normalize_phone(phone), date, time)
+    finally:
+        # Either way the cached slots of this doctor are stale
+        invalidate_availability(doctor_id)
+    return _booking_status(booked)
+
 
+@timed(DB_CALL_SECONDS, "db")
+async def abook_appointment(doctor_id, patient_name, phone, date, time) -> BookingStatus:
+    try:
+        booked = await get_repository().abook_appointment(doctor_id, patient_name, normalize_phone(phone), date, time)
     finally:
-        cur.close()
-        conn.close()
+        await ainvalidate_availability(doctor_id)
+    return _booking_status(booked)
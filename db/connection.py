@@ -1,25 +1,327 @@
+import logging
 import psycopg2
+import psycopg2.pool
 import os
+import threading
+import time
+import asyncio
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from psycopg2 import extensions
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_connection():
-    db_config = {
+logger = logging.getLogger(__name__)
+
+# Pool configuration
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Idle connections older than this are pinged with SELECT 1 before being handed out
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
+
+
+def _db_config():
+    return {
         "host": os.getenv("DB_HOST", "localhost"),
         "database": os.getenv("DB_NAME", "clinic"),
         "user": os.getenv("DB_USER", "postgres"),
         "password": os.getenv("DB_PASSWORD", "admin")
     }
-    
-    print(f"Attempting to connect to database '{db_config['database']}' as user '{db_config['user']}'...")
-    
+
+
+def get_connection():
+    """Open a new, unpooled connection (for scripts and one-off checks)"""
+    db_config = _db_config()
+
+    logger.debug("Connecting to database '%s' as user '%s'", db_config['database'], db_config['user'])
+
     try:
         return psycopg2.connect(**db_config)
     except psycopg2.OperationalError as e:
-        print(f"Database connection failed: {e}")
-        print(f"Please ensure:")
-        print(f"  1. PostgreSQL is running")
-        print(f"  2. Database '{db_config['database']}' exists")
-        print(f"  3. User '{db_config['user']}' exists with correct password")
-        raise
\ No newline at end of file
+        logger.error(
+            "Database connection failed: %s. Please ensure PostgreSQL is running, database '%s' exists "
+            "and user '%s' exists with the correct password",
+            e, db_config['database'], db_config['user']
+        )
+        raise
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """Raised when no connection could be acquired within the timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of PostgreSQL connections.
+
+    Connections are opened lazily up to ``maxconn``; callers block for at most
+    ``timeout`` seconds when every connection is checked out.
+    """
+
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_interval=DB_POOL_HEALTHCHECK_INTERVAL, connect=None):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: need 0 <= minconn <= maxconn and maxconn >= 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._connect = connect or (lambda: psycopg2.connect(**_db_config()))
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []      # list of (connection, returned_at)
+        self._size = 0       # open connections, idle + checked out
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self, timeout=None):
+        """Check a healthy connection out of the pool"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                conn, returned_at = self._reserve(deadline)
+
+            if conn is None:
+                # A slot was reserved for a brand new connection
+                try:
+                    return self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if self._is_healthy(conn, returned_at):
+                return conn
+
+            # Broken connection: drop it and try again with the freed slot
+            self._discard(conn)
+
+    def _reserve(self, deadline):
+        """Pop an idle connection or reserve room for a new one (lock held)"""
+        while True:
+            if self._closed:
+                raise psycopg2.pool.PoolError("connection pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.maxconn:
+                self._size += 1
+                return None, None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(f"no database connection available within {self.timeout}s")
+            self._cond.wait(remaining)
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, resetting any open transaction"""
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        if close or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        """Close idle connections; checked-out ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    @contextmanager
+    def connection(self, autocommit=False):
+        """Borrow a connection; commits on success and rolls back on error.
+
+        With ``autocommit`` each statement commits on its own, which saves the
+        BEGIN/COMMIT round trips for single-statement work.
+        """
+        conn = self.getconn()
+        if autocommit:
+            conn.autocommit = True
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            if autocommit and not conn.closed:
+                conn.autocommit = False
+            self.putconn(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def pooled_connection(autocommit=False):
+    """Borrow a connection from the process-wide pool"""
+    with get_pool().connection(autocommit=autocommit) as conn:
+        yield conn
+
+
+def fetch_all(query, params=None, autocommit=False):
+    """Run a query on a pooled connection and return all rows"""
+    with pooled_connection(autocommit=autocommit) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+
+def fetch_one(query, params=None, autocommit=False):
+    """Run a query on a pooled connection and return the first row (or None)"""
+    with pooled_connection(autocommit=autocommit) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+
+# Async path (psycopg 3). The SQL used by the repositories is shared with the
+# psycopg2 path: both drivers use %s / %(name)s placeholders.
+
+_async_pool = None
+_async_pool_lock = asyncio.Lock()
+_async_returned_at = weakref.WeakKeyDictionary()
+
+
+async def _stamp_returned(conn):
+    _async_returned_at[conn] = time.monotonic()
+
+
+async def _check_idle_connection(conn):
+    """Same policy as the sync pool: only ping connections idle for a while"""
+    returned_at = _async_returned_at.get(conn)
+    if returned_at is not None and time.monotonic() - returned_at < DB_POOL_HEALTHCHECK_INTERVAL:
+        return
+    from psycopg_pool import AsyncConnectionPool
+
+    await AsyncConnectionPool.check_connection(conn)
+
+
+async def get_async_pool():
+    """Return the process-wide async connection pool, opening it on first use"""
+    global _async_pool
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                from psycopg_pool import AsyncConnectionPool
+
+                db_config = _db_config()
+                db_config["dbname"] = db_config.pop("database")
+                pool = AsyncConnectionPool(
+                    kwargs=db_config,
+                    min_size=DB_POOL_MIN,
+                    max_size=DB_POOL_MAX,
+                    timeout=DB_POOL_TIMEOUT,
+                    check=_check_idle_connection,
+                    reset=_stamp_returned,
+                    open=False
+                )
+                await pool.open()
+                _async_pool = pool
+    return _async_pool
+
+
+async def close_async_pool():
+    """Close the process-wide async connection pool"""
+    global _async_pool
+    if _async_pool is not None:
+        pool, _async_pool = _async_pool, None
+        await pool.close()
+
+
+@asynccontextmanager
+async def async_pooled_connection(autocommit=False):
+    """Borrow a connection from the async pool; commits on success, rolls back on error"""
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        if autocommit:
+            await conn.set_autocommit(True)
+        try:
+            yield conn
+        finally:
+            if autocommit and not conn.closed:
+                await conn.set_autocommit(False)
+
+
+async def afetch_all(query, params=None, autocommit=False):
+    """Async fetch_all"""
+    async with async_pooled_connection(autocommit=autocommit) as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+
+async def afetch_one(query, params=None, autocommit=False):
+    """Async fetch_one"""
+    async with async_pooled_connection(autocommit=autocommit) as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchone()
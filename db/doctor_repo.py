@@ -1,10 +1,195 @@
-from db.connection import get_connection
+import asyncio
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from db.repository import get_repository
+from app.metrics import DB_CALL_SECONDS, timed
 
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the in-memory doctor directory is reloaded from the database
+DOCTOR_DIRECTORY_TTL = int(os.getenv("DOCTOR_DIRECTORY_TTL", "300"))
+# Seconds before a failed reload is retried; doubles on each failure, up to the TTL
+DOCTOR_DIRECTORY_RETRY = float(os.getenv("DOCTOR_DIRECTORY_RETRY", "5"))
+
+
+def normalize_doctor_name(name: str) -> str:
+    """Case-, whitespace- and dot-insensitive form of a doctor name ("dr. x" == "Dr X")"""
+    return " ".join(name.replace(".", " ").split()).casefold()
+
+
+def _fetch_all_doctors():
+    return get_repository().all_doctors()
+
+
+async def _afetch_all_doctors():
+    return await get_repository().aall_doctors()
+
+
+class DoctorDirectory:
+    """In-memory doctor roster indexed by specialty and by normalized name.
+
+    Reloaded from the database when older than ``ttl`` seconds or on
+    ``refresh()``. If a reload fails the previous roster keeps being served
+    and the next attempt waits ``retry`` seconds, doubling per failure, so a
+    database outage is not hit by every request.
+    """
+
+    def __init__(self, ttl=DOCTOR_DIRECTORY_TTL, loader=_fetch_all_doctors, async_loader=_afetch_all_doctors,
+                 clock=time.monotonic, retry=DOCTOR_DIRECTORY_RETRY):
+        self.ttl = ttl
+        self.retry = retry
+        self._loader = loader
+        self._async_loader = async_loader
+        self._async_refresh_lock = asyncio.Lock()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._by_speciality = {}
+        self._by_name = {}          # (speciality, normalized name) -> row
+        self._loaded_at = None
+        self._failures = 0
+        self._retry_at = None
+
+    def refresh(self):
+        """Reload the roster from the database; returns the number of doctors"""
+        return self._install(self._loader())
+
+    async def arefresh(self):
+        return self._install(await self._async_loader())
+
+    def _install(self, rows):
+        by_speciality = {}
+        by_name = {}
+        for row in rows:
+            doctor_id, name, speciality = row
+            by_speciality.setdefault(speciality, []).append(row)
+            by_name.setdefault((speciality, normalize_doctor_name(name)), row)
+        with self._lock:
+            self._by_speciality = by_speciality
+            self._by_name = by_name
+            self._loaded_at = self._clock()
+            self._failures = 0
+            self._retry_at = None
+        return len(rows)
+
+    def _reload_failed(self, error):
+        self._failures += 1
+        delay = min(self.ttl, self.retry * 2 ** (self._failures - 1))
+        self._retry_at = self._clock() + delay
+        logger.warning("Doctor directory refresh failed, serving previous roster for %.0fs: %s", delay, error)
+
+    def _is_fresh(self):
+        if self._loaded_at is None:
+            return False
+        now = self._clock()
+        if self._retry_at is not None and now < self._retry_at:
+            return True
+        return now - self._loaded_at < self.ttl
+
+    def _ensure_fresh(self):
+        if self._is_fresh():
+            return
+        if self._loaded_at is None:
+            # Nothing to serve yet: wait for whichever thread is loading
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self.refresh()
+            return
+        # Stale roster: one thread reloads, the others keep serving it meanwhile
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            self._reload_failed(e)
+        finally:
+            self._refresh_lock.release()
+
+    async def _aensure_fresh(self):
+        if self._is_fresh():
+            return
+        if self._loaded_at is None:
+            async with self._async_refresh_lock:
+                if self._loaded_at is None:
+                    await self.arefresh()
+            return
+        if self._async_refresh_lock.locked():
+            return
+        async with self._async_refresh_lock:
+            try:
+                await self.arefresh()
+            except Exception as e:
+                self._reload_failed(e)
+
+    def by_speciality(self, speciality: str):
+        self._ensure_fresh()
+        return list(self._by_speciality.get(speciality, []))
+
+    def find_by_name(self, name: str, speciality: str):
+        self._ensure_fresh()
+        return self._by_name.get((speciality, normalize_doctor_name(name)))
+
+    async def aby_speciality(self, speciality: str):
+        await self._aensure_fresh()
+        return list(self._by_speciality.get(speciality, []))
+
+    async def afind_by_name(self, name: str, speciality: str):
+        await self._aensure_fresh()
+        return self._by_name.get((speciality, normalize_doctor_name(name)))
+
+    def stats(self):
+        return {
+            "doctors": len(self._by_name),
+            "specialities": len(self._by_speciality),
+            "age_seconds": None if self._loaded_at is None else self._clock() - self._loaded_at,
+            "failed_reloads": self._failures
+        }
+
+
+_directory = DoctorDirectory()
+
+
+# Undecorated bodies for callers in db/ that are timed themselves; nesting @timed
+# calls would count one call twice in DB_CALL_SECONDS
+def _doctors_by_speciality(speciality: str):
+    return _directory.by_speciality(speciality)
+
+
+async def _adoctors_by_speciality(speciality: str):
+    return await _directory.aby_speciality(speciality)
+
+
+@timed(DB_CALL_SECONDS, "db")
 def get_doctors_by_speciality(speciality: str):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT doctor_id, name, specialty FROM doctors WHERE specialty = %s", (speciality,))
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
\ No newline at end of file
+    return _doctors_by_speciality(speciality)
+
+
+@timed(DB_CALL_SECONDS, "db")
+def find_doctor_by_name(name: str, speciality: str):
+    """Doctor row (doctor_id, name, specialty) matching a normalized name, or None"""
+    return _directory.find_by_name(name, speciality)
+
+
+@timed(DB_CALL_SECONDS, "db")
+def refresh_doctor_directory():
+    """Reload the doctor directory now (startup and admin hook)"""
+    return _directory.refresh()
+
+
+def get_doctor_directory_stats():
+    return _directory.stats()
+
+
+@timed(DB_CALL_SECONDS, "db")
+async def aget_doctors_by_speciality(speciality: str):
+    return await _adoctors_by_speciality(speciality)
+
+
+@timed(DB_CALL_SECONDS, "db")
+async def afind_doctor_by_name(name: str, speciality: str):
+    return await _directory.afind_by_name(name, speciality)
@@ -0,0 +1,42 @@
+-- Databases created before idx_patients_phone: normalize stored phone numbers
+-- the way db/patient_repo.normalize_phone does, merge patients that share a
+-- number into the oldest row (keeping its name), then add the unique index
+-- the booking upsert relies on.
+--
+--   psql -d clinic -f db/migrations/001_unique_patient_phone.sql
+
+BEGIN;
+
+-- Digits only, keeping a leading '+'; no digits at all becomes NULL
+UPDATE patients p
+SET phone = CASE
+        WHEN n.digits = '' THEN NULL
+        WHEN btrim(p.phone) LIKE '+%' THEN '+' || n.digits
+        ELSE n.digits
+    END
+FROM (
+    SELECT patient_id, regexp_replace(phone, '[^0-9]', '', 'g') AS digits
+    FROM patients
+    WHERE phone IS NOT NULL
+) n
+WHERE n.patient_id = p.patient_id;
+
+CREATE TEMP TABLE patient_merge ON COMMIT DROP AS
+SELECT patient_id, min(patient_id) OVER (PARTITION BY phone) AS keep_id
+FROM patients
+WHERE phone IS NOT NULL;
+
+UPDATE appointments a
+SET patient_id = m.keep_id
+FROM patient_merge m
+WHERE a.patient_id = m.patient_id
+  AND m.patient_id <> m.keep_id;
+
+DELETE FROM patients p
+USING patient_merge m
+WHERE p.patient_id = m.patient_id
+  AND m.patient_id <> m.keep_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_phone ON patients(phone);
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- Databases created before idx_schedules_open_slots: add the partial index the
+-- open-slot queries (keyset next slot, has/with open slots) scan.
+--
+--   psql -d clinic -f db/migrations/002_open_slots_index.sql
+--
+-- CONCURRENTLY keeps bookings running while the index builds, and cannot run
+-- inside a transaction block, so there is no BEGIN/COMMIT here. If the build
+-- fails it leaves an INVALID index: DROP INDEX CONCURRENTLY it and run again.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_schedules_open_slots
+    ON doctor_schedules(doctor_id, schedule_date, start_time)
+    WHERE is_available;
@@ -0,0 +1,27 @@
+from db.repository import get_repository
+from app.metrics import DB_CALL_SECONDS, timed
+
+def normalize_phone(phone):
+    """Digits of a phone number, keeping a leading '+'; None if there are no digits"""
+    if not phone:
+        return None
+    phone = phone.strip()
+    digits = "".join(c for c in phone if c.isdigit())
+    if not digits:
+        return None
+    return f"+{digits}" if phone.startswith("+") else digits
+
+@timed(DB_CALL_SECONDS, "db")
+def find_patient_by_phone(phone):
+    """Patient row (patient_id, name, phone) for a phone number, or None"""
+    phone = normalize_phone(phone)
+    if phone is None:
+        return None
+    return get_repository().find_patient(phone)
+
+@timed(DB_CALL_SECONDS, "db")
+async def afind_patient_by_phone(phone):
+    phone = normalize_phone(phone)
+    if phone is None:
+        return None
+    return await get_repository().afind_patient(phone)
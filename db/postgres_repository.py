@@ -0,0 +1,231 @@
+import psycopg
+import psycopg2
+from db.connection import fetch_all, fetch_one, afetch_all, afetch_one, close_pool, close_async_pool
+from db.repository import ClinicRepository
+
+ALL_DOCTORS_SQL = "SELECT doctor_id, name, specialty FROM doctors ORDER BY doctor_id"
+
+SLOT_AVAILABLE_SQL = """
+    SELECT is_available
+    FROM doctor_schedules
+    WHERE doctor_id = %s
+      AND schedule_date = %s
+      AND start_time = %s
+"""
+
+AVAILABLE_SLOTS_SQL = """
+    SELECT schedule_date, start_time, end_time
+    FROM doctor_schedules
+    WHERE doctor_id = %s
+      AND is_available = TRUE
+    ORDER BY schedule_date, start_time
+"""
+
+SLOTS_FOR_DOCTORS_SQL = """
+    SELECT doctor_id, schedule_date, start_time, end_time
+    FROM doctor_schedules
+    WHERE doctor_id = ANY(%s)
+      AND is_available = TRUE
+    ORDER BY doctor_id, schedule_date, start_time
+"""
+
+SLOTS_BY_SPECIALITY_SQL = """
+    SELECT d.doctor_id, s.schedule_date, s.start_time, s.end_time
+    FROM doctors d
+    LEFT JOIN doctor_schedules s
+      ON s.doctor_id = d.doctor_id
+     AND s.is_available = TRUE
+    WHERE d.specialty = %s
+    ORDER BY d.doctor_id, s.schedule_date, s.start_time
+"""
+
+DOCTORS_WITH_OPEN_SLOTS_SQL = """
+    SELECT d.doctor_id
+    FROM unnest(%s::int[]) AS d(doctor_id)
+    WHERE EXISTS (
+        SELECT 1
+        FROM doctor_schedules s
+        WHERE s.doctor_id = d.doctor_id
+          AND s.is_available = TRUE
+    )
+"""
+
+HAS_OPEN_SLOT_SQL = """
+    SELECT EXISTS (
+        SELECT 1
+        FROM doctor_schedules
+        WHERE doctor_id = ANY(%s)
+          AND is_available = TRUE
+    )
+"""
+
+PATIENT_BY_PHONE_SQL = "SELECT patient_id, name, phone FROM patients WHERE phone = %s"
+
+# Claims the slot only if it is still open, then adds the patient (keyed by
+# normalized phone) unless the number is known, and creates the appointment
+# from the claimed row. A returning patient keeps their stored name. If the slot
+# was taken nothing is written.
+#
+# A number first inserted by a concurrent booking is invisible to both the
+# DO NOTHING insert and this statement's snapshot: patient_id comes out NULL,
+# the NOT NULL constraint fails the whole statement, and it is run again.
+BOOK_APPOINTMENT_SQL = """
+    WITH claimed AS (
+        UPDATE doctor_schedules
+        SET is_available = FALSE
+        WHERE doctor_id = %(doctor_id)s
+          AND schedule_date = %(date)s
+          AND start_time = %(time)s
+          AND is_available = TRUE
+        RETURNING doctor_id, schedule_date, start_time
+    ), inserted AS (
+        INSERT INTO patients (name, phone)
+        SELECT %(patient_name)s, %(phone)s
+        FROM claimed
+        ON CONFLICT (phone) DO NOTHING
+        RETURNING patient_id
+    )
+    INSERT INTO appointments (doctor_id, patient_id, schedule_date, start_time)
+    SELECT
+        claimed.doctor_id,
+        COALESCE(
+            (SELECT patient_id FROM inserted),
+            (SELECT patient_id FROM patients WHERE phone = %(phone)s)
+        ),
+        claimed.schedule_date,
+        claimed.start_time
+    FROM claimed
+    RETURNING appointment_id
+"""
+
+# Runs of BOOK_APPOINTMENT_SQL that lost the race to add the same new patient
+BOOKING_ATTEMPTS = 2
+
+
+def _next_slots_query(doctor_id, after, exclude, limit):
+    """Keyset query for the next open slots after ``after``, skipping ``exclude``"""
+    query = """
+        SELECT schedule_date, start_time, end_time
+        FROM doctor_schedules
+        WHERE doctor_id = %s
+          AND is_available = TRUE
+    """
+    params = [doctor_id]
+    if after is not None:
+        query += " AND (schedule_date, start_time) > (%s::date, %s::time)"
+        params.extend(str(value) for value in after)
+    if exclude:
+        query += """
+          AND (schedule_date, start_time) NOT IN (
+              SELECT * FROM unnest(%s::date[], %s::time[])
+          )
+        """
+        params.append([str(slot[0]) for slot in exclude])
+        params.append([str(slot[1]) for slot in exclude])
+    query += " ORDER BY schedule_date, start_time LIMIT %s"
+    params.append(limit)
+    return query, params
+
+
+def _booking_params(doctor_id, patient_name, phone, date, time):
+    return {
+        "doctor_id": doctor_id,
+        "patient_name": patient_name,
+        "phone": phone,
+        "date": date,
+        "time": time
+    }
+
+
+class PostgresRepository(ClinicRepository):
+    """The clinic database from .env: psycopg2 pool for sync calls, psycopg 3 pool for async ones"""
+
+    def all_doctors(self):
+        return fetch_all(ALL_DOCTORS_SQL)
+
+    def slot_available(self, doctor_id, date, time):
+        row = fetch_one(SLOT_AVAILABLE_SQL, (doctor_id, date, time))
+        return row is not None and row[0] is True
+
+    def available_slots(self, doctor_id):
+        return fetch_all(AVAILABLE_SLOTS_SQL, (doctor_id,))
+
+    def slots_for_doctors(self, doctor_ids):
+        return fetch_all(SLOTS_FOR_DOCTORS_SQL, (list(doctor_ids),))
+
+    def slots_by_speciality(self, speciality):
+        return fetch_all(SLOTS_BY_SPECIALITY_SQL, (speciality,))
+
+    def doctors_with_open_slots(self, doctor_ids):
+        return {row[0] for row in fetch_all(DOCTORS_WITH_OPEN_SLOTS_SQL, (list(doctor_ids),))}
+
+    def has_open_slot(self, doctor_ids):
+        return fetch_one(HAS_OPEN_SLOT_SQL, (list(doctor_ids),))[0]
+
+    def next_open_slots(self, doctor_id, after, exclude, limit):
+        return fetch_all(*_next_slots_query(doctor_id, after, exclude, limit))
+
+    def book_appointment(self, doctor_id, patient_name, phone, date, time):
+        params = _booking_params(doctor_id, patient_name, phone, date, time)
+        for attempt in range(BOOKING_ATTEMPTS):
+            try:
+                # One statement is atomic on its own, so skip the BEGIN/COMMIT round trips
+                return fetch_one(BOOK_APPOINTMENT_SQL, params, autocommit=True) is not None
+            except psycopg2.errors.UniqueViolation:
+                # An appointment already exists for a slot still flagged open
+                return False
+            except psycopg2.errors.NotNullViolation:
+                # The patient was added concurrently; the next run sees the row
+                if attempt == BOOKING_ATTEMPTS - 1:
+                    raise
+
+    def find_patient(self, phone):
+        return fetch_one(PATIENT_BY_PHONE_SQL, (phone,))
+
+    def close(self):
+        close_pool()
+
+    # Async variants (same SQL, psycopg 3 driver)
+
+    async def aall_doctors(self):
+        return await afetch_all(ALL_DOCTORS_SQL)
+
+    async def aslot_available(self, doctor_id, date, time):
+        row = await afetch_one(SLOT_AVAILABLE_SQL, (doctor_id, date, time))
+        return row is not None and row[0] is True
+
+    async def aavailable_slots(self, doctor_id):
+        return await afetch_all(AVAILABLE_SLOTS_SQL, (doctor_id,))
+
+    async def aslots_for_doctors(self, doctor_ids):
+        return await afetch_all(SLOTS_FOR_DOCTORS_SQL, (list(doctor_ids),))
+
+    async def aslots_by_speciality(self, speciality):
+        return await afetch_all(SLOTS_BY_SPECIALITY_SQL, (speciality,))
+
+    async def adoctors_with_open_slots(self, doctor_ids):
+        return {row[0] for row in await afetch_all(DOCTORS_WITH_OPEN_SLOTS_SQL, (list(doctor_ids),))}
+
+    async def ahas_open_slot(self, doctor_ids):
+        return (await afetch_one(HAS_OPEN_SLOT_SQL, (list(doctor_ids),)))[0]
+
+    async def anext_open_slots(self, doctor_id, after, exclude, limit):
+        return await afetch_all(*_next_slots_query(doctor_id, after, exclude, limit))
+
+    async def abook_appointment(self, doctor_id, patient_name, phone, date, time):
+        params = _booking_params(doctor_id, patient_name, phone, date, time)
+        for attempt in range(BOOKING_ATTEMPTS):
+            try:
+                return await afetch_one(BOOK_APPOINTMENT_SQL, params, autocommit=True) is not None
+            except psycopg.errors.UniqueViolation:
+                return False
+            except psycopg.errors.NotNullViolation:
+                if attempt == BOOKING_ATTEMPTS - 1:
+                    raise
+
+    async def afind_patient(self, phone):
+        return await afetch_one(PATIENT_BY_PHONE_SQL, (phone,))
+
+    async def aclose(self):
+        await close_async_pool()
+        close_pool()
@@ -0,0 +1,163 @@
+"""
+Storage backend behind the db/ repository modules.
+
+doctor_repo, schedule_repo, patient_repo and booking_repo keep the caching and
+business rules; the queries themselves go through a ClinicRepository, chosen
+with DB_BACKEND:
+
+    postgres  the clinic database from .env (psycopg2 / psycopg 3 pools)
+    sqlite    an embedded database built from db/schema.sql and db/seed.sql,
+              at SQLITE_PATH (":memory:" keeps it in process memory)
+"""
+import abc
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", ":memory:")
+
+
+class ClinicRepository(abc.ABC):
+    """Queries for doctors, schedules, patients and bookings.
+
+    Rows come back in the shapes the Postgres drivers return: tuples with
+    ``datetime.date`` / ``datetime.time`` values. Each method has an ``a``
+    prefixed async variant; by default it runs the sync method inline, which
+    suits backends that never wait on the network. A backend missing a query
+    cannot be instantiated.
+    """
+
+    @abc.abstractmethod
+    def all_doctors(self):
+        """[(doctor_id, name, specialty)] ordered by doctor_id"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def slot_available(self, doctor_id, date, time) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def available_slots(self, doctor_id):
+        """[(schedule_date, start_time, end_time)] open slots of a doctor, in date/time order"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def slots_for_doctors(self, doctor_ids):
+        """[(doctor_id, schedule_date, start_time, end_time)] open slots of several doctors"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def slots_by_speciality(self, speciality):
+        """Same rows for every doctor of a specialty; doctors without open slots get one row of None dates"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def doctors_with_open_slots(self, doctor_ids) -> set:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def has_open_slot(self, doctor_ids) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def next_open_slots(self, doctor_id, after, exclude, limit):
+        """Keyset page of open slots after the (date, time) ``after``, skipping the ``exclude`` pairs"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def book_appointment(self, doctor_id, patient_name, phone, date, time) -> bool:
+        """Claim an open slot, add the patient unless the phone is known, and create the appointment, atomically.
+
+        Returns False, writing nothing, if the slot is not open.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find_patient(self, phone):
+        """(patient_id, name, phone) for a normalized phone number, or None"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections (shutdown)"""
+
+    async def aall_doctors(self):
+        return self.all_doctors()
+
+    async def aslot_available(self, doctor_id, date, time) -> bool:
+        return self.slot_available(doctor_id, date, time)
+
+    async def aavailable_slots(self, doctor_id):
+        return self.available_slots(doctor_id)
+
+    async def aslots_for_doctors(self, doctor_ids):
+        return self.slots_for_doctors(doctor_ids)
+
+    async def aslots_by_speciality(self, speciality):
+        return self.slots_by_speciality(speciality)
+
+    async def adoctors_with_open_slots(self, doctor_ids) -> set:
+        return self.doctors_with_open_slots(doctor_ids)
+
+    async def ahas_open_slot(self, doctor_ids) -> bool:
+        return self.has_open_slot(doctor_ids)
+
+    async def anext_open_slots(self, doctor_id, after, exclude, limit):
+        return self.next_open_slots(doctor_id, after, exclude, limit)
+
+    async def abook_appointment(self, doctor_id, patient_name, phone, date, time) -> bool:
+        return self.book_appointment(doctor_id, patient_name, phone, date, time)
+
+    async def afind_patient(self, phone):
+        return self.find_patient(phone)
+
+    async def aclose(self):
+        self.close()
+
+
+def make_repository(backend=DB_BACKEND, **options) -> ClinicRepository:
+    """Repository for a DB_BACKEND name; ``options`` go to its constructor"""
+    if backend == "postgres":
+        from db.postgres_repository import PostgresRepository
+        return PostgresRepository(**options)
+    if backend == "sqlite":
+        from db.sqlite_repository import SQLiteRepository
+        options.setdefault("path", SQLITE_PATH)
+        return SQLiteRepository(**options)
+    raise ValueError(f"Unknown DB_BACKEND {backend!r} (expected 'postgres' or 'sqlite')")
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> ClinicRepository:
+    """The process-wide repository, created from DB_BACKEND on first use"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            # Threads racing here must share one (possibly in-memory) database
+            if _repository is None:
+                _repository = make_repository()
+                logger.info("Using %s database backend", DB_BACKEND)
+    return _repository
+
+
+def set_repository(repository: ClinicRepository) -> ClinicRepository:
+    """Swap the process-wide repository (tests, load tests, benchmarks); returns the previous one"""
+    global _repository
+    previous, _repository = _repository, repository
+    return previous
+
+
+async def aclose_repository():
+    """Close the process-wide repository (shutdown); the next use starts a new one"""
+    global _repository
+    repository, _repository = _repository, None
+    if repository is not None:
+        await repository.aclose()
@@ -1,31 +1,218 @@
-from db.connection import get_connection
+import datetime
+from bisect import bisect_right
+from db.doctor_repo import _doctors_by_speciality, _adoctors_by_speciality
+from db.repository import get_repository
+from app.metrics import DB_CALL_SECONDS, timed
 
+# Open slots per doctor (db.availability_cache.AvailabilityCache), installed by
+# the application with set_availability_cache; None queries every time
+_availability_cache = None
+
+
+def set_availability_cache(cache):
+    """Install the availability cache (None turns it off); returns the previous one"""
+    global _availability_cache
+    previous, _availability_cache = _availability_cache, cache
+    return previous
+
+
+def invalidate_availability(doctor_id):
+    """Drop the cached open slots of a doctor (call after booking)"""
+    if _availability_cache is not None:
+        _availability_cache.invalidate(doctor_id)
+
+
+async def ainvalidate_availability(doctor_id):
+    if _availability_cache is not None:
+        await _availability_cache.ainvalidate(doctor_id)
+
+
+def _as_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value))
+
+
+def _as_time(value):
+    return value if isinstance(value, datetime.time) else datetime.time.fromisoformat(str(value))
+
+
+def _group_slots(rows, doctor_ids):
+    slots = {doctor_id: [] for doctor_id in doctor_ids}
+    for doctor_id, schedule_date, start_time, end_time in rows:
+        doctor_slots = slots.setdefault(doctor_id, [])
+        if schedule_date is not None:
+            doctor_slots.append((schedule_date, start_time, end_time))
+    return slots
+
+
+def _next_cached_slots(slots, after, exclude, limit):
+    """In-memory equivalent of the keyset query over a cached, sorted slot list"""
+    start = 0
+    if after is not None:
+        start = bisect_right(slots, (_as_date(after[0]), _as_time(after[1]), datetime.time.max))
+    skipped = {(_as_date(d), _as_time(t)) for d, t in exclude}
+    result = []
+    for slot in slots[start:]:
+        if (slot[0], slot[1]) in skipped:
+            continue
+        result.append(slot)
+        if len(result) == limit:
+            break
+    return result
+
+
+def _slots_for_doctors(doctor_ids):
+    """Body of get_available_slots_for_doctors, untimed for the timed functions that use it"""
+    token = None
+    slots = {doctor_id: None for doctor_id in doctor_ids}
+    if _availability_cache is not None:
+        slots, token = _availability_cache.lookup(slots)
+    missing = [doctor_id for doctor_id, cached in slots.items() if cached is None]
+    if not missing:
+        return slots
+
+    fetched = _group_slots(get_repository().slots_for_doctors(missing), missing)
+    slots.update(fetched)
+    if _availability_cache is not None:
+        _availability_cache.fill(fetched, token)
+    return slots
+
+
+async def _aslots_for_doctors(doctor_ids):
+    token = None
+    slots = {doctor_id: None for doctor_id in doctor_ids}
+    if _availability_cache is not None:
+        slots, token = await _availability_cache.alookup(slots)
+    missing = [doctor_id for doctor_id, cached in slots.items() if cached is None]
+    if not missing:
+        return slots
+
+    fetched = _group_slots(await get_repository().aslots_for_doctors(missing), missing)
+    slots.update(fetched)
+    if _availability_cache is not None:
+        await _availability_cache.afill(fetched, token)
+    return slots
+
+
+@timed(DB_CALL_SECONDS, "db")
 def is_slot_available(doctor_id, date, time):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT is_available
-        FROM doctor_schedules
-        WHERE doctor_id = %s
-          AND schedule_date = %s
-          AND start_time = %s
-    """, (doctor_id, date, time))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return row is not None and row[0] is True
+    return get_repository().slot_available(doctor_id, date, time)
 
+@timed(DB_CALL_SECONDS, "db")
 def get_available_slots(doctor_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT schedule_date, start_time, end_time
-        FROM doctor_schedules
-        WHERE doctor_id = %s
-          AND is_available = TRUE
-        ORDER BY schedule_date, start_time
-    """, (doctor_id,))
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
\ No newline at end of file
+    if _availability_cache is not None:
+        return _slots_for_doctors([doctor_id])[doctor_id]
+    return get_repository().available_slots(doctor_id)
+
+@timed(DB_CALL_SECONDS, "db")
+def get_available_slots_for_doctors(doctor_ids):
+    """Open slots for several doctors in one query, keyed by doctor_id"""
+    return _slots_for_doctors(doctor_ids)
+
+@timed(DB_CALL_SECONDS, "db")
+def get_available_slots_by_speciality(speciality: str):
+    """Open slots for every doctor of a specialty in one query, keyed by doctor_id"""
+    if _availability_cache is not None:
+        # The roster gives the ids to read generations for before querying
+        return _slots_for_doctors([row[0] for row in _doctors_by_speciality(speciality)])
+    return _group_slots(get_repository().slots_by_speciality(speciality), ())
+
+@timed(DB_CALL_SECONDS, "db")
+def get_doctors_with_open_slots(doctor_ids):
+    """Subset of doctor_ids that have at least one open slot"""
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return set()
+    open_ids, missing = set(), doctor_ids
+    if _availability_cache is not None:
+        # Cached doctors answer locally; the rest take the EXISTS query, not a full slot load
+        cached, _ = _availability_cache.lookup(doctor_ids)
+        open_ids = {doctor_id for doctor_id, slots in cached.items() if slots}
+        missing = [doctor_id for doctor_id, slots in cached.items() if slots is None]
+    if missing:
+        open_ids |= get_repository().doctors_with_open_slots(missing)
+    return open_ids
+
+@timed(DB_CALL_SECONDS, "db")
+def has_open_slot(doctor_ids):
+    """True if any of the given doctors has an open slot"""
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return False
+    missing = doctor_ids
+    if _availability_cache is not None:
+        cached, _ = _availability_cache.lookup(doctor_ids)
+        if any(cached.values()):
+            return True
+        missing = [doctor_id for doctor_id, slots in cached.items() if slots is None]
+    return bool(missing) and get_repository().has_open_slot(missing)
+
+@timed(DB_CALL_SECONDS, "db")
+def get_next_open_slots(doctor_id, after=None, exclude=(), limit=1):
+    """Next ``limit`` open slots for a doctor, in date/time order.
+
+    ``after`` is an optional (date, time) keyset cursor; only later slots are
+    returned. ``exclude`` is an iterable of (date, time) pairs to skip.
+    """
+    exclude = list(exclude)
+    cached = _availability_cache.get(doctor_id) if _availability_cache is not None else None
+    if cached is not None:
+        return _next_cached_slots(cached, after, exclude, limit)
+    return get_repository().next_open_slots(doctor_id, after, exclude, limit)
+
+
+# Async variants for the async request path
+
+@timed(DB_CALL_SECONDS, "db")
+async def ais_slot_available(doctor_id, date, time):
+    return await get_repository().aslot_available(doctor_id, date, time)
+
+@timed(DB_CALL_SECONDS, "db")
+async def aget_available_slots(doctor_id):
+    if _availability_cache is not None:
+        return (await _aslots_for_doctors([doctor_id]))[doctor_id]
+    return await get_repository().aavailable_slots(doctor_id)
+
+@timed(DB_CALL_SECONDS, "db")
+async def aget_available_slots_for_doctors(doctor_ids):
+    return await _aslots_for_doctors(doctor_ids)
+
+@timed(DB_CALL_SECONDS, "db")
+async def aget_available_slots_by_speciality(speciality: str):
+    if _availability_cache is not None:
+        return await _aslots_for_doctors([row[0] for row in await _adoctors_by_speciality(speciality)])
+    return _group_slots(await get_repository().aslots_by_speciality(speciality), ())
+
+@timed(DB_CALL_SECONDS, "db")
+async def aget_doctors_with_open_slots(doctor_ids):
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return set()
+    open_ids, missing = set(), doctor_ids
+    if _availability_cache is not None:
+        cached, _ = await _availability_cache.alookup(doctor_ids)
+        open_ids = {doctor_id for doctor_id, slots in cached.items() if slots}
+        missing = [doctor_id for doctor_id, slots in cached.items() if slots is None]
+    if missing:
+        open_ids |= await get_repository().adoctors_with_open_slots(missing)
+    return open_ids
+
+@timed(DB_CALL_SECONDS, "db")
+async def ahas_open_slot(doctor_ids):
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return False
+    missing = doctor_ids
+    if _availability_cache is not None:
+        cached, _ = await _availability_cache.alookup(doctor_ids)
+        if any(cached.values()):
+            return True
+        missing = [doctor_id for doctor_id, slots in cached.items() if slots is None]
+    return bool(missing) and await get_repository().ahas_open_slot(missing)
+
+@timed(DB_CALL_SECONDS, "db")
+async def aget_next_open_slots(doctor_id, after=None, exclude=(), limit=1):
+    exclude = list(exclude)
+    cached = await _availability_cache.aget(doctor_id) if _availability_cache is not None else None
+    if cached is not None:
+        return _next_cached_slots(cached, after, exclude, limit)
+    return await get_repository().anext_open_slots(doctor_id, after, exclude, limit)
@@ -31,4 +31,8 @@ CREATE TABLE appointments(
 );
 
 CREATE INDEX idx_doctors_specialty ON doctors(specialty);
-CREATE INDEX idx_schedules_doctor_date ON doctor_schedules(doctor_id, schedule_date);
\ No newline at end of file
+-- One patient per normalized phone number (see db/patient_repo.normalize_phone)
+CREATE UNIQUE INDEX idx_patients_phone ON patients(phone);
+CREATE INDEX idx_schedules_doctor_date ON doctor_schedules(doctor_id, schedule_date);
+-- Open-slot lookups only ever scan available rows, in (date, time) order
+CREATE INDEX idx_schedules_open_slots ON doctor_schedules(doctor_id, schedule_date, start_time) WHERE is_available;
@@ -0,0 +1,284 @@
+"""
+Embedded SQLite backend, built from db/schema.sql and db/seed.sql.
+
+The Postgres-only syntax in those files (SERIAL keys, CURRENT_DATE + INTERVAL)
+is rewritten on load. Dates and times are stored as ISO text ("2026-01-22",
+"10:00:00") so they compare in order and are returned as datetime values.
+"""
+import datetime
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from db.repository import ClinicRepository
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+SEED_PATH = os.path.join(os.path.dirname(__file__), "seed.sql")
+
+_POSTGRES_SYNTAX = [
+    (re.compile(r"\bSERIAL PRIMARY KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bCURRENT_DATE\s*([+-])\s*INTERVAL\s+'(\d+) days?'", re.I), r"date('now', 'localtime', '\1\2 days')"),
+    (re.compile(r"\bCURRENT_DATE\b", re.I), "date('now', 'localtime')"),
+]
+
+ALL_DOCTORS_SQL = "SELECT doctor_id, name, specialty FROM doctors ORDER BY doctor_id"
+
+SLOT_AVAILABLE_SQL = """
+    SELECT is_available
+    FROM doctor_schedules
+    WHERE doctor_id = ?
+      AND schedule_date = ?
+      AND start_time = ?
+"""
+
+AVAILABLE_SLOTS_SQL = """
+    SELECT schedule_date, start_time, end_time
+    FROM doctor_schedules
+    WHERE doctor_id = ?
+      AND is_available
+    ORDER BY schedule_date, start_time
+"""
+
+# Id lists are passed as one JSON array parameter, SQLite's stand-in for ANY(%s)
+SLOTS_FOR_DOCTORS_SQL = """
+    SELECT doctor_id, schedule_date, start_time, end_time
+    FROM doctor_schedules
+    WHERE doctor_id IN (SELECT value FROM json_each(?))
+      AND is_available
+    ORDER BY doctor_id, schedule_date, start_time
+"""
+
+SLOTS_BY_SPECIALITY_SQL = """
+    SELECT d.doctor_id, s.schedule_date, s.start_time, s.end_time
+    FROM doctors d
+    LEFT JOIN doctor_schedules s
+      ON s.doctor_id = d.doctor_id
+     AND s.is_available
+    WHERE d.specialty = ?
+    ORDER BY d.doctor_id, s.schedule_date, s.start_time
+"""
+
+DOCTORS_WITH_OPEN_SLOTS_SQL = """
+    SELECT DISTINCT doctor_id
+    FROM doctor_schedules
+    WHERE doctor_id IN (SELECT value FROM json_each(?))
+      AND is_available
+"""
+
+HAS_OPEN_SLOT_SQL = """
+    SELECT EXISTS (
+        SELECT 1
+        FROM doctor_schedules
+        WHERE doctor_id IN (SELECT value FROM json_each(?))
+          AND is_available
+    )
+"""
+
+PATIENT_BY_PHONE_SQL = "SELECT patient_id, name, phone FROM patients WHERE phone = ?"
+
+CLAIM_SLOT_SQL = """
+    UPDATE doctor_schedules
+    SET is_available = FALSE
+    WHERE doctor_id = ?
+      AND schedule_date = ?
+      AND start_time = ?
+      AND is_available
+"""
+
+# A returning patient (same normalized phone) keeps their stored name
+INSERT_PATIENT_SQL = """
+    INSERT INTO patients (name, phone)
+    VALUES (?, ?)
+    ON CONFLICT (phone) DO NOTHING
+    RETURNING patient_id
+"""
+
+INSERT_APPOINTMENT_SQL = """
+    INSERT INTO appointments (doctor_id, patient_id, schedule_date, start_time)
+    VALUES (?, ?, ?, ?)
+"""
+
+# The IntegrityError of INSERT_APPOINTMENT_SQL when the slot already has an appointment
+APPOINTMENT_SLOT_TAKEN = (
+    "UNIQUE constraint failed: appointments.doctor_id, appointments.schedule_date, appointments.start_time"
+)
+
+INSERT_SLOT_SQL = """
+    INSERT INTO doctor_schedules (doctor_id, schedule_date, start_time, end_time)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (doctor_id, schedule_date, start_time) DO NOTHING
+"""
+
+
+def to_sqlite(sql: str) -> str:
+    """Rewrite the Postgres-only syntax used by db/schema.sql and db/seed.sql"""
+    for pattern, replacement in _POSTGRES_SYNTAX:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _iso_date(value):
+    return value.isoformat() if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value)).isoformat()
+
+
+def _iso_time(value):
+    return value.isoformat() if isinstance(value, datetime.time) else datetime.time.fromisoformat(str(value)).isoformat()
+
+
+def _slot(row):
+    schedule_date, start_time, end_time = row
+    return (
+        datetime.date.fromisoformat(schedule_date),
+        datetime.time.fromisoformat(start_time),
+        datetime.time.fromisoformat(end_time)
+    )
+
+
+def _doctor_slot(row):
+    doctor_id, *slot = row
+    if slot[0] is None:
+        return (doctor_id, None, None, None)
+    return (doctor_id, *_slot(slot))
+
+
+class SQLiteRepository(ClinicRepository):
+    """Clinic database in one SQLite file, or in process memory for ``path=":memory:"``.
+
+    An empty database gets the tables from ``schema_path`` and, with ``seed``, the
+    rows from ``seed_path``. One connection is shared by every thread and
+    serialized with a lock; calls take microseconds, so the async variants
+    run inline.
+    """
+
+    def __init__(self, path=":memory:", seed=True, schema_path=SCHEMA_PATH, seed_path=SEED_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit; book_appointment opens its own transaction
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'doctors'"
+        ).fetchone()
+        if not exists:
+            self._build(schema_path, seed_path if seed else None)
+
+    def _build(self, schema_path, seed_path):
+        with self._lock:
+            with open(schema_path, encoding="utf-8") as f:
+                self._conn.executescript(to_sqlite(f.read()))
+            if seed_path is not None:
+                with open(seed_path, encoding="utf-8") as f:
+                    self._conn.executescript(to_sqlite(f.read()))
+                # Seed times are written "10:00"; keep every stored time in the form queries bind
+                self._conn.execute("UPDATE doctor_schedules SET start_time = time(start_time), end_time = time(end_time)")
+        logger.info("Created SQLite clinic database at %s", self.path)
+
+    def _all(self, query, params=()):
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def _one(self, query, params=()):
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def add_slots(self, slots):
+        """Open schedule rows [(doctor_id, date, start_time, end_time)]; existing slots are left as they are"""
+        rows = [(doctor_id, _iso_date(d), _iso_time(s), _iso_time(e)) for doctor_id, d, s, e in slots]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(INSERT_SLOT_SQL, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def counts(self):
+        """Row count per table"""
+        return {
+            table: self._one(f"SELECT COUNT(*) FROM {table}")[0]
+            for table in ("doctors", "doctor_schedules", "patients", "appointments")
+        }
+
+    def all_doctors(self):
+        return self._all(ALL_DOCTORS_SQL)
+
+    def slot_available(self, doctor_id, date, time):
+        row = self._one(SLOT_AVAILABLE_SQL, (doctor_id, _iso_date(date), _iso_time(time)))
+        return row is not None and row[0] == 1
+
+    def available_slots(self, doctor_id):
+        return [_slot(row) for row in self._all(AVAILABLE_SLOTS_SQL, (doctor_id,))]
+
+    def slots_for_doctors(self, doctor_ids):
+        return [_doctor_slot(row) for row in self._all(SLOTS_FOR_DOCTORS_SQL, (json.dumps(list(doctor_ids)),))]
+
+    def slots_by_speciality(self, speciality):
+        return [_doctor_slot(row) for row in self._all(SLOTS_BY_SPECIALITY_SQL, (speciality,))]
+
+    def doctors_with_open_slots(self, doctor_ids):
+        return {row[0] for row in self._all(DOCTORS_WITH_OPEN_SLOTS_SQL, (json.dumps(list(doctor_ids)),))}
+
+    def has_open_slot(self, doctor_ids):
+        return self._one(HAS_OPEN_SLOT_SQL, (json.dumps(list(doctor_ids)),))[0] == 1
+
+    def next_open_slots(self, doctor_id, after, exclude, limit):
+        query = """
+            SELECT schedule_date, start_time, end_time
+            FROM doctor_schedules
+            WHERE doctor_id = ?
+              AND is_available
+        """
+        params = [doctor_id]
+        if after is not None:
+            query += " AND (schedule_date, start_time) > (?, ?)"
+            params.extend((_iso_date(after[0]), _iso_time(after[1])))
+        if exclude:
+            query += """
+              AND (schedule_date, start_time) NOT IN (
+                  SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+              )
+            """
+            params.append(json.dumps([[_iso_date(d), _iso_time(t)] for d, t in exclude]))
+        query += " ORDER BY schedule_date, start_time LIMIT ?"
+        params.append(limit)
+        return [_slot(row) for row in self._all(query, params)]
+
+    def book_appointment(self, doctor_id, patient_name, phone, date, time):
+        date, time = _iso_date(date), _iso_time(time)
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so the claim cannot race another process
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute(CLAIM_SLOT_SQL, (doctor_id, date, time)).rowcount == 0:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                row = self._conn.execute(INSERT_PATIENT_SQL, (patient_name, phone)).fetchone()
+                if row is None:
+                    row = self._conn.execute(PATIENT_BY_PHONE_SQL, (phone,)).fetchone()
+                patient_id = row[0]
+                self._conn.execute(INSERT_APPOINTMENT_SQL, (doctor_id, patient_id, date, time))
+            except sqlite3.IntegrityError as e:
+                self._conn.execute("ROLLBACK")
+                if str(e) == APPOINTMENT_SLOT_TAKEN:
+                    # An appointment already exists for a slot still flagged open
+                    return False
+                raise
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return True
+
+    def find_patient(self, phone):
+        return self._one(PATIENT_BY_PHONE_SQL, (phone,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
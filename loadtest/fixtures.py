@@ -0,0 +1,268 @@
+"""
+In-process stand-ins for the clinic database and the OpenAI API, for load tests
+"""
+import asyncio
+import datetime
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+
+from app import llm_client, orchestrator, orchestrator_async
+from app.services.speciality_classifier import classify
+from db import doctor_repo, repository, schedule_repo
+from db.booking_repo import BookingStatus
+from db.doctor_repo import normalize_doctor_name
+from db.patient_repo import normalize_phone
+from db.sqlite_repository import SQLiteRepository
+
+# Same roster as db/seed.sql
+SEED_DOCTORS = [
+    (1, "Dr X", "Orthopedics"),
+    (2, "Dr Y", "Orthopedics"),
+    (3, "Dr A", "Dermatology"),
+]
+
+
+def open_slots(count, start=None):
+    """``count`` consecutive half-hour slots, 16 a day from 09:00, starting tomorrow by default"""
+    start = start or datetime.date.today() + datetime.timedelta(days=1)
+    slots = []
+    for i in range(count):
+        day, index = divmod(i, 16)
+        begin = datetime.datetime.combine(start + datetime.timedelta(days=day), datetime.time(9)) \
+            + datetime.timedelta(minutes=30 * index)
+        slots.append((begin.date(), begin.time(), (begin + datetime.timedelta(minutes=30)).time()))
+    return slots
+
+
+class ClinicFixture:
+    """Doctors, open slots, patients and bookings held in process memory.
+
+    Implements the repository functions the orchestrators call, with the same
+    arguments and return shapes, so a conversation runs without Postgres.
+    ``latency`` is added to every call to model a database round trip.
+    """
+
+    def __init__(self, slots_per_doctor=200, doctors=SEED_DOCTORS, latency=0.0, start=None):
+        self.latency = latency
+        self.doctors = list(doctors)
+        self._lock = threading.Lock()
+        self._open = {}             # doctor_id -> sorted [(date, start, end)]
+        self._patients = {}         # normalized phone -> (patient_id, name, phone)
+        self.bookings = 0
+        self.conflicts = 0
+
+        for doctor_id, _, _ in self.doctors:
+            self._open[doctor_id] = open_slots(slots_per_doctor, start)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    async def _await(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # Lookups and writes shared by the sync and async variants
+
+    def _by_speciality(self, speciality):
+        return [row for row in self.doctors if row[2] == speciality]
+
+    def _by_name(self, name, speciality):
+        wanted = normalize_doctor_name(name)
+        for row in self._by_speciality(speciality):
+            if normalize_doctor_name(row[1]) == wanted:
+                return row
+        return None
+
+    def _open_ids(self, doctor_ids):
+        with self._lock:
+            return {doctor_id for doctor_id in doctor_ids if self._open.get(doctor_id)}
+
+    def _next_open(self, doctor_id, after, exclude, limit):
+        # Sessions carry dates and times as strings, so compare in ISO form
+        after = (str(after[0]), str(after[1])) if after else None
+        exclude = {(str(d), str(t)) for d, t in exclude}
+        found = []
+        with self._lock:
+            for slot in self._open.get(doctor_id, ()):
+                key = (slot[0].isoformat(), slot[1].isoformat())
+                if (after and key <= after) or key in exclude:
+                    continue
+                found.append(slot)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _book(self, doctor_id, patient_name, phone, date, time_):
+        key = (str(date), str(time_))
+        with self._lock:
+            slots = self._open.get(doctor_id, [])
+            for i, slot in enumerate(slots):
+                if (slot[0].isoformat(), slot[1].isoformat()) == key:
+                    del slots[i]
+                    phone = normalize_phone(phone)
+                    if phone not in self._patients:
+                        self._patients[phone] = (len(self._patients) + 1, patient_name, phone)
+                    self.bookings += 1
+                    return BookingStatus.BOOKED
+            self.conflicts += 1
+            return BookingStatus.SLOT_TAKEN
+
+    def _patient(self, phone):
+        with self._lock:
+            return self._patients.get(normalize_phone(phone))
+
+    # Sync repository functions
+
+    def get_doctors_by_speciality(self, speciality):
+        self._wait()
+        return self._by_speciality(speciality)
+
+    def find_doctor_by_name(self, name, speciality):
+        self._wait()
+        return self._by_name(name, speciality)
+
+    def get_doctors_with_open_slots(self, doctor_ids):
+        self._wait()
+        return self._open_ids(doctor_ids)
+
+    def has_open_slot(self, doctor_ids):
+        self._wait()
+        return bool(self._open_ids(doctor_ids))
+
+    def get_next_open_slots(self, doctor_id, after=None, exclude=(), limit=1):
+        self._wait()
+        return self._next_open(doctor_id, after, exclude, limit)
+
+    def book_appointment(self, doctor_id, patient_name, phone, date, time):
+        self._wait()
+        return self._book(doctor_id, patient_name, phone, date, time)
+
+    def find_patient_by_phone(self, phone):
+        self._wait()
+        return self._patient(phone)
+
+    # Async repository functions
+
+    async def aget_doctors_by_speciality(self, speciality):
+        await self._await()
+        return self._by_speciality(speciality)
+
+    async def afind_doctor_by_name(self, name, speciality):
+        await self._await()
+        return self._by_name(name, speciality)
+
+    async def aget_doctors_with_open_slots(self, doctor_ids):
+        await self._await()
+        return self._open_ids(doctor_ids)
+
+    async def ahas_open_slot(self, doctor_ids):
+        await self._await()
+        return bool(self._open_ids(doctor_ids))
+
+    async def aget_next_open_slots(self, doctor_id, after=None, exclude=(), limit=1):
+        await self._await()
+        return self._next_open(doctor_id, after, exclude, limit)
+
+    async def abook_appointment(self, doctor_id, patient_name, phone, date, time):
+        await self._await()
+        return self._book(doctor_id, patient_name, phone, date, time)
+
+    async def afind_patient_by_phone(self, phone):
+        await self._await()
+        return self._patient(phone)
+
+    def install(self, patch):
+        """Point both orchestrators at this fixture; ``patch(module, name, value)`` does the swap"""
+        for module in (orchestrator, orchestrator_async):
+            for name in dir(self):
+                if not name.startswith("_") and hasattr(module, name) and callable(getattr(self, name)):
+                    patch(module, name, getattr(self, name))
+
+
+class SQLiteClinic:
+    """The real db/ repository modules on an in-memory SQLite database.
+
+    Seeded from db/schema.sql and db/seed.sql plus ``slots_per_doctor`` open
+    slots per doctor; unlike ClinicFixture the caches, doctor directory and
+    SQL all run, with no network round trip.
+    """
+
+    def __init__(self, slots_per_doctor=200, start=None):
+        self.repository = SQLiteRepository(":memory:")
+        self.doctor_ids = [row[0] for row in self.repository.all_doctors()]
+        self.repository.add_slots(
+            (doctor_id, *slot) for doctor_id in self.doctor_ids for slot in open_slots(slots_per_doctor, start)
+        )
+
+    @property
+    def bookings(self):
+        return self.repository.counts()["appointments"]
+
+    def install(self, patch):
+        """Make this the process-wide repository, with a fresh doctor directory and no cached slots"""
+        patch(repository, "_repository", self.repository)
+        patch(doctor_repo, "_directory", doctor_repo.DoctorDirectory())
+        for doctor_id in self.doctor_ids:
+            schedule_repo.invalidate_availability(doctor_id)
+
+
+class FakeLLM:
+    """Deterministic stand-in for the OpenAI chat completions API.
+
+    Answers a specialty inference with the local classifier's best label. Each
+    reply takes ``latency`` seconds plus up to ``jitter`` seconds derived from
+    the prompt, so a given transcript always sees the same delays.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def with_options(self, **options):
+        return self
+
+    def _delay(self, prompt):
+        if not self.jitter:
+            return self.latency
+        digest = hashlib.blake2b(prompt.encode(), digest_size=2).digest()
+        return self.latency + self.jitter * int.from_bytes(digest, "big") / 0xFFFF
+
+    def _respond(self, messages):
+        self.calls += 1
+        prompt = messages[-1]["content"] if messages else ""
+        speciality, _ = classify(prompt)
+        usage = SimpleNamespace(prompt_tokens=len(str(messages)) // 4, completion_tokens=len(speciality) // 4 + 1)
+        message = SimpleNamespace(content=speciality, function_call=None)
+        return self._delay(prompt), SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _create(self, messages=(), **params):
+        delay, response = self._respond(messages)
+        time.sleep(delay)
+        return response
+
+    def install(self, patch):
+        """Serve call_llm / acall_llm from this fake, keeping their retry and concurrency handling"""
+        patch(llm_client, "_client", self)
+        async_llm = AsyncFakeLLM(self)
+        patch(llm_client, "_get_async_client", lambda: async_llm)
+
+
+class AsyncFakeLLM:
+    """Async client view of a FakeLLM (shares its counters)"""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def with_options(self, **options):
+        return self
+
+    async def _create(self, messages=(), **params):
+        delay, response = self.llm._respond(messages)
+        await asyncio.sleep(delay)
+        return response
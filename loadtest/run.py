@@ -0,0 +1,326 @@
+"""
+Load test: replay JSONL conversations concurrently and report latency per state.
+
+Runs against the sync orchestrator (threads), the async orchestrator (one event
+loop) or the HTTP API, with the in-process clinic fixture and fake LLM from
+loadtest/fixtures.py, so no Postgres or OpenAI access is needed:
+
+    python loadtest/run.py --mode async --conversations 2000 --concurrency 500 --llm-latency 0.5
+
+--db sqlite swaps the fixture for the real db/ modules on an in-memory SQLite
+database, to see what the repository layer itself costs.
+
+With --url the HTTP mode targets a running server instead (its own database
+and LLM); states are then unknown to the client and turns are reported by
+position.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import llm_client
+from app.orchestrator import ConversationOrchestrator
+from app.orchestrator_async import AsyncConversationOrchestrator
+from app.services import speciality_service
+from loadtest.fixtures import ClinicFixture, FakeLLM, SQLiteClinic
+
+DEFAULT_TRANSCRIPTS = os.path.join(os.path.dirname(__file__), "conversations.jsonl")
+PERCENTILES = (50, 95, 99)
+
+
+def load_transcripts(path):
+    """Conversations from a JSONL file: {"id": ..., "turns": [...], "expect": optional reply substring}"""
+    transcripts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                transcripts.append(json.loads(line))
+    if not transcripts:
+        raise ValueError(f"No conversations in {path}")
+    return transcripts
+
+
+def percentile(sorted_samples, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, -(-p * len(sorted_samples) // 100))
+    return sorted_samples[rank - 1]
+
+
+class Recorder:
+    """Turn latencies grouped by the state each turn started in"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.outcomes = Counter()
+
+    def turn(self, state, seconds):
+        with self._lock:
+            self.samples[state].append(seconds)
+
+    def conversation(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def report(self, elapsed):
+        states = {}
+        for state, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            states[state] = {
+                "turns": len(samples),
+                **{f"p{p}": percentile(samples, p) for p in PERCENTILES},
+                "max": samples[-1]
+            }
+        turns = sum(len(s) for s in self.samples.values())
+        conversations = sum(self.outcomes.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "conversations": conversations,
+            "turns": turns,
+            "conversations_per_second": conversations / elapsed if elapsed else None,
+            "turns_per_second": turns / elapsed if elapsed else None,
+            "outcomes": dict(self.outcomes),
+            "states": states
+        }
+
+
+class StateTracking:
+    """Mixin remembering the state each session's current turn was dispatched from"""
+
+    def __init__(self):
+        super().__init__()
+        self.turn_states = {}
+
+    def note_state(self, session_id, session):
+        self.turn_states[session_id] = session['state']
+
+    def pop_state(self, session_id, default="UNKNOWN"):
+        return self.turn_states.pop(session_id, default)
+
+
+class TrackingOrchestrator(StateTracking, ConversationOrchestrator):
+    def dispatch(self, session_id, session, user_input):
+        self.note_state(session_id, session)
+        return super().dispatch(session_id, session, user_input)
+
+
+class AsyncTrackingOrchestrator(StateTracking, AsyncConversationOrchestrator):
+    async def dispatch(self, session_id, session, user_input):
+        self.note_state(session_id, session)
+        return await super().dispatch(session_id, session, user_input)
+
+
+def _outcome(transcript, reply):
+    expect = transcript.get("expect")
+    if reply is None:
+        return "error"
+    if expect is None:
+        return "done"
+    return "expected" if expect.lower() in reply.lower() else "unexpected"
+
+
+def _schedule(transcripts, conversations):
+    return list(itertools.islice(itertools.cycle(transcripts), conversations))
+
+
+def run_sync(transcripts, conversations, concurrency, recorder):
+    bot = TrackingOrchestrator()
+
+    def converse(transcript):
+        session_id = f"lt-{uuid4().hex}"
+        reply = None
+        try:
+            for message in transcript["turns"]:
+                started = time.perf_counter()
+                reply = bot.handle(session_id, message)
+                recorder.turn(bot.pop_state(session_id), time.perf_counter() - started)
+        except Exception:
+            reply = None
+        recorder.conversation(_outcome(transcript, reply))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(converse, _schedule(transcripts, conversations)))
+
+
+async def run_async(transcripts, conversations, concurrency, recorder):
+    bot = AsyncTrackingOrchestrator()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def converse(transcript):
+        async with gate:
+            session_id = f"lt-{uuid4().hex}"
+            reply = None
+            try:
+                for message in transcript["turns"]:
+                    started = time.perf_counter()
+                    reply = await bot.handle(session_id, message)
+                    recorder.turn(bot.pop_state(session_id), time.perf_counter() - started)
+            except Exception:
+                reply = None
+            recorder.conversation(_outcome(transcript, reply))
+
+    await asyncio.gather(*(converse(t) for t in _schedule(transcripts, conversations)))
+
+
+async def run_http(transcripts, conversations, concurrency, recorder, url=None, patch=setattr):
+    import httpx
+
+    bot = None
+    if url is None:
+        from app.api import chatbot
+        from main_api import app
+
+        bot = AsyncTrackingOrchestrator()
+        patch(chatbot, "orchestrator", bot)
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+    else:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        client = httpx.AsyncClient(base_url=url, limits=limits, timeout=60)
+
+    gate = asyncio.Semaphore(concurrency)
+
+    async def converse(transcript):
+        async with gate:
+            session_id = None
+            reply = None
+            try:
+                for position, message in enumerate(transcript["turns"], 1):
+                    started = time.perf_counter()
+                    response = await client.post("/api/chat", json={"session_id": session_id, "message": message})
+                    response.raise_for_status()
+                    body = response.json()
+                    session_id, reply = body["session_id"], body["reply"]
+                    state = bot.pop_state(session_id) if bot else f"turn {position}"
+                    recorder.turn(state, time.perf_counter() - started)
+            except Exception:
+                reply = None
+            recorder.conversation(_outcome(transcript, reply))
+
+    async with client:
+        await asyncio.gather(*(converse(t) for t in _schedule(transcripts, conversations)))
+
+
+def prepare(args, patch=setattr):
+    """Install the fixture and fake LLM and apply the LLM knobs; returns (clinic, llm)"""
+    clinic = llm = None
+    if args.url is None:
+        if args.db == "sqlite":
+            clinic = SQLiteClinic(slots_per_doctor=args.slots_per_doctor)
+        else:
+            clinic = ClinicFixture(slots_per_doctor=args.slots_per_doctor, latency=args.db_latency)
+        clinic.install(patch)
+        llm = FakeLLM(latency=args.llm_latency, jitter=args.llm_jitter)
+        llm.install(patch)
+    # Fresh semaphores sized for this run (async ones are created per event loop)
+    patch(llm_client, "LLM_MAX_CONCURRENCY", args.llm_concurrency)
+    patch(llm_client, "_slots", threading.BoundedSemaphore(args.llm_concurrency))
+    patch(llm_client, "_async_slots_by_loop", weakref.WeakKeyDictionary())
+    patch(llm_client, "_breaker", llm_client.CircuitBreaker())
+    if args.force_llm:
+        # Every symptom goes to the LLM instead of the local classifier, and is not cached
+        patch(speciality_service, "SPECIALITY_CLASSIFIER_THRESHOLD", 2.0)
+        patch(speciality_service, "_cache", None)
+    return clinic, llm
+
+
+def run(args, patch=setattr):
+    """Run one load test described by ``args``; returns the report dict"""
+    transcripts = load_transcripts(args.transcripts)
+    clinic, llm = prepare(args, patch)
+    recorder = Recorder()
+
+    started = time.perf_counter()
+    if args.mode == "sync":
+        run_sync(transcripts, args.conversations, args.concurrency, recorder)
+    elif args.mode == "async":
+        asyncio.run(run_async(transcripts, args.conversations, args.concurrency, recorder))
+    else:
+        asyncio.run(run_http(transcripts, args.conversations, args.concurrency, recorder, args.url, patch))
+    report = recorder.report(time.perf_counter() - started)
+
+    report["mode"] = args.mode
+    report["concurrency"] = args.concurrency
+    if clinic is not None:
+        report["db"] = args.db
+        report["bookings"] = clinic.bookings
+        if isinstance(clinic, ClinicFixture):
+            report["booking_conflicts"] = clinic.conflicts
+    if llm is not None:
+        report["llm_calls"] = llm.calls
+    return report
+
+
+def format_report(report):
+    ms = lambda seconds: "-" if seconds is None else f"{seconds * 1000:.1f}"
+    lines = [
+        f"{report['mode']}: {report['conversations']} conversations, {report['turns']} turns "
+        f"in {report['elapsed_seconds']:.2f}s (concurrency {report['concurrency']})",
+        f"throughput: {report['conversations_per_second']:.1f} conversations/s, {report['turns_per_second']:.1f} turns/s",
+        f"outcomes: {report['outcomes']}",
+    ]
+    for key in ("db", "bookings", "booking_conflicts", "llm_calls"):
+        if key in report:
+            lines.append(f"{key}: {report[key]}")
+    lines.append("")
+    lines.append(f"{'state':<30} {'turns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for state, row in report["states"].items():
+        lines.append(
+            f"{state:<30} {row['turns']:>7} {ms(row['p50']):>9} {ms(row['p95']):>9} {ms(row['p99']):>9} {ms(row['max']):>9}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("sync", "async", "http"), default="async")
+    parser.add_argument("--transcripts", default=DEFAULT_TRANSCRIPTS, help="JSONL conversations to replay")
+    parser.add_argument("--conversations", type=int, default=1000, help="conversations to run (transcripts are cycled)")
+    parser.add_argument("--concurrency", type=int, default=200, help="conversations in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM reply time (seconds)")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="extra fake LLM time, up to this (seconds)")
+    parser.add_argument("--llm-concurrency", type=int, default=llm_client.LLM_MAX_CONCURRENCY,
+                        help="LLM calls in flight per process (LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--force-llm", action="store_true", help="skip the local classifier and the specialty cache")
+    parser.add_argument("--db", choices=("fixture", "sqlite"), default="fixture",
+                        help="in-process clinic fixture, or the db/ modules on in-memory SQLite")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="added to every fixture database call (seconds)")
+    parser.add_argument("--slots-per-doctor", type=int, default=2000)
+    parser.add_argument("--url", default=None, help="HTTP mode: base URL of a running server")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if args.url is not None and args.mode != "http":
+        parser.error("--url only applies to --mode http")
+    if args.db_latency and args.db != "fixture":
+        parser.error("--db-latency only applies to --db fixture")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Per-request client logging would dominate the output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = run(args)
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
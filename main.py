@@ -1,4 +1,9 @@
 from uuid import uuid4
+from app.logging_config import configure_logging
+
+configure_logging()
+
+from app.conversation import BookingFailed
 from app.orchestrator import ConversationOrchestrator
 
 session_id = uuid4().hex
@@ -13,5 +18,8 @@ while True:
     elif user_input.lower() in ["exit", "quit"]:
         break
     else:
-        response = bot.handle(session_id, user_input)
+        try:
+            response = bot.handle(session_id, user_input)
+        except BookingFailed as e:
+            response = e.reply
     print("Bot:", response)
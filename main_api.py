@@ -1,6 +1,39 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from app.logging_config import configure_logging
+
+# Before the app imports below, which log the session store and cache setup
+configure_logging()
+
 from app.api.chatbot import router as chatbot_router
+from app.api.admin import router as admin_router
+from app.metrics import render_metrics
+from db.doctor_repo import refresh_doctor_directory
+from db.repository import aclose_repository
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the doctor directory; on failure it is loaded on first use instead
+    try:
+        refresh_doctor_directory()
+    except Exception as e:
+        logger.warning("Doctor directory preload failed: %s", e)
+    yield
+    await aclose_repository()
+
+
+app = FastAPI(title="Doctors Assistant Chatbot API", version="1.0.0", lifespan=lifespan)
+
+app.include_router(chatbot_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
 
-app = FastAPI(title="Doctors Assistant Chatbot API", version="1.0.0")
 
-app.include_router(chatbot_router, prefix="/api")
\ No newline at end of file
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,47 @@
+"""
+Tests for the X-Admin-Token check of the /api/admin endpoints
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import admin
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_admin_endpoints_are_closed_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+    assert client.post("/api/admin/doctors/refresh").status_code == 403
+    assert client.get("/api/admin/stats", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_admin_token_must_match(client, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/admin/stats").status_code == 403
+    assert client.get("/api/admin/stats", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/admin/stats", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_session_listing_needs_admin_token(client, monkeypatch):
+    monkeypatch.setattr(admin, "list_sessions", lambda offset, limit: {"total": 0, "sessions": []})
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+    assert client.get("/api/admin/sessions").status_code == 403
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/admin/sessions").status_code == 403
+    assert client.get("/api/admin/sessions", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.get("/api/admin/sessions", params={"limit": 10}, headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.json() == {"total": 0, "sessions": [], "offset": 0, "limit": 10}
@@ -0,0 +1,47 @@
+"""
+Tests for the micro-benchmark runner
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import run as bench
+from benchmarks.cases import Case
+
+
+def test_setup_is_not_timed():
+    calls = []
+    case = Case("sleepy-setup", lambda n: calls.append(n), setup=lambda: (__import__("time").sleep(0.001) or 1,))
+    result = bench.measure(case, min_time=0.001, repeat=2)
+
+    assert result["ns_per_op"] < 1_000_000
+    assert result["iterations"] == len(calls) - 1  # plus the warm-up call
+
+
+def test_regressions_are_relative_to_the_baseline():
+    results = {"fast": {"ns_per_op": 100}, "slow": {"ns_per_op": 200}, "new": {"ns_per_op": 5}}
+    baseline = {"fast": {"ns_per_op": 110}, "slow": {"ns_per_op": 100}}
+    ratios, regressions = bench.compare(results, baseline, threshold=0.25)
+
+    assert regressions == ["slow"]
+    assert set(ratios) == {"fast", "slow"}
+
+
+def test_session_store_group_produces_results():
+    results, skipped = bench.run_cases(["session_store"], min_time=0.001, repeat=1, log=lambda line: None)
+
+    assert not skipped
+    assert "session_store.memory.load_session" in results
+    assert all(result["ns_per_op"] > 0 for result in results.values())
+
+
+def test_sqlite_group_runs_without_a_database_and_restores_the_backend():
+    from db import repository
+
+    before = repository._repository
+    results, skipped = bench.run_cases(["db_sqlite"], "is_slot_available", min_time=0.001, repeat=1, log=lambda line: None)
+
+    assert not skipped
+    assert set(results) == {"db_sqlite.schedule_repo.is_slot_available", "db_sqlite.schedule_repo.ais_slot_available"}
+    assert repository._repository is before
@@ -0,0 +1,135 @@
+"""
+Tests for two patients booking the same slot at the same time (SQLite backend, no LLM)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import datetime
+import threading
+
+import pytest
+
+from app import orchestrator, orchestrator_async, session_store
+from app.orchestrator import ConversationOrchestrator
+from app.orchestrator_async import AsyncConversationOrchestrator
+from app.session_store import load_session, save_session
+from app.session_store_memory import AsyncInMemorySessionStore, InMemorySessionStore
+from db import doctor_repo, repository, schedule_repo
+from db.sqlite_repository import SQLiteRepository
+
+DAY = datetime.date(2031, 3, 10)
+SLOT = (DAY, datetime.time(9), datetime.time(9, 30))
+NEXT_SLOT = (DAY, datetime.time(9, 30), datetime.time(10))
+PATIENTS = {"s1": "Asha 9876543210", "s2": "Ravi 9123456780"}
+
+
+@pytest.fixture
+def clinic(monkeypatch):
+    """Seeded in-memory database and session store; Dr A (3) has only the slots a test adds"""
+    db = SQLiteRepository(":memory:")
+    store = InMemorySessionStore()
+    monkeypatch.setattr(repository, "_repository", db)
+    monkeypatch.setattr(doctor_repo, "_directory", doctor_repo.DoctorDirectory())
+    monkeypatch.setattr(schedule_repo, "_availability_cache", None)
+    monkeypatch.setattr(session_store, "_store", store)
+    monkeypatch.setattr(session_store, "_async_store", AsyncInMemorySessionStore(store))
+    yield db
+    db.close()
+
+
+def offer(session_id, slot=SLOT):
+    """Both patients accepted the same offered slot and are about to give their details"""
+    session = load_session(session_id)
+    details = dict(
+        state="COLLECTING_PATIENT_DETAILS", speciality="Dermatology", doctor_id=3, doctor_name="Dr A",
+        date=str(slot[0]), time=str(slot[1])
+    )
+    for key, value in details.items():
+        session[key] = value
+    save_session(session_id, session)
+
+
+def race_sync(monkeypatch):
+    """Send both patients' details from two threads that reach the booking together"""
+    barrier = threading.Barrier(2, timeout=5)
+    book = orchestrator.book_appointment
+
+    def book_together(**kwargs):
+        barrier.wait()
+        return book(**kwargs)
+
+    monkeypatch.setattr(orchestrator, "book_appointment", book_together)
+    bot = ConversationOrchestrator()
+    replies = {}
+
+    def send(session_id):
+        replies[session_id] = bot.handle(session_id, PATIENTS[session_id])
+
+    threads = [threading.Thread(target=send, args=(session_id,)) for session_id in PATIENTS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return replies
+
+
+def race_async(monkeypatch):
+    arrived = []
+    book = orchestrator_async.abook_appointment
+
+    async def book_together(**kwargs):
+        arrived.append(1)
+        while len(arrived) < 2:
+            await asyncio.sleep(0)
+        return await book(**kwargs)
+
+    monkeypatch.setattr(orchestrator_async, "abook_appointment", book_together)
+    bot = AsyncConversationOrchestrator()
+
+    async def send_both():
+        replies = await asyncio.gather(*(bot.handle(session_id, text) for session_id, text in PATIENTS.items()))
+        return dict(zip(PATIENTS, replies))
+
+    return asyncio.run(send_both())
+
+
+def winner_and_loser(replies):
+    confirmed = [session_id for session_id, reply in replies.items() if reply.startswith("Perfect!")]
+    assert len(confirmed) == 1, replies
+    loser = next(session_id for session_id in replies if session_id != confirmed[0])
+    return confirmed[0], loser
+
+
+@pytest.mark.parametrize("race", [race_sync, race_async])
+def test_loser_is_offered_the_next_slot(clinic, monkeypatch, race):
+    clinic.add_slots([(3, *SLOT), (3, *NEXT_SLOT)])
+    for session_id in PATIENTS:
+        offer(session_id)
+
+    replies = race(monkeypatch)
+    winner, loser = winner_and_loser(replies)
+
+    assert "just booked by someone else" in replies[loser]
+    assert f"{NEXT_SLOT[0]} at {NEXT_SLOT[1]}" in replies[loser]
+    session = load_session(loser)
+    assert session['state'] == "CHECKING_AVAILABILITY"
+    assert (session['date'], session['time']) == (str(NEXT_SLOT[0]), str(NEXT_SLOT[1]))
+    assert clinic.counts()["appointments"] == 1
+    assert load_session(winner)['state'] == "INIT"
+
+
+@pytest.mark.parametrize("race", [race_sync, race_async])
+def test_loser_session_closes_when_no_slot_is_left(clinic, monkeypatch, race):
+    clinic.add_slots([(3, *SLOT)])
+    for session_id in PATIENTS:
+        offer(session_id)
+
+    replies = race(monkeypatch)
+    _, loser = winner_and_loser(replies)
+
+    assert "has no other available slots" in replies[loser]
+    assert load_session(loser)['state'] == "INIT"
+    assert clinic.counts()["appointments"] == 1
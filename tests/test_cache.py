@@ -0,0 +1,59 @@
+"""
+Tests for the in-process TTL/LRU cache
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("a", 1)
+    clock.now = 29
+    assert cache.get("a") == 1
+    clock.now = 31
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cached_empty_values_are_hits():
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set("a", [])
+    assert cache.get("a") == []
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_add_only_stores_absent_or_expired_keys():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    assert cache.add("a", 1, ttl=5)
+    assert not cache.add("a", 2)
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.add("a", 3)
+    assert cache.get("a") == 3
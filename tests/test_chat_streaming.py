@@ -0,0 +1,220 @@
+"""
+Tests for the streaming chat endpoints (orchestrator replaced by a fake)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import chatbot
+from app.cache import TTLCache
+from app.conversation import BookingFailed
+
+REPLY = "Thank you. Which doctor would you like to meet?\n(Dr X / Dr Y)"
+
+
+class FakeOrchestrator:
+    def __init__(self):
+        self.seen = []
+
+    async def handle(self, session_id, user_input):
+        self.seen.append((session_id, user_input))
+        if user_input == "boom":
+            raise RuntimeError("database down")
+        if user_input == "Ann 555-0100":
+            raise BookingFailed(RuntimeError("connection reset"))
+        return REPLY
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeOrchestrator()
+    monkeypatch.setattr(chatbot, "orchestrator", fake)
+    app = FastAPI()
+    app.include_router(chatbot.router, prefix="/api")
+    with TestClient(app) as test_client:
+        test_client.fake = fake
+        yield test_client
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_sse_streams_session_tokens_and_done(client):
+    with client.stream("POST", "/api/chat/stream", json={"message": "knee pain", "session_id": "s1"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse("".join(response.iter_text()))
+
+    assert events[0] == ("session", {"session_id": "s1"})
+    assert events[-1] == ("done", {"session_id": "s1", "reply": REPLY})
+    tokens = [data["text"] for event, data in events[1:-1]]
+    assert len(tokens) > 1
+    assert "".join(tokens) == REPLY
+
+
+def test_websocket_keeps_one_session_per_connection(client):
+    with client.websocket_connect("/api/chat/ws") as ws:
+        session_id = ws.receive_json()["session_id"]
+        for message in ["hi", "knee pain"]:
+            ws.send_text(json.dumps({"message": message}))
+            tokens = []
+            while True:
+                frame = ws.receive_json()
+                if frame["type"] == "done":
+                    break
+                tokens.append(frame["text"])
+            assert "".join(tokens) == frame["reply"] == REPLY
+
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+
+    assert client.fake.seen == [(session_id, "hi"), (session_id, "knee pain")]
+
+
+def test_errors_become_a_polite_reply(client):
+    response = client.post("/api/chat", json={"message": "boom"})
+    assert response.json()["reply"] == chatbot.ERROR_REPLY
+
+
+def test_replayed_idempotency_key_returns_the_stored_response(client, monkeypatch):
+    monkeypatch.setattr(chatbot, "_responses", TTLCache(maxsize=10, ttl=60))
+    request = {"message": "hi", "session_id": "s1", "idempotency_key": "k1"}
+    first = client.post("/api/chat", json=request).json()
+    second = client.post("/api/chat", json=request).json()
+
+    assert second == first
+    assert len(client.fake.seen) == 1
+
+    with client.stream("POST", "/api/chat/stream", json=request) as response:
+        events = parse_sse("".join(response.iter_text()))
+    assert events[-1] == ("done", first)
+    assert len(client.fake.seen) == 1
+
+    # The same key in another session is another request
+    client.post("/api/chat", json={**request, "session_id": "s2"})
+    assert len(client.fake.seen) == 2
+
+
+def test_idempotency_key_without_a_session_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(chatbot, "_responses", TTLCache(maxsize=10, ttl=60))
+    request = {"message": "hi", "idempotency_key": "k1"}
+
+    assert client.post("/api/chat", json=request).status_code == 422
+    assert client.post("/api/chat/stream", json=request).status_code == 422
+    assert client.fake.seen == []
+
+
+def test_failed_turns_are_not_stored_under_the_key(client, monkeypatch):
+    monkeypatch.setattr(chatbot, "_responses", TTLCache(maxsize=10, ttl=60))
+    request = {"message": "boom", "session_id": "s1", "idempotency_key": "k1"}
+    client.post("/api/chat", json=request)
+    client.post("/api/chat", json=request)
+
+    assert len(client.fake.seen) == 2
+
+
+def test_failed_bookings_are_not_stored_under_the_key(client, monkeypatch):
+    monkeypatch.setattr(chatbot, "_responses", TTLCache(maxsize=10, ttl=60))
+    request = {"message": "Ann 555-0100", "session_id": "s1", "idempotency_key": "k1"}
+    reply = client.post("/api/chat", json=request).json()["reply"]
+    client.post("/api/chat", json=request)
+
+    assert reply.startswith("Sorry, there was an error booking your appointment")
+    assert len(client.fake.seen) == 2
+
+
+def test_concurrent_duplicates_run_the_turn_once(monkeypatch):
+    monkeypatch.setattr(chatbot, "_responses", TTLCache(maxsize=10, ttl=60))
+
+    class SlowOrchestrator(FakeOrchestrator):
+        async def handle(self, session_id, user_input):
+            await asyncio.sleep(0.05)
+            return await super().handle(session_id, user_input)
+
+    fake = SlowOrchestrator()
+    monkeypatch.setattr(chatbot, "orchestrator", fake)
+
+    async def run():
+        turns = [chatbot._chat_turn("s1", "1", "k1") for _ in range(3)]
+        return await asyncio.gather(*turns)
+
+    responses = asyncio.run(run())
+    assert {r.reply for r in responses} == {REPLY}
+    assert fake.seen == [("s1", "1")]
+
+
+class PassThroughSingleFlight:
+    """Shares nothing, like a second worker process"""
+
+    async def do(self, key, fn, *args):
+        return await fn(*args)
+
+
+def test_workers_sharing_a_key_book_once(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.cache import RedisCache
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(chatbot, "_responses", RedisCache(
+        "chat-response",
+        client=fakeredis.FakeRedis(server=server, decode_responses=True),
+        async_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+    ))
+    monkeypatch.setattr(chatbot, "_inflight", PassThroughSingleFlight())
+    monkeypatch.setattr(chatbot, "IDEMPOTENCY_POLL_INTERVAL", 0.01)
+
+    class BookingOrchestrator(FakeOrchestrator):
+        bookings = 0
+
+        async def handle(self, session_id, user_input):
+            await asyncio.sleep(0.05)
+            self.bookings += 1
+            return "Your appointment is booked"
+
+    fake = BookingOrchestrator()
+    monkeypatch.setattr(chatbot, "orchestrator", fake)
+
+    async def run():
+        turns = [chatbot._chat_turn("s1", "Ann 555-0100", "k1") for _ in range(2)]
+        return await asyncio.gather(*turns)
+
+    responses = asyncio.run(run())
+    assert [r.reply for r in responses] == ["Your appointment is booked"] * 2
+    assert fake.bookings == 1
+
+
+def test_a_failed_claimant_lets_the_waiting_duplicate_run(monkeypatch):
+    monkeypatch.setattr(chatbot, "_responses", TTLCache(maxsize=10, ttl=60))
+    monkeypatch.setattr(chatbot, "_inflight", PassThroughSingleFlight())
+    monkeypatch.setattr(chatbot, "IDEMPOTENCY_POLL_INTERVAL", 0.01)
+
+    class FlakyOrchestrator(FakeOrchestrator):
+        async def handle(self, session_id, user_input):
+            self.seen.append((session_id, user_input))
+            await asyncio.sleep(0.05)
+            if len(self.seen) == 1:
+                raise RuntimeError("database down")
+            return REPLY
+
+    fake = FlakyOrchestrator()
+    monkeypatch.setattr(chatbot, "orchestrator", fake)
+
+    async def run():
+        turns = [chatbot._chat_turn("s1", "1", "k1") for _ in range(2)]
+        return await asyncio.gather(*turns)
+
+    replies = sorted(r.reply for r in asyncio.run(run()))
+    assert replies == sorted([chatbot.ERROR_REPLY, REPLY])
+    assert len(fake.seen) == 2
@@ -0,0 +1,120 @@
+"""
+Tests for the PostgreSQL connection pool (no database required)
+"""
+import sys
+import os
+import threading
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from psycopg2 import extensions
+
+from db.connection import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.info = FakeInfo()
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    return ConnectionPool(connect=connect, **kwargs), opened
+
+
+def test_connections_are_reused():
+    pool, opened = make_pool(minconn=0, maxconn=2)
+    for _ in range(5):
+        with pool.connection():
+            pass
+    assert len(opened) == 1
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(minconn=0, maxconn=1, timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_closed_connection_is_replaced_on_checkout():
+    pool, opened = make_pool(minconn=1, maxconn=1)
+    opened[0].close()
+    conn = pool.getconn()
+    assert conn is opened[1]
+    assert not conn.closed
+
+
+def test_error_rolls_back_and_returns_connection():
+    pool, opened = make_pool(minconn=0, maxconn=1)
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("boom")
+    assert opened[0].rollbacks == 1
+    assert opened[0].commits == 0
+    with pool.connection() as conn:
+        assert conn is opened[0]
+
+
+def test_concurrent_checkouts_never_exceed_max():
+    pool, opened = make_pool(minconn=0, maxconn=3, timeout=5)
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            with pool.connection():
+                with lock:
+                    in_use.append(1)
+                    peak.append(len(in_use))
+                with lock:
+                    in_use.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert max(peak) <= 3
+    assert len(opened) <= 3
@@ -0,0 +1,62 @@
+"""
+Tests for the state decisions and replies shared by both orchestrators (no I/O)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import datetime
+
+from app import conversation
+from app.conversation import CLOSE, KEEP, SAVE
+from app.session_model import SessionData
+
+SLOT = (datetime.date(2031, 3, 10), datetime.time(9), datetime.time(9, 30))
+DOCTORS = [(1, 'Dr X', 'Orthopedics'), (2, 'Dr Y', 'Orthopedics')]
+
+
+def session_with(**fields):
+    session = SessionData()
+    for key, value in fields.items():
+        session[key] = value
+    return session
+
+
+def test_offer_doctors_closes_when_nobody_can_be_booked():
+    session = session_with(speciality='Orthopedics')
+    assert conversation.offer_doctors(session, [], False).session == CLOSE
+    assert conversation.offer_doctors(session, DOCTORS, False).session == CLOSE
+
+    reply = conversation.offer_doctors(session, DOCTORS, True)
+    assert reply == ("Thank you. Which doctor would you like to meet? (Dr X / Dr Y)", SAVE)
+    assert session['state'] == "SELECTING_DOCTOR"
+
+
+def test_declined_slots_are_remembered_for_the_next_offer():
+    session = session_with(doctor_id=1, doctor_name='Dr X', date='2031-03-10', time='09:00:00')
+    after, exclude = conversation.decline_slot(session)
+    assert after == ('2031-03-10', '09:00:00')
+    assert exclude == [('2031-03-10', '09:00:00')]
+
+    reply = conversation.offer_next_slot(session, [SLOT])
+    assert reply.text == "How about 2031-03-10 at 09:00:00? Is that fine?"
+    assert conversation.decline_slot(session)[1] == [('2031-03-10', '09:00:00')]
+    assert conversation.offer_next_slot(session, []).session == CLOSE
+
+
+def test_patient_details_need_a_name():
+    session = session_with()
+    name, phone = conversation.parse_patient_details("+1 (555) 0100")
+    assert (name, phone) == ("", "+1 (555) 0100")
+    assert conversation.needs_patient_lookup(name, phone)
+    assert conversation.record_patient_details(session, "+1 (555) 0100", name, phone) == \
+        (conversation.ASK_PATIENT_NAME_REPLY, SAVE)
+
+    assert conversation.record_patient_details(session, "Ann", *conversation.parse_patient_details("Ann")) is None
+    assert conversation.booking_request(session)['patient_name'] == "Ann"
+    assert conversation.booking_request(session)['phone'] == "+1 (555) 0100"
+
+
+def test_unknown_doctor_leaves_the_session_alone():
+    assert conversation.unknown_doctor("Dr Q").session == KEEP
@@ -0,0 +1,91 @@
+"""
+Tests for the in-memory doctor directory (no database required)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.doctor_repo import DoctorDirectory
+
+ROWS = [
+    (1, 'Dr X', 'Orthopedics'),
+    (2, 'Dr Y', 'Orthopedics'),
+    (3, 'Dr A', 'Dermatology'),
+]
+
+
+def test_lookup_by_speciality_and_normalized_name():
+    directory = DoctorDirectory(loader=lambda: ROWS)
+    assert directory.by_speciality('Orthopedics') == ROWS[:2]
+    assert directory.by_speciality('Cardiology') == []
+    assert directory.find_by_name('dr.  x', 'Orthopedics') == ROWS[0]
+    assert directory.find_by_name('Dr A', 'Orthopedics') is None
+
+
+def test_roster_is_reloaded_after_ttl_only():
+    calls = []
+    now = [0.0]
+
+    def loader():
+        calls.append(1)
+        return ROWS
+
+    directory = DoctorDirectory(ttl=60, loader=loader, clock=lambda: now[0])
+    directory.by_speciality('Orthopedics')
+    directory.by_speciality('Dermatology')
+    assert len(calls) == 1
+    now[0] = 61
+    directory.by_speciality('Orthopedics')
+    assert len(calls) == 2
+
+
+def test_failed_reload_keeps_previous_roster():
+    now = [0.0]
+    rows = [ROWS]
+
+    def loader():
+        if rows[0] is None:
+            raise RuntimeError("database down")
+        return rows[0]
+
+    directory = DoctorDirectory(ttl=60, loader=loader, clock=lambda: now[0])
+    directory.refresh()
+    rows[0] = None
+    now[0] = 61
+    assert directory.find_by_name('Dr Y', 'Orthopedics') == ROWS[1]
+
+
+def test_failed_reload_is_retried_with_backoff():
+    now = [0.0]
+    calls = []
+    rows = [ROWS]
+
+    def loader():
+        calls.append(now[0])
+        if rows[0] is None:
+            raise RuntimeError("database down")
+        return rows[0]
+
+    directory = DoctorDirectory(ttl=60, retry=5, loader=loader, clock=lambda: now[0])
+    directory.refresh()
+    rows[0] = None
+    now[0] = 61
+    directory.by_speciality('Orthopedics')
+    directory.by_speciality('Orthopedics')
+    assert calls == [0.0, 61]
+    now[0] = 65
+    directory.by_speciality('Orthopedics')
+    assert len(calls) == 2
+    now[0] = 66
+    directory.by_speciality('Orthopedics')
+    # Second failure: the next attempt waits twice as long
+    now[0] = 75
+    directory.by_speciality('Orthopedics')
+    assert calls == [0.0, 61, 66]
+    assert directory.stats()["failed_reloads"] == 2
+
+    rows[0] = ROWS[:1]
+    now[0] = 76
+    assert directory.by_speciality('Orthopedics') == ROWS[:1]
+    assert directory.stats()["failed_reloads"] == 0
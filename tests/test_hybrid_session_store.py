@@ -0,0 +1,172 @@
+"""
+Tests for the Redis session store with a local L1 cache (fakeredis)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app.session_store_hybrid import AsyncHybridSessionStore, HybridSessionStore, SessionL1, LOAD_SCRIPT
+from app.session_model import SessionConflict, SessionData
+from app.session_store_redis import SAVE_SCRIPT, SESSION_INDEX_KEY, _session_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """Counts commands and script calls sent to Redis"""
+
+    calls = 0
+
+    def execute_command(self, *args, **kwargs):
+        type(self).calls += 1
+        return super().execute_command(*args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted(*args, **kwargs):
+            type(self).calls += 1
+            return execute(*args, **kwargs)
+
+        pipe.execute = counted
+        return pipe
+
+
+@pytest.fixture
+def server():
+    CountingRedis.calls = 0
+    return fakeredis.FakeServer()
+
+
+def make_store(server, trust_ttl=0, clock=None):
+    client = CountingRedis(server=server, decode_responses=False)
+    store = HybridSessionStore(client=client, l1=SessionL1(trust_ttl=trust_ttl, clock=clock or FakeClock()))
+    # The first call of each script also loads it into Redis
+    client.script_load(LOAD_SCRIPT)
+    client.script_load(SAVE_SCRIPT)
+    return store
+
+
+def test_each_load_and_save_is_one_round_trip(server):
+    store = make_store(server)
+    session = store.load_session("s1")
+    session["state"] = "COLLECTING_SYMPTOMS"
+
+    CountingRedis.calls = 0
+    store.save_session("s1", session)
+    assert CountingRedis.calls == 1
+
+    CountingRedis.calls = 0
+    assert store.load_session("s1")["state"] == "COLLECTING_SYMPTOMS"
+    assert CountingRedis.calls == 1
+    assert store.l1.counts["validated"] == 1
+    assert store.client.zscore(SESSION_INDEX_KEY, "s1") is not None
+
+
+def test_trusted_l1_copies_skip_redis(server):
+    clock = FakeClock()
+    store = make_store(server, trust_ttl=60, clock=clock)
+    store.save_session("s1", {"state": "SELECTING_DOCTOR"})
+
+    CountingRedis.calls = 0
+    assert store.load_session("s1")["state"] == "SELECTING_DOCTOR"
+    assert CountingRedis.calls == 0
+
+    clock.now += 61
+    store.load_session("s1")
+    assert CountingRedis.calls == 1
+
+
+def test_stale_l1_copy_is_detected_on_load(server):
+    worker_a = make_store(server)
+    worker_b = make_store(server)
+    worker_a.save_session("s1", {"state": "COLLECTING_SYMPTOMS"})
+
+    session = worker_b.load_session("s1")
+    session["state"] = "SELECTING_DOCTOR"
+    worker_b.save_session("s1", session)
+
+    assert worker_a.load_session("s1")["state"] == "SELECTING_DOCTOR"
+    assert worker_a.l1.counts["fetched"] == 1
+
+
+def test_saving_a_stale_copy_is_a_conflict(server):
+    worker_a = make_store(server)
+    worker_b = make_store(server)
+    first = worker_a.load_session("s1")
+    worker_a.save_session("s1", first)
+    assert first.revision == 1
+
+    worker_b.save_session("s1", worker_b.load_session("s1"))
+    with pytest.raises(SessionConflict) as conflict:
+        worker_a.save_session("s1", first)
+
+    assert (conflict.value.expected, conflict.value.current) == (1, 2)
+    assert worker_a.l1.counts["conflicts"] == 1
+    assert worker_a.load_session("s1").revision == 2
+
+
+def test_legacy_json_sessions_are_read_and_upgraded(server):
+    store = make_store(server)
+    store.client.set(_session_key("s1"), '{"_version": 4, "state": "SELECTING_DOCTOR", "doctor": "Dr X"}')
+
+    session = store.load_session("s1")
+    assert (session.state, session.revision) == ("SELECTING_DOCTOR", 4)
+
+    store.save_session("s1", session)
+    assert session.revision == 5
+    assert store.client.get(_session_key("s1"))[:1] != b"{"
+    assert make_store(server).load_session("s1") == session
+
+
+def test_sessions_under_the_legacy_key_are_moved_on_load(server):
+    store = make_store(server)
+    store.client.set("session:s1", '{"_version": 4, "state": "SELECTING_DOCTOR"}')
+
+    session = store.load_session("s1")
+    assert (session.state, session.revision) == ("SELECTING_DOCTOR", 4)
+    assert store.client.exists("session:s1") == 0
+    assert make_store(server).load_session("s1") == session
+
+    store.save_session("s1", session)
+    assert session.revision == 5
+
+
+def test_clear_removes_redis_and_l1_copies(server):
+    store = make_store(server, trust_ttl=60)
+    store.save_session("s1", SessionData(state="SELECTING_DOCTOR"))
+    store.clear_session("s1")
+
+    assert store.load_session("s1")["state"] == "INIT"
+    assert store.client.zcard(SESSION_INDEX_KEY) == 0
+
+
+def test_async_store_shares_versions_with_sync_store(server):
+    l1 = SessionL1(trust_ttl=0)
+    sync_store = HybridSessionStore(client=fakeredis.FakeRedis(server=server, decode_responses=False), l1=l1)
+    async_store = AsyncHybridSessionStore(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=False), l1=l1)
+    sync_store.save_session("s1", {"state": "INIT"})
+
+    async def turn():
+        session = await async_store.load_session("s1")
+        session["state"] = "COLLECTING_SYMPTOMS"
+        await async_store.save_session("s1", session)
+
+    asyncio.run(turn())
+    assert sync_store.load_session("s1") == SessionData(state="COLLECTING_SYMPTOMS", revision=2)
+    assert l1.counts["conflicts"] == 0
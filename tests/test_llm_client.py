@@ -0,0 +1,133 @@
+"""
+Tests for the resilient LLM client (OpenAI is replaced by a fake client)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import httpx
+import openai
+import pytest
+
+from app import llm_client
+from app.llm_client import CircuitBreaker, LLMUnavailableError, acall_llm, call_llm
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class FakeClient:
+    """Raises the queued errors in order, then answers"""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create(self, **params):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(errors=(), breaker=None):
+        client = FakeClient(errors)
+        monkeypatch.setattr(llm_client, "_client", client)
+        monkeypatch.setattr(llm_client, "_breaker", breaker or CircuitBreaker(threshold=2, reset_timeout=60))
+        monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE", 0.001)
+        return client
+    return install
+
+
+def test_retryable_errors_are_retried(fake_llm):
+    client = fake_llm([openai.APIConnectionError(request=REQUEST)])
+    assert call_llm([]) == "response"
+    assert client.calls == 2
+
+
+def test_non_retryable_errors_are_raised_immediately(fake_llm):
+    response = httpx.Response(400, request=REQUEST)
+    client = fake_llm([openai.BadRequestError("bad", response=response, body=None)])
+    with pytest.raises(openai.BadRequestError):
+        call_llm([])
+    assert client.calls == 1
+
+
+def test_breaker_opens_and_fails_fast(fake_llm):
+    errors = [openai.APIConnectionError(request=REQUEST) for _ in range(6)]
+    client = fake_llm(errors)
+    for _ in range(2):
+        with pytest.raises(openai.APIConnectionError):
+            call_llm([])
+    calls = client.calls
+    with pytest.raises(LLMUnavailableError):
+        call_llm([])
+    assert client.calls == calls
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+class AsyncFakeClient(FakeClient):
+    async def create(self, **params):
+        return FakeClient.create(self, **params)
+
+
+def test_async_call_retries_like_the_sync_one(monkeypatch, fake_llm):
+    fake_llm()
+    client = AsyncFakeClient([openai.APIConnectionError(request=REQUEST)])
+    monkeypatch.setattr(llm_client, "_get_async_client", lambda: client)
+    assert asyncio.run(acall_llm([])) == "response"
+    assert client.calls == 2
+
+
+def test_async_concurrency_limit_works_on_every_event_loop(monkeypatch, fake_llm):
+    fake_llm()
+
+    class SlowClient(AsyncFakeClient):
+        async def create(self, **params):
+            await asyncio.sleep(0.01)
+            return await super().create(**params)
+
+    client = SlowClient()
+    monkeypatch.setattr(llm_client, "_get_async_client", lambda: client)
+    monkeypatch.setattr(llm_client, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(llm_client, "_async_slots_by_loop", llm_client.weakref.WeakKeyDictionary())
+
+    async def contended():
+        return await asyncio.gather(acall_llm([]), acall_llm([]))
+
+    # Waiting on a semaphore bound to the first loop would fail on the second one
+    assert asyncio.run(contended()) == ["response", "response"]
+    assert asyncio.run(contended()) == ["response", "response"]
+
+
+def test_each_event_loop_gets_its_own_async_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client, "_async_clients_by_loop", llm_client.weakref.WeakKeyDictionary())
+
+    async def clients():
+        return llm_client._get_async_client(), llm_client._get_async_client()
+
+    first, again = asyncio.run(clients())
+    other, _ = asyncio.run(clients())
+    assert first is again
+    assert other is not first
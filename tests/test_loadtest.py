@@ -0,0 +1,73 @@
+"""
+Tests for the load-test harness (fake LLM and in-process clinic fixture)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app import session_store
+from app.session_store_memory import AsyncInMemorySessionStore, InMemorySessionStore
+from loadtest import run as loadtest
+from loadtest.fixtures import ClinicFixture, FakeLLM
+from db.booking_repo import BookingStatus
+
+
+@pytest.fixture(autouse=True)
+def memory_store(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(session_store, "_store", store)
+    monkeypatch.setattr(session_store, "_async_store", AsyncInMemorySessionStore(store))
+
+
+@pytest.mark.parametrize("mode", ["sync", "async", "http"])
+def test_every_transcript_completes(mode, monkeypatch):
+    args = loadtest.parse_args([
+        "--mode", mode, "--conversations", "20", "--concurrency", "5",
+        "--llm-latency", "0", "--force-llm"
+    ])
+    report = loadtest.run(args, patch=monkeypatch.setattr)
+
+    assert report["outcomes"] == {"expected": 20}
+    assert report["bookings"] == 20
+    assert report["llm_calls"] >= 1
+    assert report["states"]["INIT"]["turns"] == 20
+    assert report["states"]["COLLECTING_SYMPTOMS"]["p99"] is not None
+
+
+def test_percentiles_use_nearest_rank():
+    samples = list(range(1, 101))
+    assert [loadtest.percentile(samples, p) for p in (50, 95, 99)] == [50, 95, 99]
+    assert loadtest.percentile([7], 99) == 7
+
+
+def test_fixture_refuses_a_slot_booked_twice():
+    clinic = ClinicFixture(slots_per_doctor=2)
+    slot = clinic.get_next_open_slots(1)[0]
+    date, time = str(slot[0]), str(slot[1])
+
+    assert clinic.book_appointment(1, "A", "9876543210", date, time) is BookingStatus.BOOKED
+    assert clinic.book_appointment(1, "B", "9123456780", date, time) is BookingStatus.SLOT_TAKEN
+    assert clinic.get_next_open_slots(1, exclude=[(date, time)]) != [slot]
+    assert clinic.find_patient_by_phone("98765 43210")[1] == "A"
+
+
+def test_fake_llm_delay_is_deterministic_per_prompt():
+    llm = FakeLLM(latency=0.1, jitter=0.2)
+    assert llm._delay("knee pain") == llm._delay("knee pain")
+    assert 0.1 <= llm._delay("rash") <= 0.3
+
+
+def test_sqlite_backend_runs_the_real_repositories(monkeypatch):
+    # One conversation at a time: concurrent ones may be offered the same slot
+    args = loadtest.parse_args([
+        "--mode", "async", "--db", "sqlite", "--conversations", "10", "--concurrency", "1",
+        "--llm-latency", "0", "--slots-per-doctor", "20"
+    ])
+    report = loadtest.run(args, patch=monkeypatch.setattr)
+
+    assert report["outcomes"] == {"expected": 10}
+    assert report["db"] == "sqlite"
+    assert report["bookings"] == 10
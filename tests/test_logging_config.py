@@ -0,0 +1,114 @@
+"""
+Tests for the queue-backed logging setup
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import logging
+import queue
+
+from app import orchestrator
+from app.logging_config import (
+    CorrelationFilter, DebugSampler, DroppingQueueHandler, JsonFormatter, get_correlation_id, parse_levels,
+    set_correlation_id, use_correlation_id
+)
+
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",)):
+    return logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+
+
+def test_per_module_levels_are_parsed():
+    assert parse_levels("app.orchestrator=debug, db=WARNING,,bad") == {"app.orchestrator": "DEBUG", "db": "WARNING"}
+
+
+def test_debug_records_are_sampled_other_levels_kept():
+    values = iter([0.05, 0.5, 0.05])
+    sampler = DebugSampler(0.1, rand=lambda: next(values))
+
+    kept = [sampler.filter(make_record(logging.DEBUG)) for _ in range(3)]
+    assert kept == [True, False, True]
+    assert sampler.filter(make_record(logging.WARNING))
+
+
+def test_correlation_id_is_per_task():
+    correlation = CorrelationFilter()
+
+    async def turn(session_id):
+        set_correlation_id(session_id)
+        await asyncio.sleep(0)
+        record = make_record()
+        correlation.filter(record)
+        return record.correlation_id
+
+    async def run():
+        return await asyncio.gather(turn("s1"), turn("s2"))
+
+    assert asyncio.run(run()) == ["s1", "s2"]
+    assert get_correlation_id() == "-"
+
+
+def test_correlation_id_is_restored_after_the_block():
+    with use_correlation_id("s1"):
+        with use_correlation_id("s2"):
+            assert get_correlation_id() == "s2"
+        assert get_correlation_id() == "s1"
+    assert get_correlation_id() == "-"
+
+
+def test_orchestrator_turns_leave_no_correlation_id_behind(monkeypatch):
+    seen = []
+    monkeypatch.setattr(orchestrator.ConversationOrchestrator, "dispatch", lambda self, *args: seen.append(get_correlation_id()))
+    orchestrator.ConversationOrchestrator().handle("s1", "hi")
+
+    assert seen == ["s1"]
+    assert get_correlation_id() == "-"
+
+
+def test_queued_records_are_not_formatted_on_the_calling_thread():
+    log_queue = queue.Queue()
+    handler = DroppingQueueHandler(log_queue)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("app.test", logging.ERROR, __file__, 1, "failed for %s after %d tries", ("s1", 3), sys.exc_info())
+    handler.handle(record)
+
+    queued = log_queue.get_nowait()
+    assert (queued.msg, queued.args) == ("failed for %s after %d tries", ("s1", 3))
+    queued.correlation_id = "s1"
+    entry = json.loads(JsonFormatter().format(queued))
+    assert entry["message"] == "failed for s1 after 3 tries"
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_queued_records_resolve_arguments_that_are_not_plain_values():
+    log_queue = queue.Queue()
+    rejected = ["10:00"]
+    DroppingQueueHandler(log_queue).handle(make_record(msg="rejected %s", args=(rejected,)))
+    rejected.append("10:30")
+
+    queued = log_queue.get_nowait()
+    assert (queued.msg, queued.args) == ("rejected ['10:00']", None)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.dropped == 1
+
+
+def test_json_lines_carry_the_correlation_id():
+    record = make_record()
+    record.correlation_id = "s1"
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["correlation_id"] == "s1"
+    assert entry["level"] == "INFO"
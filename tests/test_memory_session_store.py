@@ -0,0 +1,114 @@
+"""
+Tests for the bounded in-memory session store
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+
+import pytest
+
+from app.session_model import SessionConflict
+from app.session_store_memory import InMemorySessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_abandoned_sessions_expire_without_being_loaded():
+    clock = FakeClock()
+    store = InMemorySessionStore(ttl=60, clock=clock)
+    store.save_session("abandoned", {"state": "COLLECTING_SYMPTOMS"})
+    clock.now += 61
+    store.save_session("active", {"state": "INIT"})
+
+    assert store.get_all_sessions() == ["active"]
+    assert store.stats()["expired"] == 1
+
+
+def test_least_recently_saved_session_is_evicted_at_capacity():
+    store = InMemorySessionStore(max_entries=2)
+    store.save_session("a", {"state": "INIT"})
+    store.save_session("b", {"state": "INIT"})
+    session = store.load_session("a")
+    session["state"] = "SELECTING_DOCTOR"
+    store.save_session("a", session)
+    store.save_session("c", {"state": "INIT"})
+
+    assert store.get_all_sessions() == ["a", "c"]
+    assert store.load_session("a")["state"] == "SELECTING_DOCTOR"
+    assert store.stats()["evicted"] == 1
+
+
+def test_byte_budget_is_enforced():
+    store = InMemorySessionStore(max_bytes=200)
+    for i in range(10):
+        store.save_session(f"s{i}", {"state": "INIT", "symptoms": "x" * 50})
+
+    stats = store.stats()
+    assert stats["bytes"] <= 200
+    assert stats["sessions"] == len(store.get_all_sessions()) < 10
+
+
+def test_loaded_sessions_are_copies():
+    store = InMemorySessionStore()
+    store.save_session("s", {"state": "INIT"})
+    store.load_session("s")["state"] = "CHANGED"
+
+    assert store.load_session("s")["state"] == "INIT"
+
+
+def test_concurrent_saves_keep_the_bounds():
+    store = InMemorySessionStore(max_entries=50)
+
+    def worker(n):
+        for i in range(200):
+            store.save_session(f"{n}-{i}", {"state": "INIT"})
+            store.load_session(f"{n}-{i // 2}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = store.stats()
+    assert stats["sessions"] == 50
+    assert stats["evicted"] == 8 * 200 - 50
+
+
+def test_saving_a_stale_copy_raises_a_conflict():
+    store = InMemorySessionStore()
+    store.save_session("s", {"state": "INIT"})
+    first = store.load_session("s")
+    second = store.load_session("s")
+
+    first["state"] = "COLLECTING_SYMPTOMS"
+    store.save_session("s", first)
+    second["state"] = "SELECTING_DOCTOR"
+    with pytest.raises(SessionConflict):
+        store.save_session("s", second)
+
+    assert store.load_session("s").state == "COLLECTING_SYMPTOMS"
+    assert first.revision == 2
+
+
+def test_clearing_a_stale_copy_raises_a_conflict():
+    store = InMemorySessionStore()
+    store.save_session("s", {"state": "INIT"})
+    stale = store.load_session("s")
+    store.save_session("s", store.load_session("s"))
+
+    with pytest.raises(SessionConflict):
+        store.clear_session("s", stale.revision)
+    assert store.load_session("s").revision == 2
+
+    store.clear_session("s", 2)
+    assert store.load_session("s").revision == 0
@@ -0,0 +1,82 @@
+"""
+Tests for the Prometheus instrumentation helpers and the /metrics endpoint
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app import llm_client
+from app.metrics import DB_CALL_SECONDS, register_cache_stats, timed
+from db.booking_repo import BookingStatus, _booking_status
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_timed_observes_sync_and_async_calls_and_counts_errors():
+    @timed(DB_CALL_SECONDS, "db")
+    def lookup_for_test(fail=False):
+        if fail:
+            raise RuntimeError("down")
+        return 1
+
+    @timed(DB_CALL_SECONDS, "db", expected=(KeyError,))
+    async def alookup_for_test():
+        raise KeyError("not an error")
+
+    errors = sample("chatbot_errors_total", component="db")
+    assert lookup_for_test() == 1
+    with pytest.raises(RuntimeError):
+        lookup_for_test(fail=True)
+    with pytest.raises(KeyError):
+        asyncio.run(alookup_for_test())
+
+    assert sample("chatbot_db_call_seconds_count", function="lookup_for_test") == 2
+    assert sample("chatbot_db_call_seconds_count", function="alookup_for_test") == 1
+    assert sample("chatbot_errors_total", component="db") == errors + 1
+
+
+def test_llm_calls_record_latency_and_tokens(monkeypatch):
+    usage = SimpleNamespace(prompt_tokens=120, completion_tokens=4)
+    monkeypatch.setattr(llm_client, "_call_llm", lambda *args: SimpleNamespace(usage=usage))
+    calls = sample("chatbot_llm_call_seconds_count", outcome="ok")
+    prompt_tokens = sample("chatbot_llm_tokens_sum", kind="prompt")
+
+    llm_client.call_llm([])
+
+    assert sample("chatbot_llm_call_seconds_count", outcome="ok") == calls + 1
+    assert sample("chatbot_llm_tokens_sum", kind="prompt") == prompt_tokens + 120
+
+
+def test_slot_taken_counts_a_booking_conflict():
+    conflicts = sample("chatbot_booking_conflicts_total")
+    assert _booking_status(None) is BookingStatus.SLOT_TAKEN
+    assert _booking_status((1,)) is BookingStatus.BOOKED
+    assert sample("chatbot_booking_conflicts_total") == conflicts + 1
+
+
+def test_cache_counters_are_read_at_scrape_time():
+    counts = {"hits": 1, "misses": 0, "size": 10}
+    register_cache_stats("test_cache", lambda: counts)
+    counts["hits"] = 5
+
+    assert sample("chatbot_cache_requests_total", cache="test_cache", result="hits") == 5
+    assert REGISTRY.get_sample_value("chatbot_cache_requests_total", {"cache": "test_cache", "result": "size"}) is None
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    from main_api import app
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "chatbot_state_turn_seconds" in response.text
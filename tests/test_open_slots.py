@@ -0,0 +1,140 @@
+"""
+Tests for the open-slot queries of db/schedule_repo on the embedded SQLite backend
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import datetime
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.cache import TTLCache
+from db import doctor_repo, repository, schedule_repo
+from db.availability_cache import AvailabilityCache
+from db.booking_repo import book_appointment
+from db.sqlite_repository import SQLiteRepository
+
+DAY = datetime.date(2031, 3, 10)
+NEXT_DAY = DAY + datetime.timedelta(days=1)
+# Dr A (3) has no seeded slots; these are all of its slots
+DR_A_SLOTS = [
+    (DAY, datetime.time(9), datetime.time(9, 30)),
+    (DAY, datetime.time(9, 30), datetime.time(10)),
+    (DAY, datetime.time(14), datetime.time(14, 30)),
+    (NEXT_DAY, datetime.time(9), datetime.time(9, 30)),
+]
+
+
+@pytest.fixture(params=["uncached", "cached"])
+def clinic(request, monkeypatch):
+    """Seeded in-memory database, with and without the availability cache"""
+    db = SQLiteRepository(":memory:")
+    db.add_slots((3, *slot) for slot in DR_A_SLOTS)
+    monkeypatch.setattr(repository, "_repository", db)
+    monkeypatch.setattr(doctor_repo, "_directory", doctor_repo.DoctorDirectory())
+    monkeypatch.setattr(schedule_repo, "_availability_cache", AvailabilityCache(TTLCache()) if request.param == "cached" else None)
+    yield db
+    db.close()
+
+
+def book_all(doctor_id):
+    for date, time, _ in schedule_repo.get_available_slots(doctor_id):
+        book_appointment(doctor_id, "Asha", "9876543210", date, time)
+
+
+def test_doctors_with_open_slots(clinic):
+    assert schedule_repo.get_doctors_with_open_slots([1, 2, 3]) == {1, 2, 3}
+    assert schedule_repo.get_doctors_with_open_slots([]) == set()
+    assert schedule_repo.get_doctors_with_open_slots([99]) == set()
+
+    book_all(3)
+    assert schedule_repo.get_doctors_with_open_slots([1, 3]) == {1}
+
+
+def test_has_open_slot(clinic):
+    assert schedule_repo.has_open_slot([3]) is True
+    assert schedule_repo.has_open_slot([]) is False
+    assert schedule_repo.has_open_slot([99]) is False
+
+    book_all(3)
+    assert schedule_repo.has_open_slot([3]) is False
+    assert schedule_repo.has_open_slot([3, 2]) is True
+
+
+def test_async_existence_checks_match(clinic):
+    book_all(2)
+    assert asyncio.run(schedule_repo.aget_doctors_with_open_slots([1, 2, 3])) == {1, 3}
+    assert asyncio.run(schedule_repo.ahas_open_slot([2])) is False
+
+
+def test_batched_slots_include_doctors_without_slots(clinic):
+    book_all(2)
+    slots = schedule_repo.get_available_slots_for_doctors([2, 3])
+
+    assert slots == {2: [], 3: DR_A_SLOTS}
+
+
+def test_next_slot_on_the_same_date_is_later_in_the_day(clinic):
+    after = (str(DAY), "09:00:00")
+    assert schedule_repo.get_next_open_slots(3, after=after) == [DR_A_SLOTS[1]]
+    # Cursor between two slots, and strings as stored in the session
+    assert schedule_repo.get_next_open_slots(3, after=(str(DAY), "10:00"), limit=5) == DR_A_SLOTS[2:]
+
+
+def test_cursor_carries_over_to_the_next_day(clinic):
+    assert schedule_repo.get_next_open_slots(3, after=(DAY, datetime.time(14))) == [DR_A_SLOTS[3]]
+
+
+def test_excluded_slots_are_skipped(clinic):
+    exclude = [(str(DAY), "09:00:00"), (str(DAY), "14:00:00")]
+    assert schedule_repo.get_next_open_slots(3, exclude=exclude, limit=5) == [DR_A_SLOTS[1], DR_A_SLOTS[3]]
+    assert schedule_repo.get_next_open_slots(3, after=(str(DAY), "09:00:00"), exclude=exclude) == [DR_A_SLOTS[1]]
+
+
+def test_no_remaining_slots(clinic):
+    assert schedule_repo.get_next_open_slots(3, after=(NEXT_DAY, datetime.time(9))) == []
+    assert schedule_repo.get_next_open_slots(3, exclude=[(d, t) for d, t, _ in DR_A_SLOTS]) == []
+
+    book_all(3)
+    assert schedule_repo.get_next_open_slots(3) == []
+    assert asyncio.run(schedule_repo.aget_next_open_slots(3)) == []
+
+
+def test_limit_and_async_variant(clinic):
+    assert schedule_repo.get_next_open_slots(3, limit=2) == DR_A_SLOTS[:2]
+    assert asyncio.run(schedule_repo.aget_next_open_slots(3, after=(str(DAY), "09:30:00"), limit=2)) == DR_A_SLOTS[2:]
+
+
+def test_fill_started_before_invalidation_is_ignored():
+    cache = AvailabilityCache(TTLCache())
+    _, token = cache.lookup([3])
+    # A booking lands while the reader's query is running
+    cache.invalidate(3)
+    cache.fill({3: DR_A_SLOTS}, token)
+    assert cache.get(3) is None
+    assert cache.stats()["stale"] == 1
+
+    _, token = cache.lookup([3])
+    cache.fill({3: DR_A_SLOTS[1:]}, token)
+    assert cache.get(3) == DR_A_SLOTS[1:]
+
+
+def test_each_call_is_timed_once(clinic):
+    def count(function):
+        return REGISTRY.get_sample_value("chatbot_db_call_seconds_count", {"function": function}) or 0
+
+    inner = ["get_available_slots_for_doctors", "get_doctors_by_speciality", "aget_available_slots_for_doctors", "aget_doctors_by_speciality"]
+    before = {function: count(function) for function in inner}
+    outer = count("get_available_slots_by_speciality")
+
+    schedule_repo.get_available_slots(3)
+    schedule_repo.get_available_slots_by_speciality("Orthopedics")
+    asyncio.run(schedule_repo.aget_available_slots(3))
+    asyncio.run(schedule_repo.aget_available_slots_by_speciality("Orthopedics"))
+
+    assert {function: count(function) for function in inner} == before
+    assert count("get_available_slots_by_speciality") == outer + 1
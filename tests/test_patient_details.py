@@ -0,0 +1,83 @@
+"""
+Tests for collecting the patient's name and phone number before booking (SQLite backend)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import datetime
+
+import pytest
+
+from app import session_store
+from app.conversation import ASK_PATIENT_NAME_REPLY
+from app.orchestrator import ConversationOrchestrator
+from app.orchestrator_async import AsyncConversationOrchestrator
+from app.session_store import load_session, save_session
+from app.session_store_memory import AsyncInMemorySessionStore, InMemorySessionStore
+from db import doctor_repo, repository, schedule_repo
+from db.patient_repo import find_patient_by_phone
+from db.sqlite_repository import SQLiteRepository
+
+DAY = datetime.date(2031, 3, 10)
+SLOTS = [
+    (DAY, datetime.time(9), datetime.time(9, 30)),
+    (DAY, datetime.time(9, 30), datetime.time(10)),
+]
+
+
+@pytest.fixture
+def clinic(monkeypatch):
+    db = SQLiteRepository(":memory:")
+    db.add_slots((3, *slot) for slot in SLOTS)
+    store = InMemorySessionStore()
+    monkeypatch.setattr(repository, "_repository", db)
+    monkeypatch.setattr(doctor_repo, "_directory", doctor_repo.DoctorDirectory())
+    monkeypatch.setattr(schedule_repo, "_availability_cache", None)
+    monkeypatch.setattr(session_store, "_store", store)
+    monkeypatch.setattr(session_store, "_async_store", AsyncInMemorySessionStore(store))
+    yield db
+    db.close()
+
+
+@pytest.fixture(params=["sync", "async"])
+def send(request):
+    """One turn through the sync or the async orchestrator"""
+    if request.param == "sync":
+        return ConversationOrchestrator().handle
+    bot = AsyncConversationOrchestrator()
+    return lambda session_id, text: asyncio.run(bot.handle(session_id, text))
+
+
+def offer(session_id, slot):
+    session = load_session(session_id)
+    details = dict(
+        state="COLLECTING_PATIENT_DETAILS", speciality="Dermatology", doctor_id=3, doctor_name="Dr A",
+        date=str(slot[0]), time=str(slot[1])
+    )
+    for key, value in details.items():
+        session[key] = value
+    save_session(session_id, session)
+
+
+def test_unknown_phone_alone_asks_for_the_name(clinic, send):
+    offer("s1", SLOTS[0])
+    assert send("s1", "98765 43210") == ASK_PATIENT_NAME_REPLY
+    assert load_session("s1")['state'] == "COLLECTING_PATIENT_DETAILS"
+    assert clinic.counts()["appointments"] == 0
+
+    assert send("s1", "Asha").startswith("Perfect!")
+    assert find_patient_by_phone("9876543210")[1] == "Asha"
+
+
+def test_known_phone_alone_books_under_the_stored_name(clinic, send):
+    offer("s1", SLOTS[0])
+    send("s1", "Asha 9876543210")
+
+    offer("s2", SLOTS[1])
+    patients = clinic.counts()["patients"]
+    assert send("s2", "98765-43210").startswith("Perfect!")
+    assert clinic.counts()["patients"] == patients
+    assert clinic.counts()["appointments"] == 2
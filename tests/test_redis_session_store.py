@@ -0,0 +1,138 @@
+"""
+Tests for the Redis session store's index, paging and bulk operations (fakeredis)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+from redis.crc import key_slot
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import session_store_redis
+from app.session_model import SessionConflict
+from app.session_store_redis import AsyncRedisSessionStore, RedisSessionStore, SESSION_INDEX_KEY, _session_key
+
+
+@pytest.fixture
+def store():
+    return RedisSessionStore(client=fakeredis.FakeRedis(decode_responses=False))
+
+
+def test_sessions_are_listed_most_recent_first_in_pages(store, monkeypatch):
+    for i in range(5):
+        monkeypatch.setattr(session_store_redis.time, "time", lambda i=i: 1000.0 + i)
+        store.save_session(f"s{i}", {"state": "INIT"})
+
+    first = store.list_sessions(offset=0, limit=2)
+    second = store.list_sessions(offset=2, limit=2)
+
+    assert first["total"] == 5
+    assert [s["session_id"] for s in first["sessions"]] == ["s4", "s3"]
+    assert [s["session_id"] for s in second["sessions"]] == ["s2", "s1"]
+
+
+def test_expired_sessions_are_pruned_from_the_index(store, monkeypatch):
+    monkeypatch.setattr(session_store_redis.time, "time", lambda: 1000.0)
+    store.save_session("old", {"state": "INIT"})
+    monkeypatch.setattr(session_store_redis.time, "time", lambda: 1000.0 + session_store_redis.SESSION_TTL + 1)
+    store.save_session("new", {"state": "INIT"})
+
+    page = store.list_sessions()
+    assert [s["session_id"] for s in page["sessions"]] == ["new"]
+    assert page["total"] == 1
+
+
+def test_clear_session_removes_key_and_index_entry(store):
+    store.save_session("s1", {"state": "INIT"})
+    store.clear_session("s1")
+
+    assert store.client.get(_session_key("s1")) is None
+    assert store.client.zcard(SESSION_INDEX_KEY) == 0
+
+
+def test_clear_session_with_a_stale_revision_is_a_conflict(store):
+    store.save_session("s1", {"state": "INIT"})
+    store.save_session("s1", store.load_session("s1"))
+
+    with pytest.raises(SessionConflict) as conflict:
+        store.clear_session("s1", 1)
+    assert (conflict.value.expected, conflict.value.current) == (1, 2)
+    assert store.client.zcard(SESSION_INDEX_KEY) == 1
+
+    store.clear_session("s1", 2)
+    assert store.client.get(_session_key("s1")) is None
+    assert store.client.zcard(SESSION_INDEX_KEY) == 0
+
+
+def test_clear_all_sessions_deletes_in_batches(store, monkeypatch):
+    monkeypatch.setattr(session_store_redis, "SCAN_BATCH_SIZE", 3)
+    for i in range(10):
+        store.save_session(f"s{i}", {"state": "INIT"})
+    store.client.set("unrelated", "kept")
+
+    assert len(store.get_all_sessions()) == 10
+    store.clear_all_sessions()
+
+    assert store.get_all_sessions() == []
+    assert store.client.exists(SESSION_INDEX_KEY) == 0
+    assert store.client.get("unrelated") == b"kept"
+
+
+def test_async_store_maintains_the_same_index():
+    server = fakeredis.FakeServer()
+    store = RedisSessionStore(client=fakeredis.FakeRedis(server=server, decode_responses=False))
+    async_store = AsyncRedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=False))
+
+    async def run():
+        await async_store.save_session("a1", {"state": "SELECTING_DOCTOR"})
+        return await async_store.load_session("a1")
+
+    assert asyncio.run(run())["state"] == "SELECTING_DOCTOR"
+    assert [s["session_id"] for s in store.list_sessions()["sessions"]] == ["a1"]
+
+
+def test_sessions_under_the_legacy_key_are_moved_on_load(store):
+    # Stored as session:<id> before the hash tag, in the legacy JSON format
+    store.client.set("session:s1", '{"_version": 4, "state": "SELECTING_DOCTOR", "doctor": "Dr X"}')
+
+    session = store.load_session("s1")
+    assert (session.state, session.revision) == ("SELECTING_DOCTOR", 4)
+    assert store.client.exists("session:s1") == 0
+    assert store.client.get(_session_key("s1")).startswith(b"{")
+
+    store.save_session("s1", session)
+    assert store.load_session("s1").revision == 5
+    assert not store.client.get(_session_key("s1")).startswith(b"{")
+
+
+def test_async_store_moves_legacy_sessions():
+    server = fakeredis.FakeServer()
+    store = RedisSessionStore(client=fakeredis.FakeRedis(server=server, decode_responses=False))
+    async_store = AsyncRedisSessionStore(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=False))
+    store.client.set("session:a1", '{"_version": 2, "state": "SELECTING_DOCTOR"}')
+
+    session = asyncio.run(async_store.load_session("a1"))
+    assert (session.state, session.revision) == ("SELECTING_DOCTOR", 2)
+    assert store.client.exists("session:a1") == 0
+    assert store.load_session("a1") == session
+
+
+def test_sessions_spread_over_cluster_slots():
+    # Each session hashes on its id alone; the scripts touch no other key
+    assert key_slot(_session_key("s1").encode()) == key_slot(b"s1")
+    assert key_slot(_session_key("s1").encode()) != key_slot(_session_key("other").encode())
+
+
+def test_save_reloads_a_flushed_script(store):
+    session = store.load_session("s1")
+    store.save_session("s1", session)
+    store.client.script_flush()
+
+    store.save_session("s1", session)
+    assert store.load_session("s1").revision == 2
+    assert store.client.zcard(SESSION_INDEX_KEY) == 1
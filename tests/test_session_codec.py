@@ -0,0 +1,84 @@
+"""
+Tests for the binary session encoding and the SessionData model
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+import pytest
+
+from app.session_codec import HEADER_SIZE, SCHEMA_VERSION, decode, encode, encode_unrevisioned
+from app.session_model import SessionData
+
+
+def booking_session():
+    return SessionData(
+        state="CHECKING_AVAILABILITY",
+        symptoms="knee pain after running",
+        speciality="Orthopedics",
+        doctor_id=1,
+        doctor_name="Dr X",
+        date="2026-01-22",
+        time="11:00:00",
+        rejected_slots=["2026-01-22|10:00:00"],
+        alternative_doctors=[[2, "Dr Y"]],
+        revision=7
+    )
+
+
+def test_round_trip_keeps_fields_and_revision():
+    session = booking_session()
+    data = encode(session)
+
+    assert data[0] == SCHEMA_VERSION
+    assert int.from_bytes(data[1:HEADER_SIZE], "big") == 7
+    assert decode(data) == session
+
+
+def test_binary_form_is_smaller_than_json():
+    session = booking_session()
+    assert len(encode(session)) < len(json.dumps(session.to_dict())) / 2
+
+
+def test_unrevisioned_form_is_the_encoding_without_revision():
+    session = booking_session()
+    data = encode(session)
+    assert encode_unrevisioned(session) == data[:1] + data[HEADER_SIZE:]
+
+
+def test_legacy_json_sessions_are_migrated():
+    legacy = json.dumps({
+        "_version": 3,
+        "state": "OFFERING_ALTERNATIVE_DOCTOR",
+        "doctor": None,
+        "doctor_id": 1,
+        "alternative_doctors": [[2, "Dr Y"]]
+    })
+    session = decode(legacy)
+
+    assert session.state == "OFFERING_ALTERNATIVE_DOCTOR"
+    assert session.alternative_doctors == [[2, "Dr Y"]]
+    assert session.revision == 3
+    assert session.rejected_slots == []
+
+
+def test_unknown_schema_version_is_rejected():
+    data = bytearray(encode(SessionData()))
+    data[0] = SCHEMA_VERSION + 1
+    with pytest.raises(ValueError):
+        decode(bytes(data))
+
+
+def test_dict_style_access_matches_the_orchestrator_usage():
+    session = SessionData()
+    assert session["state"] == "INIT"
+    assert session.get("doctor_name", "the doctor") == "the doctor"
+    assert "phone" not in session
+
+    session["phone"] = "9876543210"
+    assert "phone" in session
+    with pytest.raises(KeyError):
+        session["unknown"] = 1
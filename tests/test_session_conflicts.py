@@ -0,0 +1,157 @@
+"""
+Tests for retrying a conversation turn after a concurrent session save
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+
+from app import orchestrator, orchestrator_async, session_store
+from app.conversation import SESSION_ENDED_REPLY
+from app.orchestrator import CONCURRENT_UPDATE_REPLY, ConversationOrchestrator
+from app.orchestrator_async import AsyncConversationOrchestrator
+from app.session_model import SessionConflict
+from app.session_store import clear_session, load_session, save_session
+from app.session_store_memory import AsyncInMemorySessionStore, InMemorySessionStore
+from db.booking_repo import BookingStatus
+
+
+@pytest.fixture(autouse=True)
+def memory_store(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(session_store, "_store", store)
+    monkeypatch.setattr(session_store, "_async_store", AsyncInMemorySessionStore(store))
+
+
+class RacingOrchestrator(ConversationOrchestrator):
+    """Lets another request save the session while the first attempt of a turn runs"""
+
+    def __init__(self, concurrent_state):
+        self.concurrent_state = concurrent_state
+        self.attempts = 0
+
+    def handle_init(self, session_id, session, user_input):
+        self.attempts += 1
+        if self.attempts == 1:
+            other = load_session(session_id)
+            other['state'] = self.concurrent_state
+            save_session(session_id, other)
+        return super().handle_init(session_id, session, user_input)
+
+
+def test_turn_is_retried_when_the_state_did_not_change():
+    bot = RacingOrchestrator(concurrent_state="INIT")
+    reply = bot.handle("s1", "hi")
+
+    assert bot.attempts == 2
+    assert reply.startswith("Hello!")
+    assert load_session("s1")['state'] == "COLLECTING_SYMPTOMS"
+
+
+def test_turn_is_not_replayed_against_a_newer_state():
+    bot = RacingOrchestrator(concurrent_state="COLLECTING_SYMPTOMS")
+    reply = bot.handle("s1", "hi")
+
+    assert bot.attempts == 1
+    assert reply == CONCURRENT_UPDATE_REPLY
+    assert load_session("s1")['state'] == "COLLECTING_SYMPTOMS"
+
+
+def resave(session_id):
+    """Another request saving the session without changing its state"""
+    save_session(session_id, load_session(session_id))
+
+
+def start_in(session_id, **fields):
+    session = load_session(session_id)
+    for name, value in fields.items():
+        session[name] = value
+    save_session(session_id, session)
+
+
+def test_closing_a_session_saved_meanwhile_is_a_conflict():
+    start_in("s1", state="OFFERING_ALTERNATIVE_DOCTOR", doctor_name="Dr A")
+    stale = load_session("s1")
+    resave("s1")
+
+    with pytest.raises(SessionConflict):
+        ConversationOrchestrator().close_session("s1", stale)
+    assert load_session("s1")['state'] == "OFFERING_ALTERNATIVE_DOCTOR"
+
+
+def test_retried_turn_does_not_ask_the_llm_again(monkeypatch):
+    start_in("s1", state="COLLECTING_SYMPTOMS")
+    calls = []
+
+    def infer(text):
+        calls.append(text)
+        if len(calls) == 1:
+            resave("s1")
+        return "Orthopedics"
+
+    monkeypatch.setattr(orchestrator, "infer_speciality", infer)
+    monkeypatch.setattr(orchestrator, "get_doctors_by_speciality", lambda speciality: [(1, "Dr A")])
+    monkeypatch.setattr(orchestrator, "has_open_slot", lambda doctor_ids: True)
+
+    reply = ConversationOrchestrator().handle("s1", "knee pain")
+
+    assert calls == ["knee pain"]
+    assert "Dr A" in reply
+    assert load_session("s1")['state'] == "SELECTING_DOCTOR"
+
+
+def test_booked_turn_closes_the_session_instead_of_booking_again(monkeypatch):
+    start_in("s1", state="COLLECTING_PATIENT_DETAILS", doctor_id=1, doctor_name="Dr A", date="2026-01-22", time="10:00:00")
+    bookings = []
+
+    def book(**request):
+        bookings.append(request)
+        resave("s1")
+        return BookingStatus.BOOKED
+
+    monkeypatch.setattr(orchestrator, "book_appointment", book)
+
+    reply = ConversationOrchestrator().handle("s1", "Ann 555-0100")
+
+    assert len(bookings) == 1
+    assert reply.startswith("Perfect!")
+    assert load_session("s1").revision == 0
+
+
+def test_async_booked_turn_closes_the_session_instead_of_booking_again(monkeypatch):
+    start_in("s1", state="COLLECTING_PATIENT_DETAILS", doctor_id=1, doctor_name="Dr A", date="2026-01-22", time="10:00:00")
+    bookings = []
+
+    async def book(**request):
+        bookings.append(request)
+        resave("s1")
+        return BookingStatus.BOOKED
+
+    monkeypatch.setattr(orchestrator_async, "abook_appointment", book)
+
+    reply = asyncio.run(AsyncConversationOrchestrator().handle("s1", "Ann 555-0100"))
+
+    assert len(bookings) == 1
+    assert reply.startswith("Perfect!")
+    assert load_session("s1").revision == 0
+
+
+def test_session_deleted_during_the_turn_is_reported_as_ended(monkeypatch):
+    start_in("s1", state="COLLECTING_SYMPTOMS")
+
+    def infer(text):
+        clear_session("s1")
+        return "Orthopedics"
+
+    monkeypatch.setattr(orchestrator, "infer_speciality", infer)
+    monkeypatch.setattr(orchestrator, "get_doctors_by_speciality", lambda speciality: [(1, "Dr A")])
+    monkeypatch.setattr(orchestrator, "has_open_slot", lambda doctor_ids: True)
+
+    reply = ConversationOrchestrator().handle("s1", "knee pain")
+
+    assert reply == SESSION_ENDED_REPLY
+    assert load_session("s1")['state'] == "COLLECTING_SYMPTOMS"
@@ -0,0 +1,101 @@
+"""
+Tests for single-flight coalescing of identical in-flight calls
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return value.upper()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow, "ortho"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ORTHO"] * 5
+    assert calls == ["ortho"]
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "shared": 4}
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flight = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("provider down")
+
+    def caller():
+        try:
+            flight.do("k", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert flight.do("k", lambda: "recovered") == "recovered"
+
+
+def test_async_callers_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value.upper()
+
+    async def main():
+        same = await asyncio.gather(*(flight.do("k", slow, "derm") for _ in range(4)))
+        other = await flight.do("other", slow, "cardio")
+        return same, other
+
+    same, other = asyncio.run(main())
+    assert same == ["DERM"] * 4
+    assert other == "CARDIO"
+    assert calls == ["derm", "cardio"]
+    assert flight.stats() == {"in_flight": 0, "calls": 2, "shared": 3}
+
+
+def test_async_cancelled_waiter_does_not_cancel_the_call():
+    flight = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
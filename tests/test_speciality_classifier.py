@@ -0,0 +1,54 @@
+"""
+Tests for the offline specialty classifier (no network required)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app.services.speciality_classifier import classify, normalize_symptoms
+
+THRESHOLD = 0.6
+
+
+@pytest.mark.parametrize("symptoms, speciality", [
+    ("knee pain", "Orthopedics"),
+    ("I sprained my ankle", "Orthopedics"),
+    ("skin rash", "Dermatology"),
+    ("Itchy rashes on my arms!", "Dermatology"),
+    ("chest pain", "Cardiology"),
+    ("fever and headache", "General Medicine"),
+    ("my child has a fever", "Pediatrics"),
+    ("migraines and dizziness", "Neurology"),
+])
+def test_common_symptoms_are_classified_confidently(symptoms, speciality):
+    result, confidence = classify(symptoms)
+    assert result == speciality
+    assert confidence >= THRESHOLD
+
+
+@pytest.mark.parametrize("symptoms", ["I feel unwell", "pain", "", "headache"])
+def test_vague_symptoms_fall_below_threshold(symptoms):
+    _, confidence = classify(symptoms)
+    assert confidence < THRESHOLD
+
+
+def test_normalization_folds_case_punctuation_and_whitespace():
+    assert normalize_symptoms("  Knee-PAIN,   since   Monday!! ") == "knee pain since monday"
+
+
+@pytest.mark.parametrize("symptoms, speciality", [
+    ("knee pain, no chest pain", "Orthopedics"),
+    ("rash on my arm but no fever", "Dermatology"),
+    ("I don't have a fever but my knee hurts", "Orthopedics"),
+    ("no heart problems. skin rash since monday", "Dermatology"),
+])
+def test_negated_symptoms_are_not_counted(symptoms, speciality):
+    assert classify(symptoms)[0] == speciality
+
+
+@pytest.mark.parametrize("symptoms", ["no chest pain", "without any fever or cough", "denies palpitations"])
+def test_only_negated_symptoms_give_no_evidence(symptoms):
+    assert classify(symptoms)[1] == 0.0
@@ -0,0 +1,54 @@
+"""
+Tests for LLM specialty inference and its cache (LLM stubbed)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.cache import TTLCache
+from app.services import speciality_service
+from app.services.speciality_classifier import DEFAULT_SPECIALITY
+
+SYMPTOMS = "something odd for a while"
+
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """LLM stub answering from ``answers`` in order; every local classification goes to it"""
+    answers = []
+
+    def call_llm(messages):
+        return reply(answers.pop(0))
+
+    async def acall_llm(messages):
+        return call_llm(messages)
+
+    monkeypatch.setattr(speciality_service, "call_llm", call_llm)
+    monkeypatch.setattr(speciality_service, "acall_llm", acall_llm)
+    monkeypatch.setattr(speciality_service, "SPECIALITY_CLASSIFIER_THRESHOLD", 2.0)
+    monkeypatch.setattr(speciality_service, "_cache", speciality_service.SpecialityCache(TTLCache()))
+    return answers
+
+
+@pytest.mark.parametrize("infer", [
+    speciality_service.infer_speciality,
+    lambda symptoms: asyncio.run(speciality_service.ainfer_speciality(symptoms)),
+])
+def test_invalid_llm_output_is_not_cached(llm, infer):
+    llm.extend(["I think it's Cardiology!", "Cardiology"])
+
+    assert infer(SYMPTOMS) == DEFAULT_SPECIALITY
+    # Asked again rather than served the default from the cache
+    assert infer(SYMPTOMS) == "Cardiology"
+    assert infer(SYMPTOMS) == "Cardiology"
+    assert llm == []
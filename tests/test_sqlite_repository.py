@@ -0,0 +1,123 @@
+"""
+Tests for the embedded SQLite backend and the db/ modules running on it (no Postgres required)
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import datetime
+import sqlite3
+
+import pytest
+
+from db import doctor_repo, repository, schedule_repo
+from db.booking_repo import BookingStatus, book_appointment, abook_appointment
+from db.patient_repo import find_patient_by_phone
+from db.sqlite_repository import SQLiteRepository, to_sqlite
+
+TOMORROW = datetime.date.today() + datetime.timedelta(days=1)
+
+
+@pytest.fixture
+def clinic(monkeypatch):
+    """Seeded in-memory database installed as the process-wide repository"""
+    db = SQLiteRepository(":memory:")
+    monkeypatch.setattr(repository, "_repository", db)
+    monkeypatch.setattr(doctor_repo, "_directory", doctor_repo.DoctorDirectory())
+    for doctor_id in (1, 2, 3):
+        schedule_repo.invalidate_availability(doctor_id)
+    yield db
+    db.close()
+
+
+def test_postgres_only_syntax_is_rewritten():
+    assert to_sqlite("id SERIAL PRIMARY KEY") == "id INTEGER PRIMARY KEY AUTOINCREMENT"
+    assert to_sqlite("(1, CURRENT_DATE + INTERVAL '1 day', '10:00')") == \
+        "(1, date('now', 'localtime', '+1 days'), '10:00')"
+    assert to_sqlite("created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP") == "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+
+
+def test_seed_data_comes_back_as_driver_types(clinic):
+    assert clinic.all_doctors() == [(1, 'Dr X', 'Orthopedics'), (2, 'Dr Y', 'Orthopedics'), (3, 'Dr A', 'Dermatology')]
+    assert clinic.available_slots(1) == [
+        (TOMORROW, datetime.time(10), datetime.time(10, 30)),
+        (TOMORROW, datetime.time(11), datetime.time(11, 30)),
+    ]
+    assert schedule_repo.get_available_slots_by_speciality("Dermatology") == {3: []}
+    assert schedule_repo.get_doctors_with_open_slots([1, 2, 3]) == {1, 2}
+    assert schedule_repo.has_open_slot([3]) is False
+
+
+def test_keyset_paging_accepts_session_strings(clinic):
+    after = (str(TOMORROW), "10:00:00")
+    assert schedule_repo.get_next_open_slots(1, after=after) == [(TOMORROW, datetime.time(11), datetime.time(11, 30))]
+    assert clinic.next_open_slots(1, None, [(str(TOMORROW), "10:00")], 5)[0][1] == datetime.time(11)
+
+
+def test_a_slot_is_booked_once(clinic):
+    assert book_appointment(1, "Asha", "+91 98765 43210", str(TOMORROW), "10:00:00") is BookingStatus.BOOKED
+    assert book_appointment(1, "Ravi", "9123456780", TOMORROW, datetime.time(10)) is BookingStatus.SLOT_TAKEN
+
+    assert schedule_repo.is_slot_available(1, TOMORROW, "10:00") is False
+    assert find_patient_by_phone("+919876543210")[1] == "Asha"
+    assert find_patient_by_phone("9123456780") is None
+    assert clinic.counts()["appointments"] == 1
+
+
+def test_returning_patient_keeps_one_row_and_name(clinic):
+    assert book_appointment(1, "Asha", "9876543210", TOMORROW, "10:00") is BookingStatus.BOOKED
+    assert asyncio.run(abook_appointment(1, "Someone Else", "98765 43210", TOMORROW, "11:00")) is BookingStatus.BOOKED
+
+    assert clinic.counts()["patients"] == 1
+    assert clinic.counts()["appointments"] == 2
+    assert find_patient_by_phone("9876543210")[1] == "Asha"
+
+
+def test_failed_booking_writes_nothing(clinic):
+    # An appointment row left behind for a slot still flagged open
+    clinic._conn.execute("INSERT INTO patients (name, phone) VALUES ('X', '1')")
+    clinic._conn.execute(
+        "INSERT INTO appointments (doctor_id, patient_id, schedule_date, start_time) VALUES (1, 1, ?, '10:00:00')",
+        (str(TOMORROW),)
+    )
+    assert book_appointment(1, "Asha", "9876543210", TOMORROW, "10:00") is BookingStatus.SLOT_TAKEN
+
+    assert clinic.slot_available(1, TOMORROW, "10:00") is True
+    assert clinic.counts()["patients"] == 1
+
+
+def test_other_integrity_errors_are_raised(clinic):
+    # A new patient without a name breaks NOT NULL: a bug, not a taken slot
+    with pytest.raises(sqlite3.IntegrityError):
+        clinic.book_appointment(1, None, "9876543210", TOMORROW, "10:00")
+
+    assert clinic.slot_available(1, TOMORROW, "10:00") is True
+    assert clinic.counts()["patients"] == 0
+
+
+def test_file_database_is_built_once(tmp_path):
+    path = str(tmp_path / "clinic.db")
+    first = SQLiteRepository(path)
+    first.add_slots([(3, TOMORROW, "09:00", "09:30")])
+    first.close()
+
+    reopened = SQLiteRepository(path)
+    assert reopened.counts()["doctors"] == 3
+    assert reopened.has_open_slot([3]) is True
+    reopened.close()
+
+
+def test_backends_must_implement_every_query():
+    class PartialRepository(repository.ClinicRepository):
+        def all_doctors(self):
+            return []
+
+    with pytest.raises(TypeError):
+        PartialRepository()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        repository.make_repository("mysql")
@@ -0,0 +1,80 @@
+"""
+Tests for the state handler table, declared transitions and per-state metrics
+"""
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app import orchestrator, session_store
+from app.orchestrator import RESTART_REPLY, STATE_HANDLERS, ConversationOrchestrator
+from app.session_store import load_session, save_session
+from app.session_store_memory import InMemorySessionStore
+from app.state import ConversationState, VALID_TRANSITIONS, validate_state_machine
+
+
+@pytest.fixture(autouse=True)
+def memory_store(monkeypatch):
+    monkeypatch.setattr(session_store, "_store", InMemorySessionStore())
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_handler_table_matches_the_declared_transitions():
+    validate_state_machine(STATE_HANDLERS)
+
+
+def test_a_state_without_a_handler_is_rejected():
+    handlers = dict(STATE_HANDLERS)
+    del handlers[ConversationState.CHECKING_AVAILABILITY]
+    with pytest.raises(ValueError, match="CHECKING_AVAILABILITY"):
+        validate_state_machine(handlers)
+
+
+def test_orchestrator_missing_a_handler_fails_at_construction(monkeypatch):
+    monkeypatch.setitem(STATE_HANDLERS, ConversationState.INIT, "handle_nothing")
+    with pytest.raises(ValueError, match="handle_nothing"):
+        ConversationOrchestrator()
+
+
+def test_turns_are_timed_and_transitions_counted():
+    before = sample("chatbot_state_turn_seconds_count", state="INIT")
+    moved = sample("chatbot_state_transitions_total", source="INIT", target="COLLECTING_SYMPTOMS")
+
+    ConversationOrchestrator().handle("s1", "hi")
+
+    assert sample("chatbot_state_turn_seconds_count", state="INIT") == before + 1
+    assert sample("chatbot_state_transitions_total", source="INIT", target="COLLECTING_SYMPTOMS") == moved + 1
+
+
+def test_closing_a_session_is_recorded_as_end(monkeypatch):
+    monkeypatch.setattr(orchestrator, "infer_speciality", lambda text: "Dermatology")
+    monkeypatch.setattr(orchestrator, "get_doctors_by_speciality", lambda speciality: [])
+    save_session("s1", {"state": "COLLECTING_SYMPTOMS"})
+    closed = sample("chatbot_state_transitions_total", source="COLLECTING_SYMPTOMS", target="END")
+
+    ConversationOrchestrator().handle("s1", "rash")
+
+    assert sample("chatbot_state_transitions_total", source="COLLECTING_SYMPTOMS", target="END") == closed + 1
+    assert load_session("s1")["state"] == "INIT"
+
+
+def test_undeclared_transitions_are_counted(monkeypatch):
+    bot = ConversationOrchestrator()
+    monkeypatch.setitem(VALID_TRANSITIONS, ConversationState.INIT, {ConversationState.SELECTING_DOCTOR})
+    before = sample("chatbot_invalid_transitions_total", source="INIT", target="COLLECTING_SYMPTOMS")
+
+    bot.handle("s1", "hi")
+
+    assert sample("chatbot_invalid_transitions_total", source="INIT", target="COLLECTING_SYMPTOMS") == before + 1
+
+
+def test_unknown_state_restarts_the_conversation():
+    save_session("s1", {"state": "BOOKED"})
+    assert ConversationOrchestrator().handle("s1", "hello") == RESTART_REPLY
+    assert load_session("s1")["state"] == "INIT"